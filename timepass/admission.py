@@ -0,0 +1,189 @@
+"""
+GFNS ADMISSION CONTROL — keep one expensive route from starving the rest.
+
+Every request is assigned a budget by route:
+  submit   POST /submit, /submit/stream (the PBKDF2/AES-heavy shield paths): few slots
+  write    other POSTs (modals, snapshots, shocks)
+  read     GETs: many slots, short waits
+Each budget has
+  - a concurrency limit (requests running at once)
+  - a bounded wait queue: past `queue` waiters, new requests are shed
+  - a maximum wait, capped further by an optional X-Deadline-Ms header;
+    when the expected wait (waiters x mean service time / slots) already
+    exceeds it, the request is shed at once instead of timing out in line
+  - a per-client token bucket (requests/second + burst; rate 0 disables),
+    keyed on the peer address. X-Forwarded-For is client-supplied and is
+    never read here: behind a load balancer, set $GFNS_TRUSTED_PROXIES to
+    the number of proxy hops in front of the app and ProxyFix takes the
+    client address from exactly that many hops, ignoring anything the
+    client prepended
+Shed requests get 503 (capacity) or 429 (client over its rate), both with
+Retry-After. Counters are reported on /api/system/health.
+
+Budgets come from DEFAULT_BUDGETS or a JSON object in $GFNS_ADMISSION:
+  {"submit": {"concurrency": 4, "queue": 16, "max_wait_s": 10, "rate": 2, "burst": 5}}
+"""
+
+import os, json, math, time, threading
+from collections import OrderedDict
+from flask import request, g, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+CPUS = os.cpu_count() or 2
+DEFAULT_BUDGETS = {
+    "submit": {"concurrency": CPUS,   "queue": 4 * CPUS, "max_wait_s": 10.0, "rate": 2,  "burst": 5},
+    "write":  {"concurrency": 16,     "queue": 64,       "max_wait_s": 5.0,  "rate": 20, "burst": 40},
+    "read":   {"concurrency": 64,     "queue": 256,      "max_wait_s": 2.0,  "rate": 50, "burst": 100},
+}
+EXEMPT_PATHS = {"/api/alerts/stream",    # long-lived SSE would pin a slot forever
+                "/api/system/health"}    # must stay reachable to show the counters
+WRITE_GETS   = {"/api/health/snapshot"}  # GET, but stores a row per category
+MAX_CLIENTS  = 10000                     # token buckets kept (least recently seen evicted)
+SERVICE_ALPHA = 0.2
+
+
+class Budget:
+    def __init__(self, name, concurrency, queue, max_wait_s, rate, burst):
+        self.name        = name
+        self.concurrency = max(1, int(concurrency))
+        self.queue       = max(0, int(queue))
+        self.max_wait_s  = float(max_wait_s)
+        self.rate        = float(rate)
+        self.burst       = float(burst)
+        self.in_flight   = 0
+        self.waiting     = 0
+        self.service_ms  = None          # EWMA of handler time, for wait estimates
+        self.admitted = self.queued = self.shed_full = self.shed_deadline = self.rate_limited = 0
+        self._cond    = threading.Condition()
+        self._buckets = OrderedDict()    # client -> [tokens, last refill]
+
+    # ── per-client rate ──────────────────────────────────────────────
+    def take_token(self, client, now):
+        """None if the client may proceed, else seconds until it has a token again."""
+        if self.rate <= 0:
+            return None
+        with self._cond:
+            bucket = self._buckets.pop(client, None) or [self.burst, now]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets[client] = bucket
+            if len(self._buckets) > MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return None
+            self.rate_limited += 1
+            return (1 - bucket[0]) / self.rate
+
+    # ── concurrency + queue ──────────────────────────────────────────
+    def expected_wait(self, ahead):
+        return 0.0 if self.service_ms is None else ahead * self.service_ms / 1000 / self.concurrency
+
+    def acquire(self, max_wait_s):
+        """(True, 0) once a slot is held; (False, retry_after_s) when shed."""
+        with self._cond:
+            if self.in_flight < self.concurrency and not self.waiting:
+                self.in_flight += 1
+                self.admitted  += 1
+                return True, 0.0
+            estimate = self.expected_wait(self.waiting + 1)
+            if self.waiting >= self.queue:
+                self.shed_full += 1
+                return False, max(1.0, estimate)
+            if estimate > max_wait_s:
+                self.shed_deadline += 1
+                return False, estimate
+            deadline = time.monotonic() + max_wait_s
+            self.waiting += 1
+            self.queued  += 1
+            try:
+                while self.in_flight >= self.concurrency:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        self.shed_deadline += 1
+                        return False, max(1.0, self.expected_wait(self.waiting))
+                    self._cond.wait(left)
+                self.in_flight += 1
+                self.admitted  += 1
+                return True, 0.0
+            finally:
+                self.waiting -= 1
+
+    def release(self, elapsed_ms):
+        with self._cond:
+            self.in_flight -= 1
+            self.service_ms = elapsed_ms if self.service_ms is None else \
+                self.service_ms + SERVICE_ALPHA * (elapsed_ms - self.service_ms)
+            self._cond.notify()
+
+    def stats(self):
+        return {"budget": self.name, "concurrency": self.concurrency, "inFlight": self.in_flight,
+                "queueDepth": self.waiting, "queueLimit": self.queue, "admitted": self.admitted,
+                "queued": self.queued, "shedQueueFull": self.shed_full, "shedDeadline": self.shed_deadline,
+                "rateLimited": self.rate_limited,
+                "serviceMs": None if self.service_ms is None else round(self.service_ms, 1)}
+
+
+class AdmissionController:
+    def __init__(self, budgets=None, trusted_proxies=0):
+        self.trusted_proxies = max(0, int(trusted_proxies))
+        spec = {k: dict(v) for k, v in DEFAULT_BUDGETS.items()}
+        for name, overrides in (budgets or {}).items():
+            spec.setdefault(name, dict(DEFAULT_BUDGETS["read"])).update(overrides)
+        self.budgets = {name: Budget(name, **cfg) for name, cfg in spec.items()}
+
+    @classmethod
+    def from_env(cls):
+        proxies = int(os.environ.get("GFNS_TRUSTED_PROXIES", "0"))
+        path    = os.environ.get("GFNS_ADMISSION")
+        if not path:
+            return cls(trusted_proxies=proxies)
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), trusted_proxies=proxies)
+
+    @staticmethod
+    def budget_for(method, path):
+        if path in ("/submit", "/submit/stream"):
+            return "submit"
+        return "read" if method in ("GET", "HEAD") and path not in WRITE_GETS else "write"
+
+    def stats(self):
+        return [b.stats() for b in self.budgets.values()]
+
+    def install(self, app):
+        if self.trusted_proxies:
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=self.trusted_proxies)
+        @app.before_request
+        def _admit():
+            if request.method == "OPTIONS" or request.path in EXEMPT_PATHS:
+                return None
+            budget = self.budgets[self.budget_for(request.method, request.path)]
+            wait   = budget.take_token(request.remote_addr or "-", time.monotonic())
+            if wait is not None:
+                return _shed(429, f"rate limit for {budget.name} requests exceeded", wait)
+            max_wait = budget.max_wait_s
+            try:
+                max_wait = min(max_wait, float(request.headers["X-Deadline-Ms"]) / 1000)
+            except (KeyError, ValueError):
+                pass
+            ok, retry = budget.acquire(max_wait)
+            if not ok:
+                return _shed(503, f"server busy: {budget.name} capacity exhausted", retry)
+            g._admission = (budget, time.perf_counter())
+            return None
+
+        @app.teardown_request
+        def _release(_exc):
+            held = g.pop("_admission", None)
+            if held is not None:
+                budget, started = held
+                budget.release((time.perf_counter() - started) * 1000)
+        return self
+
+
+def _shed(status, message, retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    resp = jsonify({"error": message, "retryAfter": seconds})
+    resp.status_code = status
+    resp.headers["Retry-After"] = str(seconds)
+    return resp
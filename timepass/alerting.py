@@ -0,0 +1,258 @@
+"""
+GFNS ALERTING — declarative threshold / rate-of-change rules, evaluated
+incrementally as rows are stored.
+
+Each stored row is checked only against the rules for the metrics it
+carries, using small per-(subject, metric) state kept in memory: the last
+few values for change rules and whether each rule is currently firing.
+History is never rescanned. An alert fires when its condition starts to
+hold (not on every row while it keeps holding), at most once per rule
+cooldown, and under a global per-minute cap; it resolves when the
+condition clears. Alerts are written with the row that raised them; the
+in-memory state only moves once that transaction has committed (commit()),
+so a rolled-back row leaves nothing behind, and new alerts are then pushed
+to live subscribers (server-sent events).
+
+Rules come from DEFAULT_RULES or a JSON list in $GFNS_ALERT_RULES:
+  {"id": "lcr-min", "metric": "LCR", "op": "<", "value": 100, "severity": "HIGH"}
+  {"id": "cds-jump", "metric": "Credit Default Swaps", "type": "change",
+   "lookback": 1, "op": ">", "value": 25, "severity": "ELEVATED"}     # % change
+"""
+
+import os, re, json, time, queue, threading
+from collections import deque
+
+DEFAULT_COOLDOWN_S = 300
+GLOBAL_PER_MINUTE  = 60
+SUBSCRIBER_QUEUE   = 256
+
+# Thresholds already written in the HEALTH_CONFIGS notes, plus a few jumps
+DEFAULT_RULES = [
+    {"id": "tier1-basel-min",   "metric": "Tier-1 Capital Ratio",     "op": "<", "value": 6,
+     "severity": "HIGH",     "message": "Tier-1 below Basel III minimum (6%)"},
+    {"id": "cet1-min",          "metric": "CET1 Ratio",               "op": "<", "value": 4.5,
+     "severity": "HIGH",     "message": "CET1 below 4.5% minimum"},
+    {"id": "ccb-buffer",        "metric": "Capital Conservation Buf", "op": "<", "value": 2.5,
+     "severity": "ELEVATED", "message": "Capital conservation buffer below 2.5%"},
+    {"id": "leverage-min",      "metric": "Leverage Ratio",           "op": "<", "value": 3,
+     "severity": "HIGH",     "message": "Leverage ratio below 3%"},
+    {"id": "lcr-min",           "metric": "LCR",                      "op": "<", "value": 100,
+     "severity": "HIGH",     "message": "LCR below regulatory minimum (100%)"},
+    {"id": "altman-distress",   "metric": "Z-Score (Altman)",         "op": "<", "value": 1.8,
+     "severity": "HIGH",     "message": "Altman Z in distress zone (<1.8)"},
+    {"id": "stress-index-high", "metric": "Stress Index",             "op": ">", "value": 75,
+     "severity": "ELEVATED", "message": "Composite stress index above 75"},
+    {"id": "npl-high",          "metric": "Non-Performing Loans",     "op": ">", "value": 5,
+     "severity": "ELEVATED", "message": "NPL ratio above 5%"},
+    {"id": "cds-jump",          "metric": "Credit Default Swaps",     "type": "change", "lookback": 1,
+     "op": ">", "value": 25, "severity": "ELEVATED", "message": "CDS spread up more than 25%"},
+    {"id": "lcr-drop",          "metric": "LCR",                      "type": "change", "lookback": 3,
+     "op": "<", "value": -15, "severity": "ELEVATED", "message": "LCR down more than 15% in 3 readings"},
+]
+
+_OPS    = {"<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+           ">": lambda a, b: a > b, ">=": lambda a, b: a >= b}
+_NUMBER = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+
+def parse_number(value):
+    """13.4 from '13.4%', 426 from '$426B', None for 'OPEN'."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _NUMBER.search(str(value or ""))
+    return float(m.group().replace(",", "")) if m else None
+
+def ensure_alerts_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alerts (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            rule_id     TEXT,
+            metric      TEXT,
+            subject     TEXT,
+            severity    TEXT,
+            value       REAL,
+            threshold   REAL,
+            message     TEXT,
+            state       TEXT,
+            created_at  TEXT,
+            resolved_at TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_alerts_state ON alerts(state, id)")
+
+
+class AlertChanges:
+    """What evaluate() decided inside one transaction, applied by AlertEngine.commit()."""
+    def __init__(self):
+        self.values     = {}      # (subject, metric) -> values appended
+        self.active     = {}      # (rule id, subject) -> new alert row id, or None once resolved
+        self.last       = {}      # (rule id, subject) -> firing time
+        self.recent     = []      # firing times, for the global cap
+        self.suppressed = 0
+        self.fired      = []
+
+
+class AlertEngine:
+    def __init__(self, rules=None, cooldown_s=DEFAULT_COOLDOWN_S, per_minute=GLOBAL_PER_MINUTE):
+        self.rules      = rules or DEFAULT_RULES
+        self.cooldown_s = cooldown_s
+        self.per_minute = per_minute
+        self.by_metric  = {}
+        for r in self.rules:
+            if r.get("op") not in _OPS:
+                raise ValueError(f"alert rule {r.get('id')}: unsupported op {r.get('op')!r}")
+            self.by_metric.setdefault(r["metric"], []).append(r)
+        depth          = max([r.get("lookback", 1) for r in self.rules if r.get("type") == "change"] or [1])
+        self._depth    = depth + 1
+        self._history  = {}       # (subject, metric) -> deque of recent values
+        self._active   = {}       # (rule id, subject) -> alert row id while firing
+        self._last     = {}       # (rule id, subject) -> monotonic time of last firing
+        self._recent   = deque()  # firing times in the last minute, for the global cap
+        self.suppressed = 0
+        self._restored = False
+        self._lock     = threading.Lock()
+        self._subs     = []
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get("GFNS_ALERT_RULES")
+        if not path:
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def restore(self, cursor):
+        """
+        Create the alerts table if needed and, once per process, reload the
+        alerts still ACTIVE from a previous run so they aren't raised twice.
+        """
+        ensure_alerts_table(cursor)
+        if self._restored:
+            return
+        with self._lock:
+            for row_id, rule_id, subject in cursor.execute(
+                    "SELECT id, rule_id, subject FROM alerts WHERE state = 'ACTIVE'").fetchall():
+                self._active[(rule_id, subject)] = row_id
+            self._restored = True
+
+    # ── evaluation ───────────────────────────────────────────────────
+    def _condition(self, rule, hist, value):
+        if rule.get("type") == "change":
+            back = rule.get("lookback", 1)
+            if len(hist) <= back:
+                return None, None
+            base = hist[-1 - back]
+            if not base:
+                return None, None
+            value = (value - base) / abs(base) * 100
+        return _OPS[rule["op"]](value, rule["value"]), value
+
+    def pending(self):
+        return AlertChanges()
+
+    def evaluate(self, cursor, subject, metrics, ts, changes):
+        """
+        Check one stored row {metric: value} for `subject`; writes new and
+        resolved alerts through `cursor` (the row's own transaction) and
+        records the state they imply in `changes` (from pending()), seen by
+        later rows of the same transaction. Returns the alerts this row
+        raised; call commit(changes) once the caller has committed.
+        """
+        fired = []
+        now   = time.monotonic()
+        with self._lock:
+            for metric, raw in metrics.items():
+                rules = self.by_metric.get(metric)
+                if not rules:
+                    continue
+                value = parse_number(raw)
+                if value is None:
+                    continue
+                added = changes.values.setdefault((subject, metric), [])
+                added.append(value)
+                hist = deque(self._history.get((subject, metric), ()), maxlen=self._depth)
+                hist.extend(added)
+                for rule in rules:
+                    hit, observed = self._condition(rule, hist, value)
+                    key = (rule["id"], subject)
+                    if hit is None:
+                        continue
+                    active = changes.active[key] if key in changes.active else self._active.get(key)
+                    if not hit:
+                        if active is not None:
+                            cursor.execute("UPDATE alerts SET state = 'RESOLVED', resolved_at = ? WHERE id = ?",
+                                           (ts, active))
+                            changes.active[key] = None
+                        continue
+                    if active is not None:
+                        continue                                    # still firing: deduplicated
+                    last = changes.last.get(key, self._last.get(key, -1e9))
+                    if now - last < rule.get("cooldown_s", self.cooldown_s):
+                        changes.suppressed += 1
+                        continue
+                    while self._recent and now - self._recent[0] > 60:
+                        self._recent.popleft()
+                    if len(self._recent) + len(changes.recent) >= self.per_minute:
+                        changes.suppressed += 1
+                        continue
+                    alert = {"ruleId": rule["id"], "metric": metric, "subject": subject,
+                             "severity": rule.get("severity", "ELEVATED"), "value": round(observed, 3),
+                             "threshold": rule["value"], "message": rule.get("message", rule["id"]),
+                             "state": "ACTIVE", "createdAt": ts}
+                    cursor.execute("""INSERT INTO alerts (rule_id, metric, subject, severity, value, threshold,
+                                      message, state, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'ACTIVE', ?)""",
+                                   (rule["id"], metric, subject, alert["severity"], alert["value"],
+                                    rule["value"], alert["message"], ts))
+                    alert["id"] = cursor.lastrowid
+                    changes.active[key] = alert["id"]
+                    changes.last[key]   = now
+                    changes.recent.append(now)
+                    fired.append(alert)
+            changes.fired += fired
+        return fired
+
+    def commit(self, changes):
+        """Apply a committed transaction's changes; returns its new alerts, for publish()."""
+        with self._lock:
+            for hkey, values in changes.values.items():
+                hist = self._history.get(hkey)
+                if hist is None:
+                    hist = self._history[hkey] = deque(maxlen=self._depth)
+                hist.extend(values)
+            for key, row_id in changes.active.items():
+                if row_id is None:
+                    self._active.pop(key, None)
+                else:
+                    self._active[key] = row_id
+            self._last.update(changes.last)
+            self._recent.extend(changes.recent)
+            self.suppressed += changes.suppressed
+        return changes.fired
+
+    def active_count(self):
+        return len(self._active)
+
+    # ── push ─────────────────────────────────────────────────────────
+    def subscribe(self):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+        with self._lock:
+            self._subs.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            if q in self._subs:
+                self._subs.remove(q)
+
+    def publish(self, alerts):
+        """Fan committed alerts out to subscribers; a full queue (stalled client) just drops."""
+        if not alerts:
+            return
+        with self._lock:
+            subs = list(self._subs)
+        for q in subs:
+            for a in alerts:
+                try:
+                    q.put_nowait(a)
+                except queue.Full:
+                    break
@@ -0,0 +1,202 @@
+"""
+GFNS ANOMALY DETECTION — online scoring of every stored health metric.
+
+Per (subject, metric) the detector keeps a fixed-size state, whatever the
+history length:
+  Welford   n / mean / M2 over everything seen (long-run spread)
+  EWMA      exponentially weighted mean and variance (recent baseline)
+  Seasonal  an EWMA mean per hour of day (24 slots)
+Each new value is scored against the state *before* it is folded in:
+the larger of its EWMA z-score and its distance from the hour-of-day
+baseline in long-run standard deviations. Values scoring at or above
+RECORD_Z are written to `anomalies`.
+
+Values are folded into copies of the states, which replace the live
+ones only once the insert transaction has committed (commit()); a
+rolled-back row leaves the detector as it was. State is checkpointed to
+`anomaly_state` in the insert transaction at most every CHECKPOINT_S, so
+a restart resumes from the checkpoint instead of replaying history.
+"""
+
+import json, math, time, threading
+
+ALPHA        = 0.1       # EWMA weight of the newest value
+SEASON_ALPHA = 0.2
+WARMUP       = 12        # values seen before anything is scored
+RECORD_Z     = 3.0
+CHECKPOINT_S = 30.0
+MIN_STD      = 1e-9
+
+
+def ensure_anomaly_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS anomalies (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject    TEXT,
+            metric     TEXT,
+            value      REAL,
+            score      REAL,
+            baseline   REAL,
+            created_at TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS anomaly_state (
+            subject    TEXT,
+            metric     TEXT,
+            state      TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (subject, metric)
+        )
+    """)
+
+
+class MetricState:
+    __slots__ = ("n", "mean", "m2", "ew_mean", "ew_var", "season", "last", "score", "at")
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.ew_mean, self.ew_var  = None, 0.0
+        self.season = [None] * 24
+        self.last = self.score = self.at = None
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def observe(self, x, hour):
+        """Score x against the current state, then fold it in. Returns (score, baseline) or (None, None)."""
+        score = baseline = None
+        if self.n >= WARMUP:
+            z_ew     = abs(x - self.ew_mean) / max(math.sqrt(self.ew_var), MIN_STD)
+            baseline = self.ew_mean
+            seasonal = self.season[hour]
+            if seasonal is not None:
+                z_season = abs(x - seasonal) / max(self.std(), MIN_STD)
+                if z_season > z_ew:
+                    z_ew, baseline = z_season, seasonal
+            score = round(z_ew, 3)
+        # Welford
+        self.n   += 1
+        delta     = x - self.mean
+        self.mean += delta / self.n
+        self.m2  += delta * (x - self.mean)
+        # EWMA mean / variance (West's incremental form)
+        if self.ew_mean is None:
+            self.ew_mean = x
+        else:
+            diff         = x - self.ew_mean
+            incr         = ALPHA * diff
+            self.ew_mean += incr
+            self.ew_var  = (1 - ALPHA) * (self.ew_var + diff * incr)
+        slot = self.season[hour]
+        self.season[hour] = x if slot is None else slot + SEASON_ALPHA * (x - slot)
+        self.last, self.score = x, score
+        return score, baseline
+
+    def copy(self):
+        st = MetricState.__new__(MetricState)
+        for name in self.__slots__:
+            setattr(st, name, getattr(self, name))
+        st.season = list(self.season)
+        return st
+
+    def dump(self):
+        return json.dumps([self.n, self.mean, self.m2, self.ew_mean, self.ew_var, self.season,
+                           self.last, self.score, self.at])
+
+    @classmethod
+    def load(cls, text):
+        st = cls()
+        (st.n, st.mean, st.m2, st.ew_mean, st.ew_var, st.season,
+         st.last, st.score, st.at) = json.loads(text)
+        return st
+
+
+class AnomalyChanges:
+    """States updated inside one transaction, applied by AnomalyDetector.commit()."""
+    def __init__(self):
+        self.states = {}          # (subject, metric) -> updated MetricState
+        self.saved  = {}          # (subject, metric) -> the MetricState checkpointed
+        self.ckpt_at = None       # monotonic time of the checkpoint written, if any
+
+
+class AnomalyDetector:
+    def __init__(self):
+        self.states      = {}         # (subject, metric) -> MetricState
+        self._dirty      = set()
+        self._loaded     = False
+        self._last_ckpt  = float("-inf")
+        self._lock       = threading.Lock()
+
+    def load(self, cursor):
+        """Create the tables and, once per process, pick up the last checkpoint."""
+        ensure_anomaly_tables(cursor)
+        if self._loaded:
+            return
+        with self._lock:
+            for subject, metric, state in cursor.execute(
+                    "SELECT subject, metric, state FROM anomaly_state").fetchall():
+                self.states[(subject, metric)] = MetricState.load(state)
+            self._loaded = True
+
+    def pending(self):
+        return AnomalyChanges()
+
+    def update(self, cursor, subject, values, ts, changes):
+        """
+        Fold one stored row's numeric {metric: value} into `changes` (from
+        pending()) and record anomalies through `cursor`. Returns
+        [(metric, value, score)] for the values that scored at or above
+        RECORD_Z; call commit(changes) once the caller has committed.
+        """
+        hour  = int(ts[11:13]) if len(ts) >= 13 else 0
+        found = []
+        with self._lock:
+            for metric, x in values.items():
+                if x is None:
+                    continue
+                key = (subject, metric)
+                st  = changes.states.get(key)
+                if st is None:
+                    live = self.states.get(key)
+                    st = changes.states[key] = live.copy() if live is not None else MetricState()
+                score, baseline = st.observe(x, hour)
+                st.at = ts
+                changes.saved.pop(key, None)        # newer than any checkpoint row written so far
+                if score is not None and score >= RECORD_Z:
+                    cursor.execute("INSERT INTO anomalies (subject, metric, value, score, baseline, created_at) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", (subject, metric, x, score, baseline, ts))
+                    found.append((metric, x, score))
+            if changes.ckpt_at is None and time.monotonic() - self._last_ckpt >= CHECKPOINT_S:
+                self._checkpoint(cursor, ts, changes)
+        return found
+
+    def _checkpoint(self, cursor, ts, changes):
+        current = {key: self.states[key] for key in self._dirty}
+        current.update(changes.states)
+        cursor.executemany("INSERT OR REPLACE INTO anomaly_state VALUES (?, ?, ?, ?)",
+                           [(s, m, st.dump(), ts) for (s, m), st in current.items()])
+        changes.saved   = current
+        changes.ckpt_at = time.monotonic()
+
+    def commit(self, changes):
+        """Install a committed transaction's states; only what its checkpoint wrote stops being dirty."""
+        with self._lock:
+            self.states.update(changes.states)
+            self._dirty.update(changes.states)
+            for key, st in changes.saved.items():
+                if self.states.get(key) is st:
+                    self._dirty.discard(key)
+            if changes.ckpt_at is not None:
+                self._last_ckpt = changes.ckpt_at
+
+    def top(self, limit=10, subject=None):
+        """Current (latest-value) scores, highest first; metrics still warming up are skipped."""
+        with self._lock:
+            rows = [{"subject": s, "metric": m, "value": st.last, "score": st.score,
+                     "mean": round(st.ew_mean, 4), "std": round(math.sqrt(st.ew_var), 4),
+                     "samples": st.n, "at": st.at}
+                    for (s, m), st in self.states.items()
+                    if st.score is not None and (subject is None or s == subject)]
+        rows.sort(key=lambda r: -r["score"])
+        return rows[:limit]
@@ -5,38 +5,49 @@ Run: pip install flask flask-cors
 Server runs on http://localhost:4002
 """
 
-import os, json, random, hashlib, base64, hmac, datetime, uuid, struct
-from flask import Flask, request, jsonify
+import os, json, time, random, hashlib, base64, hmac, datetime, uuid, struct, sqlite3, csv, io, zlib, queue
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+from shield_match import signature_for, ensure_lsh_tables, find_near_duplicates, \
+    store_signature, NEAR_DUP_THRESHOLD
+from traffic_capture import capture_from_env
+from metric_providers import MetricEngine, SOURCES_FILE
+from risk_scoring import RiskEngine, risk_level
+from network_layout import NetworkEngine, view as network_view
+from alerting import AlertEngine, parse_number
+from anomaly import AnomalyDetector
+from reports import get_report
+from response_layer import install_response_layer, columnar, wants_columnar
+from conditional import conditional, DataVersion
+from admission import AdmissionController
+from shield_stream import read_embed_stream, StreamError, MAX_UPLOAD
+from shield_artifacts import ensure_artifact_tables, field_artifact, store_artifacts, \
+                             purge_legacy_artifacts, ArtifactKey
+from storage import Storage
+from gfns_db_core import FTS_PATH
+from history import query_page, ensure_history_indexes, CursorError, FILTERS as HISTORY_FILTERS, \
+    DEFAULT_PAGE as HISTORY_PAGE, MAX_PAGE as HISTORY_MAX_PAGE
+from dup_store import from_env as dup_store_from_env
+from console import R, G, Y, B, M, C, W, DIM, BLD, RST, banner, log, section
 
 app = Flask(__name__)
 CORS(app)
+CAPTURE_PATH = capture_from_env(app)     # opt-in: GFNS_CAPTURE=<file>
+install_response_layer(app)              # orjson + gzip/br above 1 KB
+ADMISSION = AdmissionController.from_env().install(app)   # per-route slots, queues, token buckets
 
-SHIELD_STORE = {}
+DUPLICATES = dup_store_from_env()     # seen idHashes: in-process, or shared across nodes (GFNS_DUP_STORE)
+SHIELD_KEY = ArtifactKey.from_env()   # seals stored shield artifacts (GFNS_SHIELD_KEY); unset: sizes only
 
-R   = "\033[91m"
-G   = "\033[92m"
-Y   = "\033[93m"
-B   = "\033[94m"
-M   = "\033[95m"
-C   = "\033[96m"
-W   = "\033[97m"
-DIM = "\033[2m"
-BLD = "\033[1m"
-RST = "\033[0m"
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gfns_data.db")
+STORAGE = Storage(DB_PATH)         # single file, or table families sharded across files (storage.py)
+RISK    = RiskEngine(DB_PATH, connect=lambda: STORAGE.reader())   # cached per-institution scores
+NETWORK = NetworkEngine(RISK, connect=lambda: STORAGE.reader())   # counterparty graph + layout, per version
+ALERTS  = AlertEngine.from_env()   # threshold rules checked on every stored health row
+ANOMALY = AnomalyDetector()        # online per-metric baselines, scored on the same rows
+DB_VERSION = DataVersion(lambda: tuple(STORAGE.files()),    # moves on every commit to any file —
+                         lambda _files: STORAGE.reader(check_same_thread=False))   # ETag source
 
-def banner(title, colour=C):
-    line = "=" * 60
-    print(f"\n{colour}{BLD}{line}{RST}")
-    print(f"{colour}{BLD}  {title}{RST}")
-    print(f"{colour}{BLD}{line}{RST}")
-
-def log(label, value, colour=W):
-    print(f"  {DIM}|{RST} {Y}{label:<28}{RST} {colour}{value}{RST}")
-
-def section(title):
-    dashes = "-" * (50 - len(title))
-    print(f"\n  {DIM}-- {title} {dashes}{RST}")
 
 def timestamp():
     return datetime.datetime.now().strftime("%H:%M:%S")
@@ -77,48 +88,6 @@ def encrypt_payload(plaintext, passphrase="default-gfns-key"):
     }
 
 
-# =====================================================================
-#  RANDOM IDENTITY DATA GENERATOR — new values every single call
-# =====================================================================
-
-FIRST_NAMES = ["Arjun","Priya","Rahul","Sneha","Vikram","Ananya","Rohit","Kavya",
-                "James","Emma","Liam","Olivia","Noah","Ava","William","Sophia",
-                "Ahmed","Fatima","Omar","Zara","Wei","Mei","Hiroshi","Yuki"]
-LAST_NAMES  = ["Sharma","Patel","Singh","Kumar","Gupta","Nair","Reddy","Joshi",
-                "Smith","Johnson","Williams","Brown","Jones","Garcia","Martinez",
-                "Ali","Khan","Hassan","Ibrahim","Chen","Wang","Tanaka","Sato"]
-DOMAINS     = ["gmail.com","yahoo.com","outlook.com","protonmail.com","icloud.com","hotmail.com"]
-ID_TYPES    = ["Passport","Aadhaar","PAN Card","Driver License","National ID","Voter ID"]
-BANKS       = ["HDFC Bank","ICICI Bank","SBI","Axis Bank","Kotak","Yes Bank",
-               "Chase","Barclays","HSBC","Deutsche Bank","Citi","BNP Paribas"]
-CARD_PREFIXES = ["4111","4532","4929","5234","5412","5500","3782","3714"]
-
-def random_identity():
-    """Generate a completely random realistic identity every call."""
-    first  = random.choice(FIRST_NAMES)
-    last   = random.choice(LAST_NAMES)
-    age    = random.randint(22, 68)
-    phone  = f"+{random.randint(1,99)}-{random.randint(6000000000,9999999999)}"
-    email  = f"{first.lower()}.{last.lower()}{random.randint(1,999)}@{random.choice(DOMAINS)}"
-    card   = f"{random.choice(CARD_PREFIXES)}-{''.join([str(random.randint(0,9)) for _ in range(4)])}-{''.join([str(random.randint(0,9)) for _ in range(4)])}-{''.join([str(random.randint(0,9)) for _ in range(4)])}"
-    id_type = random.choice(ID_TYPES)
-    id_num  = f"{''.join([str(random.randint(0,9)) for _ in range(10)])}"
-    bank    = random.choice(BANKS)
-    balance = round(random.uniform(1200, 950000), 2)
-    risk    = random.choice(["LOW","MODERATE","ELEVATED","HIGH"])
-    return {
-        "name":    f"{first} {last}",
-        "age":     str(age),
-        "phone":   phone,
-        "email":   email,
-        "card":    card,
-        "id_type": id_type,
-        "id_num":  id_num,
-        "bank":    bank,
-        "balance": f"${balance:,.2f}",
-        "risk":    risk,
-    }
-
 def mask(val, show=2):
     """Mask middle of a string, show only first and last N chars."""
     s = str(val)
@@ -128,20 +97,80 @@ def mask(val, show=2):
 
 
 @app.route("/api/data/dashboard", methods=["GET"])
+@conditional(version=lambda: (DB_VERSION(), ALERTS.active_count()), max_age=5)
 def dashboard():
-    score  = rand_score(74, 12)
+    summary = RISK.results()["summary"]
+    if summary["score"] is not None:
+        score  = round(summary["score"])
+        risk   = risk_level(summary["score"], summary["zones"])
+        active = summary["institutions"]
+        source = f"risk engine — {summary['scored']} institutions scored"
+    else:
+        # No institution data loaded yet: keep the synthetic feed
+        score  = rand_score(74, 12)
+        risk   = random.choice(["Low", "Moderate", "Elevated", "High"])
+        active = random.randint(55, 68)
+        source = "synthetic (no institution data)"
     status = status_from_score(score)
     uptime = f"{rand_pct(99.1, 99.99):.2f}%"
-    risk   = random.choice(["Low", "Moderate", "Elevated", "High"])
     banner(f"DASHBOARD REQUEST  [{timestamp()}]", B)
     log("Endpoint",            "GET /api/data/dashboard")
+    log("Score Source",        source,                       C)
     log("System Score",        f"{score}/100",              colour_for_status(status))
     log("Status",              status.upper(),               colour_for_status(status))
     log("Uptime",              uptime,                       G)
     log("Risk Level",          risk,                         Y if risk in ("Moderate","Elevated") else (R if risk=="High" else G))
-    log("Active Institutions", str(random.randint(55, 68)))
-    log("Alerts Pending",      str(random.randint(0, 7)))
-    return jsonify({"score": score, "status": status, "uptime": uptime, "riskLevel": risk, "ts": timestamp()})
+    log("Active Institutions", str(active))
+    log("Alerts Pending",      str(ALERTS.active_count()))
+    return jsonify({"score": score, "status": status, "uptime": uptime, "riskLevel": risk,
+                    "activeAlerts": ALERTS.active_count(), "ts": timestamp()})
+
+
+@app.route("/api/risk/scores", methods=["GET"])
+@conditional(version=DB_VERSION, max_age=30)
+def risk_scores():
+    """Per-institution Z-score, zone and composite, worst first; ?zone=DISTRESS filters."""
+    result = RISK.results()
+    rows   = result["institutions"]
+    zone   = request.args.get("zone")
+    if zone:
+        rows = [r for r in rows if r["zone"] == zone.upper()]
+    rows = sorted(rows, key=lambda r: (r["composite"] is None, r["composite"] or 0))
+    banner(f"RISK SCORES  [{timestamp()}]", B)
+    log("Endpoint",     "GET /api/risk/scores")
+    log("Institutions", f"{result['summary']['scored']} scored of {result['summary']['institutions']}")
+    log("Zones",        ", ".join(f"{k} {v}" for k, v in result["summary"]["zones"].items()))
+    return jsonify({"summary": result["summary"], "institutions": rows, "ts": timestamp()})
+
+
+@app.route("/api/network", methods=["GET"])
+@conditional(version=lambda: (DB_VERSION(), NETWORK.version()), max_age=60)   # layout swaps in after a rebuild
+def network_map():
+    """
+    Counterparty graph with precomputed layout (network_layout.py), coordinates
+    in 0..1. ?lod=auto|full|clusters picks institutions or communities;
+    ?cluster=N returns one community's institutions.
+    """
+    lod     = request.args.get("lod", "auto").lower()
+    cluster = request.args.get("cluster", type=int)
+    if lod not in ("auto", "full", "clusters"):
+        return jsonify({"error": "lod must be auto, full or clusters"}), 400
+    network = NETWORK.results()
+    if cluster is not None and not 0 <= cluster < len(network["clusters"]):
+        return jsonify({"error": f"no cluster {cluster}"}), 404
+    shown = network_view(network, lod, cluster)
+    banner(f"NETWORK MAP  [{timestamp()}]", B)
+    log("Endpoint",     "GET /api/network")
+    log("Source",       network["source"], C if network["source"] != "sample" else Y)
+    log("Graph",        f"{len(network['nodes'])} institutions, {len(network['edges'])} exposures, "
+                        f"{len(network['clusters'])} clusters")
+    log("Layout",       f"version {network['version']}, built in {network['layoutMs']} ms")
+    log("Level",        f"{shown['lod']} — {len(shown['nodes'])} nodes, {len(shown['edges'])} edges", G)
+    return jsonify({**shown, "nodes": columnar(shown["nodes"]) if wants_columnar() else shown["nodes"],
+                    "version": network["version"], "source": network["source"],
+                    "summary": {"institutions": len(network["nodes"]), "exposures": len(network["edges"]),
+                                "clusters": len(network["clusters"]), "layoutMs": network["layoutMs"]},
+                    "ts": timestamp()})
 
 
 @app.route("/api/data/instability-timeline", methods=["GET"])
@@ -164,7 +193,8 @@ def instability_timeline():
     log("Trend",        trend, G if "Improv" in trend else R)
     log("Peak",         f"{max(p['score'] for p in points):.1f}", G)
     log("Trough",       f"{min(p['score'] for p in points):.1f}", R)
-    return jsonify({"range": range_param, "dataPoints": points, "average": avg, "trend": trend})
+    return jsonify({"range": range_param, "dataPoints": columnar(points) if wants_columnar() else points,
+                    "average": avg, "trend": trend})
 
 
 HEALTH_CONFIGS = {
@@ -214,6 +244,95 @@ HEALTH_CONFIGS = {
     },
 }
 
+# Real feeds for HEALTH_CONFIGS metrics; anything not routed stays random
+METRICS = MetricEngine.from_file(os.environ.get("GFNS_METRIC_SOURCES", SOURCES_FILE)).start()
+
+RISK_LEVELS  = ["LOW", "MODERATE", "ELEVATED", "HIGH"]
+RISK_ACTIONS = [
+    "Monitor - within acceptable bounds",
+    "Alert - approaching regulatory threshold",
+    "Intervene - breaching stress trigger",
+    "Escalate - immediate board notification required",
+]
+
+# modal key -> (table, [(column, metric name)]) — one dedicated table per modal
+HEALTH_TABLES = {
+    "bankCapital": ("bank_capital_adequacy", [
+        ("tier1_capital_ratio",      "Tier-1 Capital Ratio"),
+        ("cet1_ratio",               "CET1 Ratio"),
+        ("capital_conservation_buf", "Capital Conservation Buf"),
+        ("risk_weighted_assets",     "Risk-Weighted Assets"),
+        ("leverage_ratio",           "Leverage Ratio"),
+        ("dscr",                     "DSCR"),
+    ]),
+    "liquidityCoverage": ("liquidity_coverage", [
+        ("lcr",                "LCR"),
+        ("hqla_buffer",        "HQLA Buffer"),
+        ("net_cash_outflow",   "Net Cash Outflow (30d)"),
+        ("intraday_liquidity", "Intraday Liquidity"),
+        ("repo_market_access", "Repo Market Access"),
+        ("cb_facility_util",   "CB Facility Util"),
+    ]),
+    "debtExposure": ("debt_exposure", [
+        ("sovereign_debt_exposure", "Sovereign Debt Exposure"),
+        ("non_performing_loans",    "Non-Performing Loans"),
+        ("loan_to_deposit_ratio",   "Loan-to-Deposit Ratio"),
+        ("interbank_exposure",      "Interbank Exposure"),
+        ("credit_default_swaps",    "Credit Default Swaps"),
+        ("concentration_risk",      "Concentration Risk"),
+    ]),
+    "solvencyStress": ("solvency_stress", [
+        ("stress_index",        "Stress Index"),
+        ("z_score_altman",      "Z-Score (Altman)"),
+        ("equity_volatility",   "Equity Volatility"),
+        ("bail_in_eligibility", "Bail-in Eligibility"),
+        ("contagion_index",     "Contagion Index"),
+        ("recovery_rate",       "Recovery Rate"),
+    ]),
+}
+
+def store_health_rows(cursor, results, ts_now):
+    """
+    Insert [(key, metrics, risk_level, action)] into each modal's table.
+    Rows for the same table go in one executemany; the caller owns the
+    transaction, so a whole snapshot commits (or rolls back) together.
+    Anomaly scores and detector checkpoints are written in the same transaction.
+    Returns the alert and anomaly engines' pending state: hand it to
+    commit_health_rows() after the commit; on rollback, just drop it.
+    """
+    by_key, alerts, anomalies = {}, ALERTS.pending(), ANOMALY.pending()
+    ALERTS.restore(cursor)
+    ANOMALY.load(cursor)
+    for key, metrics, risk_lvl, action in results:
+        table, cols = HEALTH_TABLES[key]
+        by_key.setdefault(key, []).append(
+            tuple(metrics.get(name, "") for _, name in cols) + (risk_lvl, action, ts_now))
+        ALERTS.evaluate(cursor, table, metrics, ts_now, alerts)
+        ANOMALY.update(cursor, table, {m: parse_number(v) for m, v in metrics.items()}, ts_now, anomalies)
+    for key, rows in by_key.items():
+        table, cols = HEALTH_TABLES[key]
+        names = [c for c, _ in cols] + ["risk_level", "action", "created_at"]
+        target = STORAGE.create_table(cursor, table, "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                                      + ", ".join(f"{c} TEXT" for c in names))
+        # Tables made by create_db.py carry an older layout — add what's missing
+        have = set(STORAGE.columns(cursor, table))
+        for c in names:
+            if c not in have:
+                cursor.execute(f"ALTER TABLE {target} ADD COLUMN {c} TEXT")
+        if not have.issuperset(names):          # created_at or a filter column just arrived
+            ensure_history_indexes(cursor, table, STORAGE.schema(table))
+        cursor.executemany(
+            f"INSERT INTO {target} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})", rows)
+    return alerts, anomalies
+
+def commit_health_rows(pending):
+    """Once store_health_rows' transaction has committed: apply its engine state, push new alerts."""
+    alerts, anomalies = pending
+    ANOMALY.commit(anomalies)
+    fired = ALERTS.commit(alerts)
+    ALERTS.publish(fired)
+    return fired
+
 @app.route("/api/health/modal", methods=["POST"])
 def health_modal():
     body = request.get_json(force=True) or {}
@@ -226,164 +345,143 @@ def health_modal():
     section("Live Metrics")
     result_metrics = {}
     for name, fn, note in cfg["metrics"]:
-        val = fn()
+        val = METRICS.value(name, fn)
         result_metrics[name] = val
         note_str = f"  ({note})" if note else ""
         print(f"    {W}{name:<32}{RST} {G}{val}{RST}{DIM}{note_str}{RST}")
     section("Risk Assessment")
-    risk_lvl = random.choice(["LOW", "MODERATE", "ELEVATED", "HIGH"])
-    action   = random.choice([
-        "Monitor - within acceptable bounds",
-        "Alert - approaching regulatory threshold",
-        "Intervene - breaching stress trigger",
-        "Escalate - immediate board notification required",
-    ])
+    risk_lvl = random.choice(RISK_LEVELS)
+    action   = random.choice(RISK_ACTIONS)
     print(f"    {Y}Risk Level  :{RST}  {risk_lvl}")
     print(f"    {Y}Recommended :{RST}  {action}")
 
     # ── STORE TO DATABASE — each modal → its own dedicated table ────
     section("Storage")
-    import sqlite3
-    ts_now  = datetime.datetime.now().isoformat()
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gfns_data.db")
-    conn    = sqlite3.connect(db_path)
-    cursor  = conn.cursor()
-
-    if key == "bankCapital":
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bank_capital_adequacy (
-                id                       INTEGER PRIMARY KEY AUTOINCREMENT,
-                tier1_capital_ratio      TEXT,
-                cet1_ratio               TEXT,
-                capital_conservation_buf TEXT,
-                risk_weighted_assets     TEXT,
-                leverage_ratio           TEXT,
-                dscr                     TEXT,
-                risk_level               TEXT,
-                action                   TEXT,
-                created_at               TEXT
-            )
-        """)
-        cursor.execute("""
-            INSERT INTO bank_capital_adequacy
-            (tier1_capital_ratio, cet1_ratio, capital_conservation_buf,
-             risk_weighted_assets, leverage_ratio, dscr,
-             risk_level, action, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            result_metrics.get("Tier-1 Capital Ratio", ""),
-            result_metrics.get("CET1 Ratio", ""),
-            result_metrics.get("Capital Conservation Buf", ""),
-            result_metrics.get("Risk-Weighted Assets", ""),
-            result_metrics.get("Leverage Ratio", ""),
-            result_metrics.get("DSCR", ""),
-            risk_lvl, action, ts_now
-        ))
-        log("Database Saved", "YES — bank_capital_adequacy", G)
-
-    elif key == "liquidityCoverage":
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS liquidity_coverage (
-                id                  INTEGER PRIMARY KEY AUTOINCREMENT,
-                lcr                 TEXT,
-                hqla_buffer         TEXT,
-                net_cash_outflow    TEXT,
-                intraday_liquidity  TEXT,
-                repo_market_access  TEXT,
-                cb_facility_util    TEXT,
-                risk_level          TEXT,
-                action              TEXT,
-                created_at          TEXT
-            )
-        """)
-        cursor.execute("""
-            INSERT INTO liquidity_coverage
-            (lcr, hqla_buffer, net_cash_outflow, intraday_liquidity,
-             repo_market_access, cb_facility_util,
-             risk_level, action, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            result_metrics.get("LCR", ""),
-            result_metrics.get("HQLA Buffer", ""),
-            result_metrics.get("Net Cash Outflow (30d)", ""),
-            result_metrics.get("Intraday Liquidity", ""),
-            result_metrics.get("Repo Market Access", ""),
-            result_metrics.get("CB Facility Util", ""),
-            risk_lvl, action, ts_now
-        ))
-        log("Database Saved", "YES — liquidity_coverage", G)
-
-    elif key == "debtExposure":
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS debt_exposure (
-                id                      INTEGER PRIMARY KEY AUTOINCREMENT,
-                sovereign_debt_exposure TEXT,
-                non_performing_loans    TEXT,
-                loan_to_deposit_ratio   TEXT,
-                interbank_exposure      TEXT,
-                credit_default_swaps    TEXT,
-                concentration_risk      TEXT,
-                risk_level              TEXT,
-                action                  TEXT,
-                created_at              TEXT
-            )
-        """)
-        cursor.execute("""
-            INSERT INTO debt_exposure
-            (sovereign_debt_exposure, non_performing_loans, loan_to_deposit_ratio,
-             interbank_exposure, credit_default_swaps, concentration_risk,
-             risk_level, action, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            result_metrics.get("Sovereign Debt Exposure", ""),
-            result_metrics.get("Non-Performing Loans", ""),
-            result_metrics.get("Loan-to-Deposit Ratio", ""),
-            result_metrics.get("Interbank Exposure", ""),
-            result_metrics.get("Credit Default Swaps", ""),
-            result_metrics.get("Concentration Risk", ""),
-            risk_lvl, action, ts_now
-        ))
-        log("Database Saved", "YES — debt_exposure", G)
-
-    elif key == "solvencyStress":
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS solvency_stress (
-                id                INTEGER PRIMARY KEY AUTOINCREMENT,
-                stress_index      TEXT,
-                z_score_altman    TEXT,
-                equity_volatility TEXT,
-                bail_in_eligibility TEXT,
-                contagion_index   TEXT,
-                recovery_rate     TEXT,
-                risk_level        TEXT,
-                action            TEXT,
-                created_at        TEXT
-            )
-        """)
-        cursor.execute("""
-            INSERT INTO solvency_stress
-            (stress_index, z_score_altman, equity_volatility,
-             bail_in_eligibility, contagion_index, recovery_rate,
-             risk_level, action, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            result_metrics.get("Stress Index", ""),
-            result_metrics.get("Z-Score (Altman)", ""),
-            result_metrics.get("Equity Volatility", ""),
-            result_metrics.get("Bail-in Eligibility", ""),
-            result_metrics.get("Contagion Index", ""),
-            result_metrics.get("Recovery Rate", ""),
-            risk_lvl, action, ts_now
-        ))
-        log("Database Saved", "YES — solvency_stress", G)
-
-    conn.commit()
-    conn.close()
+    ts_now = datetime.datetime.now().isoformat()
+    if key in HEALTH_TABLES:
+        conn = STORAGE.connect()
+        try:
+            with conn:
+                pending = store_health_rows(conn.cursor(), [(key, result_metrics, risk_lvl, action)], ts_now)
+        finally:
+            conn.close()
+        fired = commit_health_rows(pending)
+        log("Database Saved", f"YES — {HEALTH_TABLES[key][0]}", G)
+        for a in fired:
+            log("Alert Raised", f"[{a['severity']}] {a['message']} — {a['value']}", R)
     log("Stored At", ts_now, G)
 
     return jsonify({"key": key, "label": cfg["label"], "metrics": result_metrics, "risk": risk_lvl, "action": action, "ts": timestamp()})
 
 
+@app.route("/api/health/snapshot", methods=["GET", "POST"])
+def health_snapshot():
+    """
+    Every health modal (or ?keys=a,b / {"keys": [...]}) in one round trip:
+    all metrics generated in one pass, all rows stored in one transaction.
+    """
+    if request.method == "POST":
+        keys = (request.get_json(silent=True) or {}).get("keys")
+    else:
+        keys = [k for k in request.args.get("keys", "").split(",") if k]
+    keys = list(keys or HEALTH_CONFIGS)
+    unknown = [k for k in keys if k not in HEALTH_CONFIGS]
+    if unknown:
+        return jsonify({"error": f"unknown health keys: {', '.join(unknown)}",
+                        "valid": list(HEALTH_CONFIGS)}), 400
+
+    banner(f"HEALTH SNAPSHOT  [{timestamp()}]", C)
+    log("Endpoint",   f"{request.method} /api/health/snapshot")
+    log("Categories", ", ".join(keys))
+
+    results = [(key,
+                {name: METRICS.value(name, fn) for name, fn, _ in HEALTH_CONFIGS[key]["metrics"]},
+                random.choice(RISK_LEVELS),
+                random.choice(RISK_ACTIONS)) for key in keys]
+
+    section("Storage")
+    ts_now = datetime.datetime.now().isoformat()
+    conn   = STORAGE.connect()
+    try:
+        with conn:
+            pending = store_health_rows(conn.cursor(), results, ts_now)
+    except sqlite3.Error as e:
+        log("Database Saved", f"NO — {e}", R)
+        return jsonify({"error": f"snapshot not stored: {e}"}), 500
+    finally:
+        conn.close()
+    fired = commit_health_rows(pending)
+    log("Database Saved", f"YES — {len(results)} rows, one transaction", G)
+    log("Alerts Raised",  str(len(fired)), R if fired else G)
+    for key, _, risk_lvl, _ in results:
+        log(HEALTH_CONFIGS[key]["label"], risk_lvl, G if risk_lvl in ("LOW", "MODERATE") else R)
+
+    return jsonify({
+        "categories": {key: {"key": key, "label": HEALTH_CONFIGS[key]["label"], "metrics": metrics,
+                             "risk": risk_lvl, "action": action}
+                       for key, metrics, risk_lvl, action in results},
+        "alerts":   fired,
+        "storedAt": ts_now,
+        "ts":       timestamp(),
+    })
+
+
+@app.route("/api/alerts", methods=["GET"])
+@conditional(version=DB_VERSION)
+def list_alerts():
+    """Stored alerts, newest first; ?state=ACTIVE|RESOLVED, ?limit= (max 500), ?shape=columnar."""
+    state = request.args.get("state", "").upper()
+    try:
+        limit = max(1, min(500, int(request.args.get("limit", 100))))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    conn = STORAGE.reader()         # the alerts table and restored state are set up at startup
+    conn.row_factory = sqlite3.Row
+    try:
+        sql    = "SELECT * FROM alerts" + (" WHERE state = ?" if state else "") + " ORDER BY id DESC LIMIT ?"
+        params = ([state] if state else []) + [limit]
+        rows   = [dict(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+    return jsonify({"alerts": columnar(rows) if wants_columnar() else rows, "active": ALERTS.active_count(),
+                    "suppressed": ALERTS.suppressed, "ts": timestamp()})
+
+
+@app.route("/api/alerts/stream", methods=["GET"])
+def stream_alerts():
+    """Server-sent events: one `alert` event per newly raised alert, heartbeat comments in between."""
+    q = ALERTS.subscribe()
+    def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    alert = q.get(timeout=15)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: alert\nid: {alert['id']}\ndata: {json.dumps(alert)}\n\n"
+        finally:
+            ALERTS.unsubscribe(q)
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/api/anomalies/top", methods=["GET"])
+@conditional(version=DB_VERSION)
+def top_anomalies():
+    """
+    Current anomaly score of every tracked metric, highest first; ?limit= (max
+    200), ?table=. Served from ANOMALY's memory, loaded from its checkpoint at startup.
+    """
+    try:
+        limit = max(1, min(200, int(request.args.get("limit", 20))))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"anomalies": ANOMALY.top(limit, request.args.get("table") or None),
+                    "tracked": len(ANOMALY.states), "ts": timestamp()})
+
+
 SHOCK_SCENARIOS = {
     "liquidityCrisis": {
         "label": "Liquidity Crisis",
@@ -456,27 +554,13 @@ def inject_shock():
 
     # ── STORE TO DATABASE — scenario → its own dedicated table ──────
     section("Storage")
-    import sqlite3
 
     ts_now = datetime.datetime.now().isoformat()
 
-    # Try multiple likely db paths so it always finds the right file
-    script_dir   = os.path.dirname(os.path.abspath(__file__))
-    db_candidates = [
-        os.path.join(script_dir, "gfns_data.db"),
-        os.path.join(os.getcwd(), "gfns_data.db"),
-        "gfns_data.db",
-    ]
-    db_path = db_candidates[0]
-    for candidate in db_candidates:
-        if os.path.exists(candidate):
-            db_path = candidate
-            break
-
-    log("DB Path", db_path, C)
+    log("DB Path", DB_PATH, C)
 
     try:
-        conn   = sqlite3.connect(db_path)
+        conn   = STORAGE.connect()
         cursor = conn.cursor()
 
         # Map scenario → table name + columns + values
@@ -547,12 +631,15 @@ def inject_shock():
             },
         }
 
+        # Shock rows are simulated outcomes, not readings: they bypass ALERTS and
+        # ANOMALY so a what-if neither raises alerts nor shifts the baselines.
         if scenario in TABLE_MAP:
             m = TABLE_MAP[scenario]
+            target = STORAGE.q(m["table"])      # alias.table when the family has its own file
             # Create table
-            cursor.execute(m["create"])
+            cursor.execute(m["create"].replace(m["table"], target, 1))
             # Add any missing columns safely (in case table existed with old schema)
-            existing_cols = {row[1] for row in cursor.execute(f"PRAGMA table_info({m['table']})")}
+            existing_cols = set(STORAGE.columns(cursor, m["table"]))
             needed_cols   = ["scenario","hub_bank","institutions_affected","failed_nodes",
                              "stressed_nodes","system_impact","contagion_index",
                              "recovery_horizon","wave1","wave2","wave3","wave4","wave5",
@@ -560,12 +647,13 @@ def inject_shock():
             for col in needed_cols:
                 if col not in existing_cols:
                     try:
-                        cursor.execute(f"ALTER TABLE {m['table']} ADD COLUMN {col} TEXT")
+                        cursor.execute(f"ALTER TABLE {target} ADD COLUMN {col} TEXT")
                     except Exception:
                         pass
+            ensure_history_indexes(cursor, m["table"], STORAGE.schema(m["table"]))
             # Insert
             placeholders = ",".join(["?"] * len(m["vals"]))
-            cursor.execute(f"INSERT INTO {m['table']} {m['cols']} VALUES ({placeholders})", m["vals"])
+            cursor.execute(f"INSERT INTO {target} {m['cols']} VALUES ({placeholders})", m["vals"])
             conn.commit()
             log("Database Saved", f"YES — {m['table']} ({cursor.lastrowid} rows total)", G)
         else:
@@ -702,18 +790,7 @@ def shield_submit():
     log("ID Hash",    (id_hash[:20] + "...") if len(id_hash) > 20 else id_hash, C)
 
     # ── FRAUD CHECK ─────────────────────────────────────────────────
-    section("Fraud & Duplicate Check")
-    is_duplicate = id_hash in SHIELD_STORE
-    if is_duplicate:
-        stored = SHIELD_STORE[id_hash]
-        print(f"    {R}{BLD}WARNING: DUPLICATE DETECTED!{RST}")
-        print(f"    {R}   Matches record stored at : {stored['ts']}{RST}")
-        print(f"    {R}   Record ID : {stored['record_id']}{RST}")
-        fraud_verdict = "DUPLICATE - possible identity reuse"
-    else:
-        print(f"    {G}OK  No duplicate found — identity hash is unique{RST}")
-        fraud_verdict = "CLEAN - no prior record"
-    log("Fraud Verdict", fraud_verdict, R if is_duplicate else G)
+    is_duplicate, fraud_verdict, claim = fraud_check(id_hash)
 
     # ────────────────────────────────────────────────────────────────
     # The frontend sends the AES-GCM encrypted embed token.
@@ -747,7 +824,7 @@ def shield_submit():
     # ── STEP 2: SHOW ENCODING (raw → bits) ──────────────────────────
     section("STEP 2 — Encoding: Raw Data → Binary Bits")
     print(f"    {DIM}(Raw data entered by user is converted to 8-bit binary){RST}")
-    print(f"    {DIM}(Raw values are NEVER stored — only their bit representation){RST}")
+    print(f"    {DIM}(Raw values are NEVER stored — only a copy sealed under the operator key, and its HMAC){RST}")
     if raw_bits:
         for field, bits in raw_bits.items():
             actual = decode_from_bits(bits)
@@ -823,70 +900,179 @@ def shield_submit():
             decoded = decode_from_bits(dec_b)
             print(f"    {Y}  {ex_field:<10}{RST}  {R}{enc_obj['cipher'][:38]}...{RST}  {G}{decoded}{RST}")
 
-    # ── STORE ────────────────────────────────────────────────────────
-    section("Storage")
+    # ── NEAR-DUPLICATE CHECK + STORE ────────────────────────────────
+    decoded   = {f: decode_from_bits(b) for f, b in raw_bits.items()}
+    artifacts = [field_artifact(f, SHIELD_KEY, bits, decrypted_bits[f].strip() == bits.strip())
+                 for f, bits in raw_bits.items()]
+    return jsonify(record_identity(id_hash, decoded, is_duplicate, fraud_verdict, claim, artifacts))
 
-    record_id = str(uuid.uuid4())[:8].upper()
-    ts_now    = datetime.datetime.now().isoformat()
 
-    # Store in memory
-    SHIELD_STORE[id_hash] = {
-        "record_id": record_id,
-        "ts": ts_now
-    }
+def fraud_check(id_hash):
+    """
+    Exact idHash check: records this submission in DUPLICATES unless the hash
+    is already there, in one atomic step, so two nodes racing on the same
+    identity cannot both see it as new. Returns (is_duplicate, verdict, claim),
+    claim being the {"record_id", "ts"} this submission is stored under.
+    """
+    section("Fraud & Duplicate Check")
+    claim  = {"record_id": str(uuid.uuid4())[:8].upper(), "ts": datetime.datetime.now().isoformat()}
+    stored = DUPLICATES.check_and_record(id_hash, claim)
+    is_duplicate = stored is not None
+    if is_duplicate:
+        print(f"    {R}{BLD}WARNING: DUPLICATE DETECTED!{RST}")
+        print(f"    {R}   Matches record stored at : {stored['ts']}{RST}")
+        print(f"    {R}   Record ID : {stored['record_id']}{RST}")
+        fraud_verdict = "DUPLICATE - possible identity reuse"
+    else:
+        print(f"    {G}OK  No duplicate found — identity hash is unique{RST}")
+        fraud_verdict = "CLEAN - no prior record"
+    log("Fraud Verdict", fraud_verdict, R if is_duplicate else G)
+    return is_duplicate, fraud_verdict, claim
 
-    # Store in SQLite database
-    import sqlite3
-
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gfns_data.db")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Create table if not exists
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS identity_sessions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        session_id TEXT,
-        id_hash TEXT,
-        fraud_verdict TEXT,
-        is_duplicate INTEGER,
-        created_at TEXT
-    )
-    """)
-
-    # Insert record
-    cursor.execute("""
-    INSERT INTO identity_sessions
-    (session_id, id_hash, fraud_verdict, is_duplicate, created_at)
-    VALUES (?, ?, ?, ?, ?)
-    """, (
-        record_id,
-        id_hash,
-        fraud_verdict,
-        1 if is_duplicate else 0,
-        ts_now
-    ))
-
-    conn.commit()
-    conn.close()
+
+def record_identity(id_hash, decoded, is_duplicate, fraud_verdict, claim, artifacts=()):
+    """
+    Near-duplicate check and storage shared by /submit and /submit/stream.
+    `decoded` is {field: decoded value}; `claim` comes from fraud_check;
+    `artifacts` (shield_artifacts.field_artifact) are stored in the same
+    transaction as the session. Returns the response body.
+    """
+    # ── NEAR-DUPLICATE CHECK (MinHash / LSH) ────────────────────────
+    # The exact idHash check misses typos and reformatted values, so the
+    # decoded fields are also compared by MinHash signature. Only the
+    # signature is kept — never the decoded values themselves.
+    section("Near-Duplicate Check")
+    ts_now    = claim["ts"]
+    conn      = STORAGE.connect(ts_now)
+    try:
+        with conn:
+            cursor    = conn.cursor()
+            ensure_lsh_tables(cursor, STORAGE.schema("identity_signatures"))
+            signature = signature_for(decoded) if decoded else None
+            near_dups = find_near_duplicates(cursor, signature) if signature else []
+            best_sim  = near_dups[0][1] if near_dups else 0.0
+            is_near_duplicate = bool(near_dups) and not is_duplicate
+            if not signature:
+                print(f"    {DIM}  Skipped — no decoded fields to compare{RST}")
+            elif near_dups:
+                for match_id, score in near_dups:
+                    print(f"    {R if score >= 0.9 else Y}  Record {match_id:<10} similarity {score:.2f}{RST}")
+            else:
+                print(f"    {G}OK  No identity within similarity {NEAR_DUP_THRESHOLD:.2f}{RST}")
+            if is_near_duplicate:
+                fraud_verdict = "NEAR-DUPLICATE - similar identity on record"
+                log("Fraud Verdict", fraud_verdict, Y)
+
+            # ── STORE ────────────────────────────────────────────────
+            section("Storage")
+
+            record_id = claim["record_id"]
+
+            # Store in SQLite database
+
+            # Create table if not exists (in the shield file / this period's partition when sharded)
+            sessions = STORAGE.create_table(cursor, "identity_sessions", """
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT,
+                id_hash TEXT,
+                fraud_verdict TEXT,
+                is_duplicate INTEGER,
+                created_at TEXT
+            """, ts_now)
+
+            # Insert record
+            cursor.execute(f"""
+            INSERT INTO {sessions}
+            (session_id, id_hash, fraud_verdict, is_duplicate, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """, (
+                record_id,
+                id_hash,
+                fraud_verdict,
+                1 if is_duplicate else 0,
+                ts_now
+            ))
+            if signature:
+                store_signature(cursor, record_id, signature, ts_now)
+            if artifacts:
+                ensure_artifact_tables(cursor, STORAGE.schema("shield_fields"))
+                store_artifacts(cursor, STORAGE.q("shield_fields"), record_id, artifacts, ts_now)
+    except Exception:
+        if not is_duplicate:
+            DUPLICATES.release(id_hash, claim)    # the hash was recorded in fraud_check; the row was not
+        raise
+    finally:
+        conn.close()
 
     log("Record ID",     record_id,              G)
     log("Stored At",     ts_now,                 G)
-    log("Total Records", str(len(SHIELD_STORE)), C)
-    log("Database Saved", "YES — identity_sessions table", G)
+    total = DUPLICATES.count()
+    log("Total Records", "?" if total is None else str(total), C)
+    log("Database Saved", "YES — identity_sessions table"
+                          + (f" + {len(artifacts)} shield_fields rows" if artifacts else ""), G)
 
-    return jsonify({
-        "duplicate":    is_duplicate,
-        "fraudVerdict": fraud_verdict,
+    return {
+        "duplicate":     is_duplicate,
+        "nearDuplicate": is_near_duplicate,
+        "similarity":    best_sim,
+        "matches":       [{"recordId": m, "similarity": sc} for m, sc in near_dups],
+        "fraudVerdict":  fraud_verdict,
         "record": {
             "idHash":    id_hash,
             "record_id": record_id,
             "ts":        ts_now
         }
-    })
+    }
 
 
+@app.route("/submit/stream", methods=["POST"])
+def shield_submit_stream():
+    """
+    Framed AES-GCM upload (shield_stream.py) for payloads too large for /submit,
+    e.g. scanned KYC documents: decrypted and decoded as the body arrives.
+    X-Id-Hash carries the identity hash that /submit takes in its JSON body.
+    """
+    id_hash = request.headers.get("X-Id-Hash", "")
+    banner(f"FINANCIAL SHIELD — STREAMED UPLOAD  [{timestamp()}]", M)
+    log("Endpoint", "POST /submit/stream")
+    log("ID Hash",  (id_hash[:20] + "...") if len(id_hash) > 20 else id_hash, C)
+    if request.content_length is not None and request.content_length > MAX_UPLOAD:
+        return jsonify({"error": f"upload larger than {MAX_UPLOAD:,} bytes"}), 413
+
+    section("Streamed Decryption")
+    started = time.perf_counter()
+    try:
+        fields, frames, size = read_embed_stream(request.stream, mac_key=SHIELD_KEY.mac_key)
+    except ImportError as e:
+        log("AES-GCM", str(e), R)
+        return jsonify({"error": str(e)}), 501
+    except StreamError as e:
+        log("Rejected", str(e), R)
+        return jsonify({"error": str(e)}), 400
+    elapsed = time.perf_counter() - started
+    log("Frames",    f"{frames:,} authenticated", G)
+    log("Plaintext", f"{size / 1e6:,.2f} MB in {elapsed:.2f}s", G)
+    for f in fields.values():
+        shown = mask(f.value) if f.value is not None else f"{f.size:,} bytes, sha256 {f.summary()['sha256'][:16]}..."
+        print(f"    {Y}  {f.name:<10}{RST} {W}{shown}{RST}")
+
+    is_duplicate, fraud_verdict, claim = fraud_check(id_hash)
+    # Only inline (identity-sized) fields feed the MinHash signature; documents go by digest
+    decoded   = {name: f.value for name, f in fields.items() if f.value is not None}
+    artifacts = [field_artifact(name, SHIELD_KEY, packed=f.data, size=f.size, mac=f.mac(), decrypted_ok=True)
+                 for name, f in fields.items()]
+    result    = record_identity(id_hash, decoded, is_duplicate, fraud_verdict, claim, artifacts)
+    result["stream"] = {"frames": frames, "bytes": size,
+                        "fields": {name: f.summary() for name, f in fields.items()}}
+    return jsonify(result)
+
+
+def provider_states():
+    """Provider states only — a provider going STALE/ERROR must change the health ETag."""
+    return tuple(p.status()["state"] for p in METRICS.providers.values())
+
 @app.route("/api/system/health", methods=["GET"])
+@conditional(version=lambda: (DB_VERSION(), provider_states(), int(time.time() // 10)), max_age=10)
 def system_health():
     cpu    = rand_pct(18, 82)
     mem    = rand_pct(35, 78)
@@ -905,8 +1091,279 @@ def system_health():
     log("Active Sessions", str(random.randint(12, 480)), C)
     log("DB Connections",  str(random.randint(4, 40)),   C)
     overall = "HEALTHY" if cpu < 75 and mem < 70 else "DEGRADED" if cpu < 90 else "CRITICAL"
+    providers = METRICS.status([m[0] for cfg in HEALTH_CONFIGS.values() for m in cfg["metrics"]])
+    section("Metric Providers")
+    for p in providers:
+        detail = p["error"] or (f"{p['metrics']} metrics" + (f", {p['age_s']}s old, {p['fetch_ms']} ms"
+                                                              if p.get("age_s") is not None else ""))
+        log(f"{p['name']} ({p['type']})", f"{p['state']} — {detail}", G if p["state"] == "OK" else Y)
+    if overall == "HEALTHY" and any(p["state"] != "OK" for p in providers):
+        overall = "DEGRADED"
+    admission = ADMISSION.stats()
+    section("Admission Control")
+    for b in admission:
+        shed = b["shedQueueFull"] + b["shedDeadline"]
+        log(b["budget"], f"{b['inFlight']}/{b['concurrency']} running, queue {b['queueDepth']}/{b['queueLimit']}, "
+                         f"shed {shed}, rate-limited {b['rateLimited']}", Y if shed or b["rateLimited"] else G)
+    duplicates = DUPLICATES.status()
+    section("Duplicate Store")
+    log(duplicates["store"], duplicates.get("server", f"{duplicates.get('keys', 0)} hashes in process")
+        + (f" — {duplicates['state']}, {duplicates['fallbacks']} fallbacks" if "state" in duplicates else ""),
+        Y if duplicates.get("state") == "FALLBACK" else G)
+    if overall == "HEALTHY" and duplicates.get("state") == "FALLBACK":
+        overall = "DEGRADED"
     log("Overall Status",  overall, G if overall == "HEALTHY" else (Y if overall == "DEGRADED" else R))
-    return jsonify({"cpu": cpu, "memory": mem, "network": net, "disk": disk, "api_ms": api_ms, "uptime": uptime, "status": overall, "ts": timestamp()})
+    return jsonify({"cpu": cpu, "memory": mem, "network": net, "disk": disk, "api_ms": api_ms, "uptime": uptime, "status": overall,
+                    "metricProviders": providers, "admission": admission, "duplicateStore": duplicates,
+                    "ts": timestamp()})
+
+
+# =====================================================================
+#  STREAMING TABLE EXPORT — CSV / NDJSON straight out of SQLite
+#
+#  Rows are pulled with keyset pagination (WHERE id > last ORDER BY id)
+#  and written to the response one chunk at a time, so memory use is
+#  the same for 10 rows or 10 million. Every row carries its `id`, so
+#  an interrupted download resumes with ?after=<last id seen>.
+# =====================================================================
+
+EXPORT_TABLES = ("bank_capital_adequacy", "liquidity_coverage", "debt_exposure",
+                 "solvency_stress", "identity_sessions")
+EXPORT_CHUNK  = 2000
+
+# new tables and partitions get their /api/history indexes in the transaction that creates them
+STORAGE.on_create.append(lambda cursor, table, schema:
+                         table in EXPORT_TABLES and ensure_history_indexes(cursor, table, schema))
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def time_column(columns):
+    """Tables stamp rows with created_at (backend) or recorded_at (create_db.py)."""
+    for col in ("created_at", "recorded_at"):
+        if col in columns:
+            return col
+    return None
+
+def iter_table_rows(table, columns, after_id=0, since=None, until=None, chunk=EXPORT_CHUNK):
+    """Yield row tuples in id order, one keyset page per query."""
+    conn = STORAGE.reader()
+    try:
+        ts_col = time_column(table_columns(conn, table))
+        where, params = [], []
+        if since and ts_col:
+            where.append(f"{ts_col} >= ?")
+            params.append(since)
+        if until and ts_col:
+            where.append(f"{ts_col} < ?")
+            params.append(until)
+        extra  = "".join(f" AND {w}" for w in where)
+        sql    = f"SELECT {', '.join(columns)} FROM {table} WHERE id > ?{extra} ORDER BY id LIMIT ?"
+        id_idx = columns.index("id")
+        last   = after_id
+        while True:
+            rows = conn.execute(sql, [last, *params, chunk]).fetchall()
+            yield from rows
+            if len(rows) < chunk:
+                return
+            last = rows[-1][id_idx]
+    finally:
+        conn.close()
+
+def encode_csv(columns, rows):
+    buf    = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % EXPORT_CHUNK == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+def encode_ndjson(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), separators=(",", ":")))
+        if len(lines) == EXPORT_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def gzip_stream(chunks):
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits=31 -> gzip container
+    for text in chunks:
+        data = comp.compress(text.encode("utf-8"))
+        if data:
+            yield data
+    yield comp.flush()
+
+@app.route("/api/export/<table>", methods=["GET"])
+def export_table(table):
+    fmt      = request.args.get("format", "csv").lower()
+    gz       = request.args.get("gzip", "0").lower() in ("1", "true", "yes")
+    since    = request.args.get("since")
+    until    = request.args.get("until")
+    wanted   = [c.strip() for c in request.args.get("columns", "").split(",") if c.strip()]
+    try:
+        after_id = int(request.args.get("after", 0))
+    except ValueError:
+        return jsonify({"error": "after must be an integer row id"}), 400
+
+    if table not in EXPORT_TABLES:
+        return jsonify({"error": f"unknown table: {table}", "tables": list(EXPORT_TABLES)}), 404
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    conn     = STORAGE.reader()
+    existing = table_columns(conn, table)
+    conn.close()
+    if not existing:
+        return jsonify({"error": f"table {table} has not been created yet"}), 404
+    unknown = [c for c in wanted if c not in existing]
+    if unknown:
+        return jsonify({"error": f"unknown columns: {', '.join(unknown)}"}), 400
+    if (since or until) and not time_column(existing):
+        return jsonify({"error": f"{table} has no timestamp column to filter on"}), 400
+
+    columns = wanted or existing
+    if "id" not in columns:
+        columns = ["id"] + columns
+
+    banner(f"TABLE EXPORT  [{timestamp()}]", C)
+    log("Endpoint",   f"GET /api/export/{table}")
+    log("Format",     fmt.upper() + (" + gzip" if gz else ""))
+    log("Columns",    ", ".join(columns))
+    log("Time Range", f"{since or '-'} -> {until or '-'}")
+    log("Resume After", str(after_id))
+
+    rows   = iter_table_rows(table, columns, after_id, since, until)
+    body   = encode_csv(columns, rows) if fmt == "csv" else encode_ndjson(columns, rows)
+    mime   = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{table}.{fmt}"',
+        "X-Export-Resume-Param": "after",
+    }
+    if gz:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(body), mimetype=mime, headers=headers)
+
+
+# =====================================================================
+#  HISTORY — keyset pages of stored rows (history.py)
+#
+#  Same tables as the export, as JSON pages for the UI: newest first,
+#  ?cursor= from the previous page, exact-match filters and a projection.
+# =====================================================================
+
+@app.route("/api/history/<table>", methods=["GET"])
+@conditional(version=DB_VERSION)
+def table_history(table):
+    order  = request.args.get("order", "desc").lower()
+    cursor = request.args.get("cursor")
+    wanted = [c.strip() for c in request.args.get("fields", "").split(",") if c.strip()]
+    try:
+        limit = int(request.args.get("limit", HISTORY_PAGE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, HISTORY_MAX_PAGE))
+
+    if table not in EXPORT_TABLES:
+        return jsonify({"error": f"unknown table: {table}", "tables": list(EXPORT_TABLES)}), 404
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be asc or desc"}), 400
+
+    conn = STORAGE.reader()
+    try:
+        existing = table_columns(conn, table)
+        if not existing:
+            return jsonify({"error": f"table {table} has not been created yet"}), 404
+        if "created_at" not in existing:
+            return jsonify({"error": f"{table} has no created_at column to page on"}), 400
+        unknown = [c for c in wanted if c not in existing]
+        if unknown:
+            return jsonify({"error": f"unknown fields: {', '.join(unknown)}"}), 400
+        filters = {c: request.args[c] for c in HISTORY_FILTERS if c in request.args}
+        missing = [c for c in filters if c not in existing]
+        if missing:
+            return jsonify({"error": f"{table} cannot be filtered on {', '.join(missing)}"}), 400
+        fields = ["id", "created_at"] + [c for c in (wanted or existing) if c not in ("id", "created_at")]
+        started = time.perf_counter()
+        rows, next_cursor = query_page(conn, table, fields, filters, cursor, limit, order == "desc")
+        elapsed = (time.perf_counter() - started) * 1000
+    except CursorError as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        conn.close()
+
+    banner(f"HISTORY  [{timestamp()}]", C)
+    log("Endpoint", f"GET /api/history/{table}")
+    log("Filters",  ", ".join(f"{k}={v}" for k, v in filters.items()) or "-")
+    log("Page",     f"{len(rows)} rows, {order}, limit {limit}" + (" (continued)" if cursor else ""))
+    log("Query",    f"{elapsed:.1f} ms", G if elapsed < 50 else Y)
+    return jsonify({"table": table, "rows": columnar(rows, fields) if wants_columnar() else rows,
+                    "count": len(rows), "limit": limit, "order": order, "fields": fields,
+                    "filters": filters, "nextCursor": next_cursor, "ts": timestamp()})
+
+
+@app.route("/api/reports/<rtype>", methods=["GET"])
+@conditional(version=DB_VERSION, max_age=60)
+def render_report(rtype):
+    """
+    stability | shock | shield report from stored history:
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD (default last 30 days), ?format=html|svg|csv, ?chart=N for svg.
+    Served from the on-disk report cache until the source tables change.
+    """
+    fmt = request.args.get("format", "html").lower()
+    try:
+        chart = int(request.args.get("chart", 0))
+        body, mime, fname, hit = get_report(STORAGE.reader, rtype, fmt, request.args.get("from"),
+                                            request.args.get("to"), chart)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    banner(f"REPORT  [{timestamp()}]", C)
+    log("Endpoint", f"GET /api/reports/{rtype}")
+    log("Format",   fmt.upper())
+    log("Range",    f"{request.args.get('from') or '-30d'} -> {request.args.get('to') or 'today'}")
+    log("Cache",    "HIT" if hit else "MISS — rendered", G if hit else Y)
+    log("Size",     f"{len(body):,} bytes")
+    headers = {"X-Report-Cache": "HIT" if hit else "MISS"}
+    if fmt != "svg":
+        headers["Content-Disposition"] = f'attachment; filename="{fname}"'
+    return Response(body, mimetype=mime, headers=headers)
+
+
+# =====================================================================
+#  STARTUP — runs on import, so `flask run`, gunicorn and any other WSGI
+#  host get it too, not just `python backend_server.py`. The read routes
+#  (/api/history, /api/alerts, /api/anomalies/top) never write: the
+#  tables, indexes and engine state they rely on are made here.
+# =====================================================================
+
+def prepare_storage():
+    conn = STORAGE.reader(readonly=False)
+    try:
+        shield = STORAGE.schema("shield_fields")
+        if purge_legacy_artifacts(conn, shield):
+            # The viewer's FTS sidecar indexed the old view contents; it is rebuilt on demand
+            for path in (FTS_PATH, FTS_PATH + "-journal", FTS_PATH + "-wal"):
+                if os.path.exists(path):
+                    os.remove(path)
+            log("Shield Artifacts", "legacy digests and ciphers purged, file vacuumed", Y)
+        cursor = conn.cursor()
+        ALERTS.restore(cursor)          # alerts table + alerts still ACTIVE from the last run
+        ANOMALY.load(cursor)            # anomaly tables + the last baseline checkpoint
+        for table in EXPORT_TABLES:
+            ensure_history_indexes(conn, table)
+        conn.commit()
+    finally:
+        conn.close()
+
+prepare_storage()
+NETWORK.warm()                      # lay out the current graph before the first /api/network
 
 
 if __name__ == "__main__":
@@ -916,11 +1373,29 @@ if __name__ == "__main__":
     print("   Flask running on http://localhost:4002")
     print("=" * 60)
     print("   GET  /api/data/dashboard")
-    print("   GET  /api/data/instability-timeline")
+    print("   GET  /api/data/instability-timeline  (?shape=columnar)")
+    print("   GET  /api/risk/scores")
+    print("   GET  /api/network?lod=auto|full|clusters&cluster=N")
     print("   POST /api/health/modal")
+    print("   GET  /api/health/snapshot?keys=...")
+    print("   GET  /api/alerts   GET /api/alerts/stream (SSE)")
+    print("   GET  /api/anomalies/top")
     print("   POST /api/stress/inject-shock")
     print("   POST /api/stress/stabilize")
     print("   POST /submit  <- Financial Shield (FIXED)")
+    print("   POST /submit/stream  <- framed AES-GCM uploads (documents)")
     print("   GET  /api/system/health")
+    print("   GET  /api/export/<table>?format=csv|ndjson")
+    print("   GET  /api/history/<table>?cursor=&limit=&fields=&risk_level=&scenario=...")
+    print("   GET  /api/reports/<stability|shock|shield>?from=&to=&format=html|svg|csv")
+    if CAPTURE_PATH:
+        print(f"   Capturing traffic -> {CAPTURE_PATH}")
+    if STORAGE.sharded:
+        print(f"   Storage: sharded across {len(STORAGE.files())} files"
+              + (f", sessions by {STORAGE.partition[3]}" if STORAGE.partition else ""))
+    if DUPLICATES.name != "local":
+        print(f"   Duplicate store: {DUPLICATES.status()['server']}")
+    if not SHIELD_KEY:
+        print("   Shield artifacts: no GFNS_SHIELD_KEY — storing sizes only, no digests or ciphers")
     print(f"{'=' * 60}{RST}\n")
     app.run(host="0.0.0.0", port=4002, debug=False)
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+GFNS DUPLICATE-STORE BENCHMARK — lookups per second through RespStore
+Run: python bench_dup_store.py                      (starts a stand-in server in a subprocess)
+     python bench_dup_store.py --url redis://10.0.0.5:6379/0 --keys 200000
+
+  lookup_many       batched MGET lookups from one thread
+  check_and_record  /submit's atomic SET NX + GET, from --threads request
+                    threads sharing one store (coalesced into pipelines)
+  fallback          check_and_record latency while the server answers
+                    slower than timeout_ms
+Target: 50,000 lookups/s per node on the batched path. The per-call
+figures are bounded by Python overhead on both ends when run against the
+stand-in; against Redis they measure the client alone. Nothing is written
+outside the benchmark's own key prefix.
+"""
+
+import sys, time, json, socket, argparse, threading, subprocess
+
+from dup_store import RespStore
+from console import banner, log, section, C, G, Y, R
+
+TARGET = 50_000
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_stand_in(delay_ms=0):
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, "dup_store.py", "serve", "--port", str(port),
+                             "--delay-ms", str(delay_ms)], stdout=subprocess.PIPE)
+    proc.stdout.readline()               # "stand-in duplicate store on ..." once listening
+    return proc, f"redis://127.0.0.1:{port}/0"
+
+def bench_lookups(store, keys, batch):
+    start = time.perf_counter()
+    hits  = 0
+    for i in range(0, len(keys), batch):
+        hits += len(store.lookup_many(keys[i:i + batch]))
+    return len(keys) / (time.perf_counter() - start), hits
+
+def bench_check_and_record(store, keys, threads):
+    per, hits = len(keys) // threads, [0] * threads
+    def worker(t):
+        n = 0
+        for k in keys[t * per:(t + 1) * per]:
+            if store.check_and_record(k, {"record_id": k[-8:]}) is not None:
+                n += 1
+        hits[t] = n
+    pool  = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in pool: t.start()
+    for t in pool: t.join()
+    return per * threads / (time.perf_counter() - start), sum(hits)
+
+def bench_fallback(timeout_ms, n=20):
+    proc, url = start_stand_in(delay_ms=timeout_ms * 4)
+    try:
+        store = RespStore.from_url(f"{url}?timeout_ms={timeout_ms}&prefix=gfns:bench:")
+        worst = 0.0
+        for i in range(n):
+            start = time.perf_counter()
+            store.check_and_record(f"slow{i}", {"i": i})
+            worst = max(worst, (time.perf_counter() - start) * 1000)
+        return worst, store.status()
+    finally:
+        proc.terminate()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the duplicate store against a Redis-protocol server.")
+    ap.add_argument("--url", help="redis://host:port/db to measure (default: a stand-in server)")
+    ap.add_argument("--keys", type=int, default=100_000)
+    ap.add_argument("--batch", type=int, default=500, help="keys per lookup_many call")
+    ap.add_argument("--threads", type=int, default=16, help="concurrent check_and_record callers")
+    ap.add_argument("--timeout-ms", type=float, default=25)
+    ap.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = ap.parse_args(argv)
+
+    proc, url = (None, args.url) if args.url else start_stand_in()
+    try:
+        store = RespStore.from_url(f"{url}?timeout_ms={max(args.timeout_ms, 1000)}&prefix=gfns:bench:")
+        keys  = [f"{i:064x}" for i in range(args.keys)]
+        banner("DUPLICATE STORE BENCHMARK", C)
+        log("Server", url + ("" if args.url else " (stand-in)"))
+        log("Keys",   f"{args.keys:,}")
+
+        section("Throughput")
+        rec_rate, rec_hits = bench_check_and_record(store, keys, args.threads)
+        look_rate, look_hits = bench_lookups(store, keys, args.batch)
+        again_rate, again_hits = bench_check_and_record(store, keys, args.threads)
+        st = store.status()
+        for name, rate, note, miss in (
+                ("check_and_record (new)", rec_rate, f"{rec_hits} dup, {args.threads} threads", Y),
+                ("lookup_many",            look_rate, f"{look_hits:,} hits, {args.batch}/MGET", R),
+                ("check_and_record (dup)", again_rate, f"{again_hits:,} dup", Y)):
+            log(name, f"{rate:>10,.0f}/s  ({note})", G if rate >= TARGET else miss)
+        log("Pipelining", f"{st['calls']:,} calls in {st['batches']:,} round trips")
+
+        section("Fallback")
+        worst, fb = bench_fallback(args.timeout_ms)
+        log("Slowest call", f"{worst:.1f} ms with timeout_ms={args.timeout_ms:g} (server 4x slower)",
+            G if worst < args.timeout_ms * 2 else Y)
+        log("State", f"{fb['state']}, {fb['fallbacks']} fallbacks, {fb['pendingReplay']} queued for replay")
+
+        results = {"check_and_record_new": rec_rate, "lookup_many": look_rate,
+                   "check_and_record_dup": again_rate, "fallback_worst_ms": worst, "target": TARGET}
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        if args.url:
+            for i in range(0, len(keys), args.batch):
+                store._call([("DEL",) + tuple(store.prefix + k for k in keys[i:i + args.batch])])
+    finally:
+        if proc is not None:
+            proc.terminate()
+    return 0 if look_rate >= TARGET else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
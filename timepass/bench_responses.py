@@ -0,0 +1,112 @@
+"""
+GFNS RESPONSE BENCHMARK — serialization time and bytes on the wire per endpoint
+Run: python bench_responses.py            (seeds a temporary copy of gfns_data.db)
+     python bench_responses.py --seed 1000 --repeat 500 --json bench.json
+
+For each endpoint the payload is fetched once in-process, then:
+  ser_std / ser_fast  mean ms to encode it with Flask's default encoder
+                      (stdlib json, sorted keys) and with response_layer.dumps
+  raw / gzip / br     body bytes uncompressed and compressed
+  wire                bytes actually sent to a client sending
+                      Accept-Encoding: br, gzip
+The tracked database is never written: requests run against a temp copy.
+"""
+
+import io, sys, json, time, shutil, argparse, tempfile, contextlib
+
+import backend_server as bs
+import response_layer as rl
+from storage import Storage
+from console import banner, log, section, C, G, Y, RST
+
+ENDPOINTS = [
+    "/api/data/dashboard",
+    "/api/data/instability-timeline?range=1y",
+    "/api/data/instability-timeline?range=1y&shape=columnar",
+    "/api/risk/scores",
+    "/api/alerts?limit=500",
+    "/api/alerts?limit=500&shape=columnar",
+    "/api/anomalies/top?limit=200",
+    "/api/system/health",
+]
+
+
+def quiet(fn, *a, **kw):
+    """Handlers print banners to the console; keep them out of the report."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*a, **kw)
+
+def mean_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def bench_endpoint(client, path, repeat):
+    plain = quiet(client.get, path)
+    if plain.status_code != 200:
+        return {"endpoint": path, "status": plain.status_code}
+    body = plain.get_data()
+    obj  = json.loads(body)
+    wire = quiet(client.get, path, headers={"Accept-Encoding": "br, gzip"})
+    return {
+        "endpoint": path,
+        "status":   200,
+        "ser_std_ms":  round(mean_ms(lambda: json.dumps(obj, sort_keys=True, separators=(",", ":")), repeat), 4),
+        "ser_fast_ms": round(mean_ms(lambda: rl.dumps(obj), repeat), 4),
+        "raw":      len(body),
+        "gzip":     len(rl.compress(body, "gzip")),
+        "br":       len(rl.compress(body, "br")) if rl.brotli is not None else None,
+        "wire":     len(wire.get_data()),
+        "encoding": wire.headers.get("Content-Encoding", "identity"),
+    }
+
+def print_results(results):
+    section("Per Endpoint")
+    print(f"  {'ENDPOINT':<52} {'STD ms':>8} {'FAST ms':>8} {'RAW':>8} {'GZIP':>7} {'BR':>7} {'WIRE':>7}")
+    for r in results:
+        if r["status"] != 200:
+            print(f"  {r['endpoint'][:52]:<52} HTTP {r['status']}")
+            continue
+        br = "-" if r["br"] is None else r["br"]
+        print(f"  {r['endpoint'][:52]:<52} {r['ser_std_ms']:>8.4f} {G}{r['ser_fast_ms']:>8.4f}{RST} "
+              f"{r['raw']:>8,} {r['gzip']:>7,} {br:>7} {G}{r['wire']:>7,}{RST}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark JSON encoding and compression per endpoint.")
+    ap.add_argument("--db", default=bs.DB_PATH, help="database to copy for the run")
+    ap.add_argument("--seed", type=int, default=200, help="health snapshots to store before measuring")
+    ap.add_argument("--repeat", type=int, default=200, help="encodings timed per endpoint")
+    ap.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="gfns-bench-")
+    try:
+        bs.STORAGE = Storage(args.db).copy_to(tmp)      # every shard, when the database is sharded
+        bs.DB_PATH = bs.RISK.db_path = bs.STORAGE.main
+        for budget in bs.ADMISSION.budgets.values():
+            budget.rate = 0                 # every in-process request comes from one "client"
+        client = bs.app.test_client()
+
+        banner("RESPONSE BENCHMARK", C)
+        log("JSON encoder", "orjson" if rl.orjson is not None else "stdlib json (pip install orjson)",
+            G if rl.orjson is not None else Y)
+        log("Brotli",       "yes" if rl.brotli is not None else "no (pip install brotli)",
+            G if rl.brotli is not None else Y)
+        log("Seeding",      f"{args.seed} health snapshots")
+        for _ in range(args.seed):
+            quiet(client.get, "/api/health/snapshot")
+
+        results = [bench_endpoint(client, path, args.repeat) for path in ENDPOINTS]
+        print_results(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
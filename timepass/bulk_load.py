@@ -0,0 +1,352 @@
+"""
+GFNS BULK LOADER — stream regulatory filings into gfns_data.db
+Run: python bulk_load.py filings.csv
+     python bulk_load.py q3_filings.ndjson --table bank_capital_adequacy --rejects bad.ndjson
+Columns are matched to the table by name (case-insensitive) and coerced to
+the declared column types; rows that don't coerce go to --rejects instead
+of the table. Rows are inserted with executemany in large transactions,
+secondary indexes are dropped for the load and built once at the end.
+
+Progress is checkpointed in the database itself (bulk_load_checkpoints),
+in the same transaction as the rows it covers, so re-running the same
+command after a crash continues from the last commit without duplicates.
+The checkpoint also records how long the --rejects file was at that commit;
+a resume cuts the file back to it before appending, so rejects written
+after the last commit are not repeated.
+"""
+
+import os, sys, csv, json, time, sqlite3, argparse, datetime
+
+from gfns_db_core import DB_PATH
+from storage import Storage
+from console import banner, log, section, C, G, R, Y, RST
+from risk_scoring import FINANCIALS_SCHEMA
+from network_layout import EXPOSURES_SCHEMA
+from history import ensure_history_indexes
+
+CHUNK_ROWS  = 50000         # rows per executemany
+COMMIT_ROWS = 500000        # rows per transaction / checkpoint
+REPORT_S    = 2.0
+
+# Created on first load when missing (bank_capital_adequacy as in create_db.py)
+BASE_SCHEMAS = {
+    "bank_capital_adequacy": """
+        CREATE TABLE IF NOT EXISTS bank_capital_adequacy (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            institution TEXT,
+            region TEXT,
+            tier1_capital_ratio REAL,
+            status TEXT,
+            recorded_at TEXT
+        )""",
+    "institution_financials": FINANCIALS_SCHEMA,
+    "counterparty_exposures": EXPOSURES_SCHEMA,
+}
+# Built after every load, on top of whatever indexes the table already had
+LOAD_INDEXES = {
+    "bank_capital_adequacy":  [("institution", "recorded_at"), ("region", "recorded_at")],
+    "institution_financials": [("institution", "recorded_at")],
+    "counterparty_exposures": [("lender", "borrower")],
+}
+REQUIRED = {"bank_capital_adequacy": ("institution",), "institution_financials": ("institution",),
+            "counterparty_exposures": ("lender", "borrower")}
+STAMP_COLUMNS = ("recorded_at", "created_at")
+
+
+class Reject(ValueError):
+    pass
+
+
+# ── TYPE COERCION ────────────────────────────────────────────────────
+def _real(v):
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = v.strip().replace(",", "").rstrip("%").lstrip("$")
+    if s.lower() in ("", "na", "n/a", "null", "none", "-"):
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        raise Reject(f"not a number: {v!r}")
+
+def _integer(v):
+    f = _real(v)
+    if f is None:
+        return None
+    if f != int(f):
+        raise Reject(f"not an integer: {v!r}")
+    return int(f)
+
+def _text(v):
+    s = str(v).strip()
+    return s or None
+
+def converter_for(decl_type):
+    """SQLite type affinity rules, reduced to the three the schema uses."""
+    t = (decl_type or "").upper()
+    if "INT" in t:
+        return _integer
+    if any(k in t for k in ("REAL", "FLOA", "DOUB", "NUM", "DEC")):
+        return _real
+    return _text
+
+
+# ── SOURCES (byte offsets are tracked so a load can resume) ──────────
+def _lines(f, pos):
+    """Decoded lines of a binary file, advancing pos[0] by each line's raw length."""
+    for raw in f:
+        pos[0] += len(raw)
+        yield raw.decode("utf-8-sig" if pos[0] == len(raw) else "utf-8")
+
+def iter_csv(f, pos, header):
+    reader = csv.reader(_lines(f, pos))
+    if header is None:
+        header = next(reader, [])
+    yield header
+    for row in reader:
+        if row:
+            yield dict(zip(header, row))
+
+def iter_ndjson(f, pos, header):
+    yield header
+    for line in _lines(f, pos):
+        if line.strip():
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                yield Reject(f"bad JSON: {e}")
+                continue
+            if not isinstance(obj, dict):
+                yield Reject("not a JSON object")
+                continue
+            # Keys can differ record to record, so normalise them here, not once per file
+            yield {k.strip().lower(): v for k, v in obj.items()}
+
+
+# ── CHECKPOINTS ──────────────────────────────────────────────────────
+def ensure_checkpoint_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bulk_load_checkpoints (
+            source      TEXT,
+            target      TEXT,
+            size        INTEGER,
+            mtime       REAL,
+            offset      INTEGER,
+            header      TEXT,
+            indexes     TEXT,
+            rows_loaded INTEGER,
+            rejected    INTEGER,
+            done        INTEGER,
+            updated_at  TEXT,
+            rejects_bytes INTEGER,
+            PRIMARY KEY (source, target)
+        )
+    """)
+    have = {r[1] for r in conn.execute("PRAGMA table_info(bulk_load_checkpoints)")}
+    if "rejects_bytes" not in have:     # checkpoints from before the rejects file was tracked
+        conn.execute("ALTER TABLE bulk_load_checkpoints ADD COLUMN rejects_bytes INTEGER")
+
+def load_checkpoint(conn, source, target, st):
+    row = conn.execute("""SELECT size, mtime, offset, header, indexes, rows_loaded, rejected, done,
+                                 rejects_bytes
+                          FROM bulk_load_checkpoints WHERE source = ? AND target = ?""",
+                       (source, target)).fetchone()
+    if row is None:
+        return None
+    size, mtime, offset, header, indexes, rows, rejected, done, rejects_bytes = row
+    if mtime != st.st_mtime or size > st.st_size:
+        return None                 # a different file under the same name: start over
+    return {"offset": offset, "header": json.loads(header) if header else None,
+            "indexes": json.loads(indexes or "[]"), "rows": rows, "rejected": rejected,
+            "done": bool(done), "rejects_bytes": rejects_bytes}
+
+def save_checkpoint(conn, source, target, st, offset, header, indexes, rows, rejected, rej_f, done=False):
+    """
+    Written inside the load transaction, so it commits exactly with the rows
+    it counts. The rejects file is flushed first and its length saved.
+    """
+    if rej_f:
+        rej_f.flush()
+    conn.execute("""INSERT OR REPLACE INTO bulk_load_checkpoints
+                    (source, target, size, mtime, offset, header, indexes, rows_loaded, rejected,
+                     done, updated_at, rejects_bytes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                 (source, target, st.st_size, st.st_mtime, offset,
+                  json.dumps(header) if header else None, json.dumps(indexes),
+                  rows, rejected, int(done), datetime.datetime.now().isoformat(),
+                  rej_f.tell() if rej_f else None))
+
+
+# ── INDEXES ──────────────────────────────────────────────────────────
+def drop_secondary_indexes(conn, table):
+    """Drop the table's explicit indexes; returns their SQL for rebuild."""
+    found = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                         "AND tbl_name = ? AND sql IS NOT NULL", (table,)).fetchall()
+    for name, _ in found:
+        conn.execute(f"DROP INDEX {name}")
+    return [sql for _, sql in found]
+
+def build_indexes(conn, table, dropped):
+    for sql in dropped:
+        conn.execute(sql)
+    for cols in LOAD_INDEXES.get(table, []):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_{'_'.join(cols)} ON {table}({', '.join(cols)})")
+    ensure_history_indexes(conn, table, "main")      # /api/history paging, when the table has created_at
+
+
+# ── LOADER ───────────────────────────────────────────────────────────
+def bulk_load(path, table, db_path=DB_PATH, fmt=None, rejects=None, restart=False,
+              chunk=CHUNK_ROWS, commit_rows=COMMIT_ROWS):
+    fmt    = fmt or ("ndjson" if path.lower().endswith((".ndjson", ".jsonl")) else "csv")
+    source = os.path.abspath(path)
+    st     = os.stat(source)
+    conn   = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")   # 256 MB page cache for index builds
+    if table in BASE_SCHEMAS:
+        conn.execute(BASE_SCHEMAS[table])
+    ensure_checkpoint_table(conn)
+
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    if not info:
+        raise SystemExit(f"error: table {table} does not exist")
+    columns = [(r[1], converter_for(r[2])) for r in info if r[1] != "id"]
+    stamp   = next((c for c in STAMP_COLUMNS if c in {n for n, _ in columns}), None)
+    needed  = REQUIRED.get(table, ())
+
+    ckpt = None if restart else load_checkpoint(conn, source, table, st)
+    if ckpt and ckpt["done"] and ckpt["offset"] >= st.st_size:
+        log("Already Loaded", f"{ckpt['rows']:,} rows — use --restart to load again", Y)
+        conn.close()
+        return ckpt["rows"], ckpt["rejected"], 0, 0.0
+    start_off = ckpt["offset"] if ckpt else 0
+    rows_done = ckpt["rows"] if ckpt else 0
+    rejected  = ckpt["rejected"] if ckpt else 0
+    if ckpt:
+        log("Resuming", f"byte {start_off:,} — {rows_done:,} rows already in", C)
+
+    names = ", ".join(n for n, _ in columns)
+    must  = [i for i, (n, _) in enumerate(columns) if n in needed]
+    sql   = f"INSERT INTO {table} ({names}) VALUES ({', '.join('?' * len(columns))})"
+    now   = datetime.datetime.now().isoformat()
+    if rejects and ckpt and ckpt["rejects_bytes"] is not None and os.path.exists(rejects) \
+            and os.path.getsize(rejects) > ckpt["rejects_bytes"]:
+        os.truncate(rejects, ckpt["rejects_bytes"])     # drop rejects from the rolled-back tail
+    rej_f = open(rejects, "a", encoding="utf-8") if rejects else None
+    if not ckpt:
+        # Commit a starting checkpoint so a crash before the first commit
+        # still knows where this run's rejects begin
+        save_checkpoint(conn, source, table, st, 0, None, [], 0, 0, rej_f)
+
+    f     = open(source, "rb")
+    f.seek(start_off)
+    pos   = [start_off]
+    src   = (iter_ndjson if fmt == "ndjson" else iter_csv)(f, pos, ckpt["header"] if ckpt else None)
+    header = next(src)
+    plan   = None           # (source key, converter, is stamp column) per table column
+
+    conn.execute("BEGIN")
+    # Index SQL is checkpointed too: a crash mid-load must not lose the originals
+    dropped = (ckpt["indexes"] if ckpt else []) + drop_secondary_indexes(conn, table)
+    batch, in_txn = [], 0
+    t0 = last_report = time.perf_counter()
+    loaded_now = 0
+    try:
+        for rec in src:
+            try:
+                if isinstance(rec, Reject):
+                    raise rec
+                if plan is None:
+                    keys = {k.strip().lower(): k for k in rec}
+                    if not any(n.lower() in keys for n, _ in columns):
+                        raise SystemExit(f"error: no source column matches a column of {table}")
+                    plan = [(keys.get(n.lower(), n.lower()), conv, n == stamp) for n, conv in columns]
+                vals = []
+                for key, conv, is_stamp in plan:
+                    v = rec.get(key)
+                    if v is not None:
+                        v = conv(v)
+                    vals.append(now if v is None and is_stamp else v)
+                for i in must:
+                    if vals[i] is None:
+                        raise Reject(f"missing {columns[i][0]}")
+                batch.append(vals)
+            except Reject as e:
+                rejected += 1
+                if rej_f:
+                    rej_f.write(json.dumps({"error": str(e), "row": rec if isinstance(rec, dict) else None}) + "\n")
+            if len(batch) >= chunk:
+                conn.executemany(sql, batch)
+                in_txn += len(batch)
+                loaded_now += len(batch)
+                batch = []
+                if in_txn >= commit_rows:
+                    save_checkpoint(conn, source, table, st, pos[0], header, dropped,
+                                    rows_done + loaded_now, rejected, rej_f)
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    in_txn = 0
+            now_t = time.perf_counter()
+            if now_t - last_report >= REPORT_S:
+                last_report = now_t
+                done = rows_done + loaded_now + len(batch)
+                print(f"\r  {Y}{done:>12,} rows{C}  {loaded_now / (now_t - t0):>10,.0f} rows/s"
+                      f"  {pos[0] / max(st.st_size, 1):>6.1%}{RST}", end="", flush=True)
+        if batch:
+            conn.executemany(sql, batch)
+            loaded_now += len(batch)
+        section("Indexes")
+        ti = time.perf_counter()
+        build_indexes(conn, table, dropped)
+        log("Built", f"{len(dropped) + len(LOAD_INDEXES.get(table, []))} indexes in "
+                     f"{time.perf_counter() - ti:.1f}s", G)
+        save_checkpoint(conn, source, table, st, pos[0], header, [],
+                        rows_done + loaded_now, rejected, rej_f, done=True)
+        conn.execute("COMMIT")
+    except BaseException:
+        # Uncommitted rows roll back; the last checkpoint still matches the table
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        f.close()
+        if rej_f:
+            rej_f.close()
+        conn.close()
+    print()
+    return rows_done + loaded_now, rejected, loaded_now, time.perf_counter() - t0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk-load CSV/NDJSON filings into gfns_data.db.")
+    ap.add_argument("source", help="CSV or NDJSON file")
+    ap.add_argument("--table", default="bank_capital_adequacy")
+    ap.add_argument("--db", help="default: the file holding --table (gfns_data.db, or its shard)")
+    ap.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file extension")
+    ap.add_argument("--rejects", metavar="FILE", help="append rows that fail validation here (NDJSON)")
+    ap.add_argument("--restart", action="store_true", help="ignore any checkpoint for this file")
+    ap.add_argument("--chunk", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--commit-rows", type=int, default=COMMIT_ROWS)
+    args = ap.parse_args(argv)
+    args.db = args.db or Storage(DB_PATH).file_for(args.table)
+    if not os.path.exists(args.source):
+        print(f"error: file not found: {args.source}", file=sys.stderr)
+        return 1
+
+    banner(f"BULK LOAD — {args.table}", C)
+    log("Source",   os.path.abspath(args.source))
+    log("Size",     f"{os.path.getsize(args.source) / 1e6:,.1f} MB")
+    log("Database", args.db)
+    rows, rejected, loaded, elapsed = bulk_load(args.source, args.table, args.db, args.format, args.rejects,
+                                        args.restart, args.chunk, args.commit_rows)
+    section("Result")
+    log("Rows Loaded", f"{loaded:,} this run, {rows:,} in total", G)
+    log("Rejected",    f"{rejected:,}", R if rejected else G)
+    if elapsed:
+        log("Elapsed",    f"{elapsed:.1f}s")
+        log("Throughput", f"{loaded / elapsed:,.0f} rows/s  ({loaded / elapsed * 60 / 1e6:,.1f}M rows/min)", G)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+GFNS CONDITIONAL GET — ETags, If-None-Match -> 304 and Cache-Control hints
+for polled read endpoints.
+
+  @conditional(version=db_version, max_age=5)
+      The ETag comes from a cheap version stamp, checked *before* the
+      handler runs. An unchanged poll returns 304 without touching the
+      handler's queries or building a body.
+  @conditional(max_age=60)
+      No stamp: the handler runs and the ETag is a hash of the body. That
+      saves only the transfer.
+
+DataVersion reads SQLite's PRAGMA data_version on one long-lived
+connection. The value changes whenever any other connection (another
+request, another process) commits to the file — to any attached file when
+the storage is sharded. It is only meaningful per connection, so ETags
+also carry a per-process boot id; a tag minted by another worker never
+matches.
+"""
+
+import uuid, hashlib, sqlite3, functools, threading
+from flask import request, make_response
+from storage import data_version
+
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class DataVersion:
+    """
+    Commit counter for a database; `path` may be a callable so the path can be swapped in tests.
+    `connect(path)` opens the connection (e.g. a sharded reader) — it is reopened whenever `path` changes.
+    """
+
+    def __init__(self, path, connect=None):
+        self._path    = path
+        self._connect = connect or (lambda p: sqlite3.connect(p, check_same_thread=False))
+        self._conn    = None
+        self._open    = None
+        self._lock    = threading.Lock()
+
+    def __call__(self):
+        path = self._path() if callable(self._path) else self._path
+        with self._lock:
+            if self._conn is None or self._open != path:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = self._connect(path)
+                self._open = path
+            return f"{self._open}:{data_version(self._conn)}"
+
+
+def cache_control(max_age):
+    return "no-cache" if not max_age else f"private, max-age={max_age}, must-revalidate"
+
+def _tag(*parts):
+    return hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:20]
+
+def _not_modified(tag, max_age):
+    resp = make_response("", 304)
+    resp.set_etag(tag, weak=True)
+    resp.headers["Cache-Control"] = cache_control(max_age)
+    return resp
+
+def conditional(version=None, max_age=0):
+    """Route decorator; see the module docstring. GET only — other methods pass straight through."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if request.method != "GET":
+                return fn(*args, **kwargs)
+            tag = None
+            if version is not None:
+                query = sorted(request.args.items(multi=True))
+                tag   = _tag(BOOT_ID, request.endpoint, query, version())
+                if request.if_none_match.contains_weak(tag):
+                    return _not_modified(tag, max_age)
+            resp = make_response(fn(*args, **kwargs))
+            if resp.status_code != 200 or resp.is_streamed:
+                return resp
+            if tag is None:
+                tag = _tag(BOOT_ID, hashlib.sha1(resp.get_data()).hexdigest())
+                if request.if_none_match.contains_weak(tag):
+                    return _not_modified(tag, max_age)
+            resp.set_etag(tag, weak=True)       # weak: gzip/br/identity bodies share one tag
+            resp.headers["Cache-Control"] = cache_control(max_age)
+            return resp
+        return inner
+    return wrap
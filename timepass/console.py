@@ -0,0 +1,29 @@
+"""
+GFNS CONSOLE — the colours and banner / log / section lines every GFNS
+script prints with. Standard library only and no side effects on import,
+so the command-line tools get the backend's look without loading the app.
+"""
+
+R   = "\033[91m"
+G   = "\033[92m"
+Y   = "\033[93m"
+B   = "\033[94m"
+M   = "\033[95m"
+C   = "\033[96m"
+W   = "\033[97m"
+DIM = "\033[2m"
+BLD = "\033[1m"
+RST = "\033[0m"
+
+def banner(title, colour=C):
+    line = "=" * 60
+    print(f"\n{colour}{BLD}{line}{RST}")
+    print(f"{colour}{BLD}  {title}{RST}")
+    print(f"{colour}{BLD}{line}{RST}")
+
+def log(label, value, colour=W):
+    print(f"  {DIM}|{RST} {Y}{label:<28}{RST} {colour}{value}{RST}")
+
+def section(title):
+    dashes = "-" * (50 - len(title))
+    print(f"\n  {DIM}-- {title} {dashes}{RST}")
@@ -0,0 +1,497 @@
+"""
+FINANCIAL SHIELD — DUPLICATE STORE
+Where /submit records identity hashes it has seen, so duplicates are caught
+across every backend node behind the load balancer, not just per process.
+
+  LocalStore   in-process dict: each node only sees its own submissions
+  RespStore    any server speaking the Redis protocol (Redis, Valkey,
+               KeyDB, or StandInServer below)
+
+Pick with $GFNS_DUP_STORE:
+  (unset)                                   LocalStore
+  redis://host:6379/0?timeout_ms=25&ttl_days=365&prefix=gfns:dup:
+
+RespStore
+  - check_and_record() is one round trip: SET key record NX, then GET key,
+    written together. The first node to SET wins atomically; every node
+    reads back the winning record.
+  - Calls from concurrent requests are coalesced: while one thread is on
+    the wire, the others queue, and the next writer sends the whole queue as
+    one pipeline (group commit). lookup_many() batches keys into MGETs.
+  - Every answer is also kept in a local LRU. When the server errors or
+    doesn't answer within timeout_ms, the store answers from that cache,
+    records new hashes locally, and stops trying the server for retry_s.
+    Records made meanwhile are replayed with SET NX once it is back.
+
+Run a stand-in server (tests, benchmarks, single-box setups):
+  python dup_store.py serve --port 6399 [--delay-ms 40]
+"""
+
+import os, sys, json, time, queue, socket, argparse, threading, socketserver
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit, parse_qs
+
+DEFAULT_TIMEOUT_MS = 25
+DEFAULT_RETRY_S    = 5.0
+LOCAL_CACHE_KEYS   = 200_000
+PENDING_MAX        = 50_000
+MGET_BATCH         = 500
+
+
+class StoreUnavailable(Exception):
+    """The remote store errored or timed out; callers fall back to the local cache."""
+
+
+# ── INTERFACE ────────────────────────────────────────────────────────
+class DuplicateStore:
+    """check_and_record() is the only call /submit needs; the rest are for batch jobs and health."""
+    name = "base"
+
+    def check_and_record(self, id_hash, record):
+        """Atomically record `record` under `id_hash` unless present; returns the earlier record or None."""
+        raise NotImplementedError
+
+    def release(self, id_hash, record):
+        """Undo a check_and_record() that returned None, when the submission it recorded was not stored."""
+        raise NotImplementedError
+
+    def lookup_many(self, hashes):
+        """{hash: record} for the hashes already recorded."""
+        raise NotImplementedError
+
+    def count(self):
+        return None
+
+    def status(self):
+        return {"store": self.name}
+
+
+class LocalStore(DuplicateStore):
+    """Bounded in-process LRU; the whole store for one node, the fallback cache for RespStore."""
+    name = "local"
+
+    def __init__(self, max_keys=LOCAL_CACHE_KEYS):
+        self.max_keys = max_keys
+        self._data    = OrderedDict()
+        self._lock    = threading.Lock()
+
+    def get(self, id_hash):
+        with self._lock:
+            rec = self._data.get(id_hash)
+            if rec is not None:
+                self._data.move_to_end(id_hash)
+            return rec
+
+    def put(self, id_hash, record):
+        with self._lock:
+            self._data[id_hash] = record
+            self._data.move_to_end(id_hash)
+            if len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+
+    def check_and_record(self, id_hash, record):
+        with self._lock:
+            prev = self._data.get(id_hash)
+            if prev is None:
+                self._data[id_hash] = record
+                if len(self._data) > self.max_keys:
+                    self._data.popitem(last=False)
+            else:
+                self._data.move_to_end(id_hash)
+            return prev
+
+    def release(self, id_hash, record):
+        with self._lock:
+            if self._data.get(id_hash) == record:
+                del self._data[id_hash]
+
+    def lookup_many(self, hashes):
+        with self._lock:
+            return {h: self._data[h] for h in hashes if h in self._data}
+
+    def count(self):
+        return len(self._data)
+
+    def status(self):
+        return {"store": self.name, "keys": len(self._data)}
+
+
+# ── RESP WIRE FORMAT ─────────────────────────────────────────────────
+def encode_command(*args):
+    out = [b"*%d\r\n" % len(args)]
+    for a in args:
+        b = a if isinstance(a, bytes) else str(a).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+    return b"".join(out)
+
+class RespError(Exception):
+    pass
+
+def parse_reply(buf, pos):
+    """(value, next position) for one reply in buf at pos, or (None, -1) if incomplete."""
+    end = buf.find(b"\r\n", pos)
+    if end < 0:
+        return None, -1
+    kind, line = buf[pos:pos + 1], buf[pos + 1:end]
+    pos = end + 2
+    if kind == b"+":
+        return line.decode(), pos
+    if kind == b"-":
+        return RespError(line.decode()), pos
+    if kind == b":":
+        return int(line), pos
+    if kind == b"$":
+        n = int(line)
+        if n < 0:
+            return None, pos
+        if len(buf) < pos + n + 2:
+            return None, -1
+        return bytes(buf[pos:pos + n]), pos + n + 2
+    if kind == b"*":
+        n, items = int(line), []
+        if n < 0:
+            return None, pos
+        for _ in range(n):
+            item, pos = parse_reply(buf, pos)
+            if pos < 0:
+                return None, -1
+            items.append(item)
+        return items, pos
+    raise RespError(f"bad reply type {kind!r}")
+
+
+class RespConnection:
+    """One socket; send a batch of commands, read exactly that many replies."""
+
+    def __init__(self, host, port, db=0, timeout=DEFAULT_TIMEOUT_MS / 1000):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buf = bytearray()
+        if db:
+            self.execute([("SELECT", db)])
+
+    def execute(self, commands):
+        self.sock.sendall(b"".join(encode_command(*c) for c in commands))
+        replies, pos = [], 0
+        while len(replies) < len(commands):
+            value, nxt = parse_reply(self._buf, pos) if self._buf else (None, -1)
+            if nxt < 0:
+                chunk = self.sock.recv(1 << 16)
+                if not chunk:
+                    raise ConnectionError("connection closed by server")
+                self._buf += chunk
+                continue
+            replies.append(value)
+            pos = nxt
+        del self._buf[:pos]
+        return replies
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class _Slot:
+    __slots__ = ("commands", "replies", "error", "done")
+
+    def __init__(self, commands):
+        self.commands, self.replies, self.error, self.done = commands, None, None, threading.Event()
+
+
+# ── REDIS-PROTOCOL STORE ─────────────────────────────────────────────
+class RespStore(DuplicateStore):
+    name = "resp"
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, prefix="gfns:dup:", timeout_ms=DEFAULT_TIMEOUT_MS,
+                 retry_s=DEFAULT_RETRY_S, ttl_days=None, local=None):
+        self.host, self.port, self.db = host, port, db
+        self.prefix     = prefix
+        self.timeout    = timeout_ms / 1000
+        self.retry_s    = retry_s
+        self.ttl_ms     = int(ttl_days * 86400_000) if ttl_days else None
+        self.local      = local or LocalStore()
+        self._conn      = None
+        self._queue     = queue.SimpleQueue()
+        self._writer    = None
+        self._start     = threading.Lock()
+        self._pending   = deque(maxlen=PENDING_MAX)   # recorded locally while the server was away
+        self._down_until = 0.0
+        self.calls = self.batches = self.fallbacks = self.errors = self.replayed = 0
+        self.last_error = None
+
+    @classmethod
+    def from_url(cls, url):
+        u  = urlsplit(url)
+        qs = {k: v[-1] for k, v in parse_qs(u.query).items()}
+        return cls(u.hostname or "127.0.0.1", u.port or 6379, int((u.path or "/0").strip("/") or 0),
+                   prefix=qs.get("prefix", "gfns:dup:"),
+                   timeout_ms=float(qs.get("timeout_ms", DEFAULT_TIMEOUT_MS)),
+                   retry_s=float(qs.get("retry_s", DEFAULT_RETRY_S)),
+                   ttl_days=float(qs["ttl_days"]) if "ttl_days" in qs else None)
+
+    # ── wire ─────────────────────────────────────────────────────────
+    def _flush(self, batch):
+        if self._conn is None:
+            self._conn = RespConnection(self.host, self.port, self.db, self.timeout)
+        flat    = [c for slot in batch for c in slot.commands]
+        replies = self._conn.execute(flat)
+        self.batches += 1
+        i = 0
+        for slot in batch:
+            slot.replies = replies[i:i + len(slot.commands)]
+            i += len(slot.commands)
+
+    def _run_writer(self):
+        """Send everything queued since the last round trip as one pipeline, forever."""
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except (OSError, ConnectionError, RespError) as e:
+                self._trip(e)
+                for s in batch:
+                    s.error = e
+            for s in batch:
+                s.done.set()
+
+    def _call(self, commands):
+        """Replies for `commands`, pipelined with whatever other threads have queued meanwhile."""
+        if time.monotonic() < self._down_until:
+            raise StoreUnavailable(self.last_error)
+        if self._writer is None:
+            with self._start:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name="dup-store-writer", daemon=True)
+                    self._writer.start()
+        slot = _Slot(commands)
+        self._queue.put(slot)
+        self.calls += 1
+        if not slot.done.wait(self.timeout * 2):     # the round trip ahead of ours, then ours
+            raise StoreUnavailable("timed out waiting for the pipeline")
+        if slot.error is not None:
+            raise StoreUnavailable(str(slot.error))
+        return slot.replies
+
+    def _trip(self, err):
+        self.errors    += 1
+        self.last_error = f"{type(err).__name__}: {err}" if str(err) else type(err).__name__
+        self._down_until = time.monotonic() + self.retry_s
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _set_args(self, key, value):
+        return ("SET", key, value, "NX") + (("PX", self.ttl_ms) if self.ttl_ms else ())
+
+    def _replay(self):
+        """Push records made during an outage; SET NX keeps whichever node got there first."""
+        if not self._pending:
+            return
+        items = []
+        while self._pending and len(items) < MGET_BATCH:
+            items.append(self._pending.popleft())
+        try:
+            self._call([self._set_args(self.prefix + h, json.dumps(r)) for h, r in items])
+            self.replayed += len(items)
+        except StoreUnavailable:
+            self._pending.extendleft(reversed(items))
+
+    # ── API ──────────────────────────────────────────────────────────
+    def check_and_record(self, id_hash, record):
+        key, value = self.prefix + id_hash, json.dumps(record)
+        try:
+            set_reply, current = self._call([self._set_args(key, value), ("GET", key)])
+        except StoreUnavailable:
+            self.fallbacks += 1
+            prev = self.local.check_and_record(id_hash, record)
+            if prev is None:
+                self._pending.append((id_hash, record))
+            return prev
+        if self._pending:
+            self._replay()
+        if set_reply is None and current is not None:      # NX lost: someone recorded it first
+            prev = json.loads(current)
+            self.local.put(id_hash, prev)
+            return prev
+        self.local.put(id_hash, record)
+        return None
+
+    def release(self, id_hash, record):
+        """SET NX made the key ours, so DEL removes only our record; best effort while the server is away."""
+        self.local.release(id_hash, record)
+        if (id_hash, record) in self._pending:
+            self._pending.remove((id_hash, record))
+            return
+        try:
+            self._call([("DEL", self.prefix + id_hash)])
+        except StoreUnavailable:
+            self.fallbacks += 1
+    def lookup_many(self, hashes):
+        hashes, out = list(hashes), {}
+        for i in range(0, len(hashes), MGET_BATCH):
+            part = hashes[i:i + MGET_BATCH]
+            try:
+                (values,) = self._call([("MGET",) + tuple(self.prefix + h for h in part)])
+            except StoreUnavailable:
+                self.fallbacks += 1
+                out.update(self.local.lookup_many(part))
+                continue
+            for h, v in zip(part, values):
+                if v is not None:
+                    out[h] = json.loads(v)
+        return out
+
+    def count(self):
+        try:
+            return self._call([("DBSIZE",)])[0]
+        except StoreUnavailable:
+            return None
+
+    def status(self):
+        down = time.monotonic() < self._down_until
+        return {"store": self.name, "server": f"{self.host}:{self.port}/{self.db}",
+                "state": "FALLBACK" if down else "OK", "calls": self.calls, "batches": self.batches,
+                "fallbacks": self.fallbacks, "errors": self.errors, "pendingReplay": len(self._pending),
+                "replayed": self.replayed, "localKeys": self.local.count(), "lastError": self.last_error}
+
+
+def from_env():
+    url = os.environ.get("GFNS_DUP_STORE")
+    if not url:
+        return LocalStore()
+    if url.startswith(("redis://", "resp://")):
+        return RespStore.from_url(url)
+    raise ValueError(f"GFNS_DUP_STORE: unsupported store {url!r} (expected redis://host:port/db)")
+
+
+# ── STAND-IN SERVER ──────────────────────────────────────────────────
+class StandInServer(socketserver.ThreadingTCPServer):
+    """
+    The slice of Redis the duplicate store uses (PING, GET, SET [NX] [PX|EX],
+    MGET, DEL, EXISTS, DBSIZE, FLUSHDB, SELECT), in memory. `delay_ms` holds
+    every reply back, to exercise the client's fallback.
+    """
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, addr=("127.0.0.1", 0), delay_ms=0):
+        super().__init__(addr, _RespHandler)
+        self.data     = {}
+        self.expires  = {}
+        self.lock     = threading.Lock()
+        self.delay_ms = delay_ms
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _live(self, key, now):
+        exp = self.expires.get(key)
+        if exp is not None and exp <= now:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def run(self, cmd):
+        name, args = cmd[0].upper(), cmd[1:]
+        now = time.time()
+        with self.lock:
+            if name == b"PING":
+                return b"+PONG\r\n"
+            if name == b"GET":
+                return _bulk(self.data[args[0]] if self._live(args[0], now) else None)
+            if name == b"MGET":
+                return b"*%d\r\n" % len(args) + b"".join(
+                    _bulk(self.data[k] if self._live(k, now) else None) for k in args)
+            if name == b"SET":
+                key, value, opts = args[0], args[1], [a.upper() for a in args[2:]]
+                if b"NX" in opts and self._live(key, now):
+                    return b"$-1\r\n"
+                self.data[key] = value
+                self.expires.pop(key, None)
+                for unit, scale in ((b"PX", 1000), (b"EX", 1)):
+                    if unit in opts:
+                        self.expires[key] = now + int(args[2 + opts.index(unit) + 1]) / scale
+                return b"+OK\r\n"
+            if name in (b"DEL", b"EXISTS"):
+                hits = [k for k in args if self._live(k, now)]
+                if name == b"DEL":
+                    for k in hits:
+                        self.data.pop(k, None)
+                        self.expires.pop(k, None)
+                return b":%d\r\n" % len(hits)
+            if name == b"DBSIZE":
+                return b":%d\r\n" % len(self.data)
+            if name == b"FLUSHDB":
+                self.data.clear()
+                self.expires.clear()
+                return b"+OK\r\n"
+            if name == b"SELECT":
+                return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % name
+
+
+def _bulk(v):
+    return b"$-1\r\n" if v is None else b"$%d\r\n%s\r\n" % (len(v), v)
+
+
+class _RespHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock, buf = self.request, bytearray()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                chunk = sock.recv(1 << 16)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buf += chunk
+            out, pos = [], 0
+            while True:                          # answer every complete command, then reply in one send
+                cmd, nxt = parse_reply(buf, pos)
+                if nxt < 0:
+                    break
+                pos = nxt
+                out.append(self.server.run(cmd) if isinstance(cmd, list) and cmd else b"-ERR bad request\r\n")
+            del buf[:pos]
+            if out:
+                if self.server.delay_ms:
+                    time.sleep(self.server.delay_ms / 1000)
+                try:
+                    sock.sendall(b"".join(out))
+                except OSError:
+                    return
+
+
+def main(argv=None):
+    ap  = argparse.ArgumentParser(description="Duplicate-store tools.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sv  = sub.add_parser("serve", help="run the in-memory Redis-protocol stand-in")
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=6399)
+    sv.add_argument("--delay-ms", type=float, default=0, help="hold every reply back this long")
+    args = ap.parse_args(argv)
+    server = StandInServer((args.host, args.port), args.delay_ms)
+    print(f"stand-in duplicate store on {args.host}:{server.port}"
+          + (f" (+{args.delay_ms:g} ms per reply)" if args.delay_ms else ""), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
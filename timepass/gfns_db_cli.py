@@ -0,0 +1,201 @@
+"""
+GFNS Database Viewer — Headless Command-Line Mode
+Run: python gfns_db_cli.py tables
+     python gfns_db_cli.py rows identity_sessions --limit 20 --where fraud_verdict=CLEAN
+     python gfns_db_cli.py schema liquidity_coverage
+     python gfns_db_cli.py export identity_sessions --format csv -o sessions.csv
+Same table catalogue as the desktop viewer, without tkinter. The database
+is opened read-only (mode=ro, or immutable=1 with --immutable) and every
+command walks tables in keyset pages, so memory stays flat at any size.
+"""
+
+import sys, os, csv, json, base64, argparse, sqlite3
+
+from gfns_db_core import DB_PATH, TABLES, table_names, open_readonly, \
+    fetch_page, row_key, like_filter
+
+EXPORT_PAGE = 5000
+MAX_CELL    = 40
+
+
+def table_columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    padded = token + "=" * (-len(token) % 4)
+    return tuple(json.loads(base64.urlsafe_b64decode(padded)))
+
+def build_spec(conn, args):
+    """Query spec from --filter / --where / --sort, validated against the table."""
+    columns = table_columns(conn, args.table)
+    if not columns:
+        raise SystemExit(f"error: table {args.table} does not exist in this database")
+    where, params = [], []
+    for cond in args.where or []:
+        col, sep, val = cond.partition("=")
+        if not sep or col not in columns:
+            raise SystemExit(f"error: --where expects COLUMN=VALUE with a column of {args.table}")
+        where.append(f"{col} = ?")
+        params.append(val)
+    if args.filter:
+        clause, extra = like_filter(columns, args.filter)
+        where.append(clause)
+        params += extra
+    sort_col = getattr(args, "sort", None) or "id"
+    if sort_col not in columns:
+        raise SystemExit(f"error: cannot sort by unknown column {sort_col}")
+    return columns, {"table": args.table, "where": where, "params": params,
+                     "sort_col": sort_col, "desc": getattr(args, "desc", False)}
+
+def iter_rows(conn, spec, page=EXPORT_PAGE):
+    """Every matching row in order, one keyset page in memory at a time."""
+    anchor = None
+    while True:
+        rows = fetch_page(conn, spec, anchor, page)
+        yield from rows
+        if len(rows) < page:
+            return
+        anchor = row_key(spec, rows[-1])
+
+def print_grid(columns, rows):
+    cells  = [[("" if v is None else str(v))[:MAX_CELL] for v in row] for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    print("  ".join(c.upper().ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+# ── COMMANDS ─────────────────────────────────────────────────────────
+def cmd_tables(conn, args):
+    out = []
+    for name, icon in TABLES:
+        if icon is None:
+            if not args.json:
+                print(name.strip(" ─"))
+            continue
+        try:
+            n = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        except sqlite3.OperationalError:
+            n = None        # listed in the catalogue but not created yet
+        out.append({"table": name, "rows": n})
+        if not args.json:
+            print(f"  {name:<26} {'—' if n is None else n:>12}")
+    if args.json:
+        print(json.dumps(out, indent=2))
+
+def cmd_schema(conn, args):
+    info = conn.execute(f"PRAGMA table_info({args.table})").fetchall()
+    if not info:
+        raise SystemExit(f"error: table {args.table} does not exist in this database")
+    print(f"CREATE TABLE {args.table}")
+    print_grid(["cid", "name", "type", "notnull", "dflt", "pk"],
+               [(r[0], r[1], r[2], "YES" if r[3] else "NO", r[4] or "—", "✓" if r[5] else "")
+                for r in info])
+    indexes = conn.execute(f"PRAGMA index_list({args.table})").fetchall()
+    for ix in indexes:
+        cols = [r[2] for r in conn.execute(f"PRAGMA index_info({ix[1]})")]
+        print(f"INDEX {ix[1]} ({', '.join(cols)})")
+
+def cmd_rows(conn, args):
+    columns, spec = build_spec(conn, args)
+    anchor = decode_cursor(args.cursor) if args.cursor else None
+    rows   = fetch_page(conn, spec, anchor, args.limit)
+    if args.json:
+        for row in rows:
+            print(json.dumps(dict(zip(columns, row))))
+    else:
+        print_grid(columns, rows)
+    if len(rows) == args.limit:
+        print(f"next page: --cursor {encode_cursor(row_key(spec, rows[-1]))}", file=sys.stderr)
+
+def cmd_export(conn, args):
+    columns, spec = build_spec(conn, args)
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    n = 0
+    try:
+        if args.format == "csv":
+            writer = csv.writer(out)
+            writer.writerow(columns)
+            for row in iter_rows(conn, spec):
+                writer.writerow(row)
+                n += 1
+        else:
+            array = args.format == "json"
+            if array:
+                out.write("[\n")
+            for row in iter_rows(conn, spec):
+                if array and n:
+                    out.write(",\n")
+                out.write(json.dumps(dict(zip(columns, row))))
+                if not array:
+                    out.write("\n")
+                n += 1
+            if array:
+                out.write("\n]\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{n} rows exported from {args.table}", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="gfns_db_cli.py",
+        description="Inspect gfns_data.db read-only, without the desktop viewer.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--immutable", action="store_true",
+        help="open with immutable=1: no locking, for files nothing is writing to")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("tables", help="list catalogue tables with row counts")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_tables)
+
+    p = sub.add_parser("schema", help="show a table's columns and indexes")
+    p.add_argument("table", choices=table_names())
+    p.set_defaults(func=cmd_schema)
+
+    for name, func, text in (("rows", cmd_rows, "print one page of rows"),
+                             ("export", cmd_export, "stream a whole table as CSV/JSON")):
+        p = sub.add_parser(name, help=text)
+        p.add_argument("table", choices=table_names())
+        p.add_argument("--where", action="append", metavar="COL=VALUE",
+                       help="exact-match filter, repeatable")
+        p.add_argument("--filter", metavar="TEXT", help="substring match on any column")
+        p.add_argument("--sort", metavar="COL", help="order by column (ties broken by id)")
+        p.add_argument("--desc", action="store_true")
+        p.set_defaults(func=func)
+        if name == "rows":
+            p.add_argument("--limit", type=int, default=50)
+            p.add_argument("--cursor", help="resume token printed by the previous page")
+            p.add_argument("--json", action="store_true", help="one JSON object per line")
+        else:
+            p.add_argument("--format", choices=("csv", "json", "ndjson"), default="csv")
+            p.add_argument("-o", "--output", help="file to write (default: stdout)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"error: database not found: {args.db}", file=sys.stderr)
+        return 1
+    conn = open_readonly(args.db, args.immutable)
+    try:
+        args.func(conn, args)
+    except BrokenPipeError:
+        # Output piped into head/less that exited early
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except sqlite3.Error as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
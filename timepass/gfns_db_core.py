@@ -0,0 +1,200 @@
+"""
+GFNS Database — shared table catalogue and query helpers
+Used by the desktop viewer (gfns_db_viewer.py) and its headless
+command-line mode (gfns_db_cli.py). Imports nothing from tkinter.
+"""
+
+import sqlite3, os
+from storage import Storage, data_version, schemas_with_table, ensure_index
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gfns_data.db")
+# Trigram FTS5 indexes for the filter box live in a sidecar file, so the
+# viewer never adds triggers or virtual tables to the backend's database.
+# The one thing it can write there is a (col, id) index per sorted column,
+# and only when $GFNS_VIEWER_SORT_INDEXES=1; otherwise header sorts scan.
+FTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gfns_viewer_fts.db")
+SORT_INDEXES = os.environ.get("GFNS_VIEWER_SORT_INDEXES") == "1"
+# Tables the backend UPDATEs or REPLACEs rows in: an id watermark can't keep
+# an FTS copy of them current, so the filter box uses LIKE on these.
+MUTABLE_TABLES = {"alerts", "anomaly_state", "identity_signatures", "bulk_load_checkpoints"}
+
+TABLES = [
+    ("── FINANCIAL ──────────────", None),
+    ("bank_capital_adequacy",       "🏦"),
+    ("liquidity_coverage",          "💧"),
+    ("debt_exposure",               "📊"),
+    ("solvency_stress",             "🔥"),
+    ("institution_financials",      "🏛"),
+    ("── FINANCIAL SHIELD ───────", None),
+    ("identity_sessions",           "🛡"),
+    ("embedded_data",               "🔗"),
+    ("binary_data",                 "⬛"),
+    ("encrypted_data",              "🔐"),
+]
+
+PAGE_SIZE = 200    # rows per keyset query
+
+# =====================================================================
+#  QUERY HELPERS — plain functions over a connection, no Tk involved
+#
+#  A "spec" describes what the grid is showing:
+#    {"table", "where": [clauses], "params": [...], "sort_col", "desc"}
+# =====================================================================
+
+def open_viewer_db():
+    # Shards attach before fts, so unqualified table names never resolve to an FTS table
+    conn = Storage(DB_PATH).reader(readonly=False, reserve=1)
+    conn.row_factory = sqlite3.Row
+    conn.execute("ATTACH DATABASE ? AS fts", (FTS_PATH,))
+    conn.execute("""CREATE TABLE IF NOT EXISTS fts.fts_state (
+        name TEXT PRIMARY KEY, columns TEXT, last_id INTEGER)""")
+    conn.commit()
+    return conn
+
+def open_readonly(path=DB_PATH, immutable=False):
+    """
+    Read-only connection: mode=ro never takes a write lock; immutable=1 also
+    skips locking and change detection, for snapshots nobody is writing to.
+    Shard files of a sharded database are attached the same way.
+    """
+    conn = Storage(path).reader(immutable=immutable)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def table_names():
+    return [name for name, icon in TABLES if icon is not None]
+
+def like_filter(columns, q):
+    """Substring match on any column, for text too short for the trigram index."""
+    pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    clause  = "(" + " OR ".join(f"CAST({c} AS TEXT) LIKE ? ESCAPE '\\'" for c in columns) + ")"
+    return clause, [pattern] * len(columns)
+
+def where_sql(spec, extra=None):
+    clauses = spec["where"] + ([extra] if extra else [])
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+def order_sql(spec):
+    d = " DESC" if spec["desc"] else ""
+    if spec["sort_col"] == "id":
+        return f" ORDER BY id{d}"
+    return f" ORDER BY {spec['sort_col']}{d}, id{d}"
+
+def keyset_clause(spec, anchor):
+    """WHERE clause selecting rows strictly after `anchor` in the spec's order."""
+    val, rid = anchor
+    col, desc = spec["sort_col"], spec["desc"]
+    if col == "id":
+        return ("id < ?" if desc else "id > ?"), [rid]
+    # SQLite sorts NULLs first ascending and last descending
+    if val is None:
+        if desc:
+            return f"({col} IS NULL AND id < ?)", [rid]
+        return f"(({col} IS NULL AND id > ?) OR {col} IS NOT NULL)", [rid]
+    if desc:
+        return f"(({col}, id) < (?, ?) OR {col} IS NULL)", [val, rid]
+    return f"(({col}, id) > (?, ?))", [val, rid]
+
+def row_key(spec, row):
+    return (row[spec["sort_col"]], row["id"])
+
+def anchor_at(conn, spec, offset):
+    """Key of the row at `offset` — used only when jumping to an unvisited page."""
+    row = conn.execute(
+        f"SELECT {spec['sort_col']}, id FROM {spec['table']}"
+        f"{where_sql(spec)}{order_sql(spec)} LIMIT 1 OFFSET ?",
+        spec["params"] + [offset]).fetchone()
+    return (row[0], row[1]) if row else None
+
+def fetch_page(conn, spec, anchor, limit=PAGE_SIZE):
+    extra, params = keyset_clause(spec, anchor) if anchor else (None, [])
+    return conn.execute(
+        f"SELECT * FROM {spec['table']}{where_sql(spec, extra)}{order_sql(spec)} LIMIT {limit}",
+        spec["params"] + params).fetchall()
+
+def fetch_pages(conn, spec, pages, anchors):
+    """Yield (page, rows) for each page in order, chaining keyset anchors between them."""
+    for p in pages:
+        anchor = anchors[p] if p in anchors else anchor_at(conn, spec, p * PAGE_SIZE - 1)
+        rows   = fetch_page(conn, spec, anchor)
+        if rows:
+            anchors[p + 1] = row_key(spec, rows[-1])
+        yield p, rows
+
+def count_rows(conn, spec):
+    """(data_version, max id, matching rows up to that id) — the baseline for refreshes."""
+    version = data_version(conn)
+    last_id = conn.execute(f"SELECT MAX(id) FROM {spec['table']}").fetchone()[0] or 0
+    total   = conn.execute(
+        f"SELECT COUNT(*) FROM {spec['table']}{where_sql(spec, 'id <= ?')}",
+        spec["params"] + [last_id]).fetchone()[0]
+    return version, last_id, total
+
+def poll_new_rows(conn, spec, last_version, last_id, uses_fts):
+    """None when nothing was committed since `last_version`, else (version, max id, new matches)."""
+    version = data_version(conn)
+    if version == last_version:
+        return None
+    max_id = conn.execute(f"SELECT MAX(id) FROM {spec['table']}").fetchone()[0] or 0
+    if max_id <= last_id:
+        return version, last_id, 0
+    if uses_fts:
+        sync_fts(conn, spec["table"])
+    added = conn.execute(
+        f"SELECT COUNT(*) FROM {spec['table']}{where_sql(spec, 'id > ? AND id <= ?')}",
+        spec["params"] + [last_id, max_id]).fetchone()[0]
+    return version, max_id, added
+
+def sync_fts(conn, table):
+    """
+    Bring the sidecar FTS5 index for `table` up to date. Every non-BLOB
+    column is indexed as text, as like_filter() matches it; only rows past
+    the last indexed id are added, so False (use LIKE) for MUTABLE_TABLES.
+    """
+    if table in MUTABLE_TABLES or not schemas_with_table(conn, table, views=True):
+        return False
+    cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")
+            if (r[2] or "").upper() != "BLOB"]
+    if not cols:
+        return False
+    col_list = ", ".join(cols)
+    state    = conn.execute("SELECT columns, last_id FROM fts.fts_state WHERE name = ?",
+                            (table,)).fetchone()
+    if state is None or state[0] != col_list:
+        conn.execute(f"DROP TABLE IF EXISTS fts.{table}")
+        conn.execute(f"CREATE VIRTUAL TABLE fts.{table} USING fts5({col_list}, tokenize='trigram')")
+        last_id = 0
+    else:
+        last_id = state[1]
+    max_id = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+    if max_id > last_id:
+        conn.execute(f"INSERT INTO fts.{table}(rowid, {col_list}) "
+                     f"SELECT id, {', '.join(f'CAST({c} AS TEXT)' for c in cols)} "
+                     f"FROM {table} WHERE id > ? AND id <= ?", (last_id, max_id))
+    conn.execute("INSERT OR REPLACE INTO fts.fts_state VALUES (?, ?, ?)",
+                 (table, col_list, max_id))
+    conn.commit()
+    return True
+
+def ensure_sort_index(conn, table, col):
+    """
+    Index (col, id) so header sorts page by keyset instead of sorting the
+    table. Writes to the backend's database: callers check SORT_INDEXES.
+    """
+    ensure_index(conn, f"ix_{table}_{col}", table, f"{col}, id")   # in every shard / partition
+    conn.commit()
+
+def top_up_counts(conn, counts):
+    """Per-table (count, max id): only the id range past the cached max is counted."""
+    out = {}
+    for name, icon in TABLES:
+        if icon is None:
+            continue
+        n, last = counts.get(name, (0, 0))
+        try:
+            added, top = conn.execute(
+                f"SELECT COUNT(*), MAX(id) FROM {name} WHERE id > ?", (last,)).fetchone()
+        except sqlite3.Error:
+            continue    # table not created yet
+        out[name] = (n + added, top) if added else (n, last)
+    return out
@@ -4,24 +4,14 @@ Run: python gfns_db_viewer.py
 Opens a real DB Browser-style window. No browser needed.
 """
 
-import sqlite3, os, threading, time
+import os, threading, queue, time, types
+from collections import OrderedDict
 import tkinter as tk
 from tkinter import ttk, messagebox, font
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gfns_data.db")
-
-TABLES = [
-    ("── FINANCIAL ──────────────", None),
-    ("bank_capital_adequacy",       "🏦"),
-    ("liquidity_coverage",          "💧"),
-    ("debt_exposure",               "📊"),
-    ("solvency_stress",             "🔥"),
-    ("── FINANCIAL SHIELD ───────", None),
-    ("identity_sessions",           "🛡"),
-    ("embedded_data",               "🔗"),
-    ("binary_data",                 "⬛"),
-    ("encrypted_data",              "🔐"),
-]
+from gfns_db_core import (DB_PATH, TABLES, PAGE_SIZE, SORT_INDEXES, open_viewer_db, row_key,
+                          fetch_pages, count_rows, poll_new_rows, sync_fts,
+                          ensure_sort_index, top_up_counts, like_filter)
 
 COL_WIDTHS = {
     "id":                     45,
@@ -67,14 +57,30 @@ COL_WIDTHS = {
     "character":              60,
     "binary_rep":             90,
     "decimal_val":            70,
-    "salt_b64":              180,
+    "hmac_sha256":           180,
+    "nonce_b64":             180,
     "cipher_b64":            180,
-    "hmac_b64":              180,
+    "tag_b64":               180,
     "algo":                  180,
     "cipher_len":             75,
     "decrypted_ok":           80,
 }
 
+# Virtualized grid: only the visible window (plus a prefetch margin) is ever
+# fetched from SQLite, one keyset page (PAGE_SIZE rows) at a time.
+PREFETCH_PAGES = 1      # pages loaded ahead of / behind the visible window
+CACHE_PAGES    = 12     # pages kept in memory before the oldest is dropped
+ROW_HEIGHT     = 24     # must match the Treeview rowheight style
+HEADER_HEIGHT  = 28
+FILTER_DEBOUNCE_MS = 250
+AUTOREFRESH_MS     = 5000
+FTS_MIN_QUERY      = 3  # trigram tokenizer needs at least 3 characters
+WORKER_POLL_MS     = 15     # how often the Tk loop drains worker results
+DRAIN_BUDGET_S     = 0.012  # max time spent applying results per drain
+PROGRESS_STEPS     = 2000   # VM steps between cancellation checks
+
+STATUS_COLUMNS = ("status", "fraud_verdict", "concentration_risk", "repo_market_access")
+
 STATUS_COLOURS = {
     "HEALTHY":   "#2ecc71",
     "WARNING":   "#f39c12",
@@ -91,6 +97,82 @@ STATUS_COLOURS = {
 }
 
 
+class QueryWorker:
+    """
+    Runs SQLite jobs on one background thread and its own connection (the
+    viewer keeps two: one for pages and lookups, one for row counts).
+    Jobs go in on a named channel; superseding a channel drops its queued
+    jobs and interrupts the running one through the progress handler.
+    Results wait in a queue that the Tk loop drains with after(), so no
+    Tk call ever happens off the main thread. A job returning a generator
+    streams each yielded chunk back as its own result.
+    """
+
+    def __init__(self, connect, on_error):
+        self._connect  = connect
+        self._on_error = on_error
+        self._jobs     = queue.Queue()
+        self._results  = queue.Queue()
+        self._gen      = {}         # channel -> current generation
+        self._running  = None       # (channel, gen) of the job in progress
+        self._lock     = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, channel, fn, callback, errback=None, supersede=False):
+        with self._lock:
+            if supersede:
+                self._gen[channel] = self._gen.get(channel, 0) + 1
+            gen = self._gen.setdefault(channel, 0)
+        self._jobs.put((channel, gen, fn, callback, errback or self._on_error))
+
+    def cancel(self, channel):
+        with self._lock:
+            self._gen[channel] = self._gen.get(channel, 0) + 1
+
+    def poll(self):
+        """Next (callback, value) still current, or None. Call from the Tk thread only."""
+        while True:
+            try:
+                channel, gen, fn, value = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            if not self._stale(channel, gen):
+                return fn, value
+
+    def _stale(self, channel, gen):
+        return self._gen.get(channel, 0) != gen
+
+    def _interrupt(self):
+        running = self._running
+        return 1 if running and self._stale(*running) else 0
+
+    def _run(self):
+        conn = self._connect()
+        conn.set_progress_handler(self._interrupt, PROGRESS_STEPS)
+        while True:
+            channel, gen, fn, callback, errback = self._jobs.get()
+            if self._stale(channel, gen):
+                continue
+            self._running = (channel, gen)
+            try:
+                result = fn(conn)
+                if isinstance(result, types.GeneratorType):
+                    for chunk in result:
+                        if self._stale(channel, gen):
+                            result.close()
+                            break
+                        self._results.put((channel, gen, callback, chunk))
+                else:
+                    self._results.put((channel, gen, callback, result))
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if not self._stale(channel, gen):
+                    self._results.put((channel, gen, errback, e))
+            finally:
+                self._running = None
+
+
 class GFNSViewer(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -103,12 +185,40 @@ class GFNSViewer(tk.Tk):
         self.search_var    = tk.StringVar()
         self.row_count_var = tk.StringVar(value="0 rows")
         self.status_var    = tk.StringVar(value="Ready")
-        self._all_rows     = []
         self._columns      = []
+        self._status_idx   = []
+        self._total        = 0              # rows matching the current filter
+        self._total_known  = True           # False while the count query is running
+        self._top          = 0              # index of the first visible row
+        self._visible      = 30             # rows that fit in the grid
+        self._sort_col     = "id"
+        self._sort_desc    = False
+        self._where        = []             # SQL filter clauses
+        self._params       = []
+        self._pages        = OrderedDict()  # page index -> rows
+        self._page_after   = {0: None}      # page index -> keyset anchor (sort value, id)
+        self._pending      = set()          # pages requested from the worker
+        self._epoch        = 0              # bumped whenever the grid's query changes
+        self._suspend_filter = False
+        self._filter_job   = None
+        self._uses_fts     = False
+        self._data_version = None           # PRAGMA data_version at the last poll, on _worker's connection
+        self._last_id      = 0              # highest id already counted in the grid
+        self._selected_id  = None
+        self._counts       = {}             # table -> (row count, max id counted)
+        self._sidebar_items = {}            # table -> sidebar iid
+
+        self._worker = QueryWorker(open_viewer_db,
+                                   lambda e: self.status_var.set(f"Error: {e}"))
+        # COUNT(*) scans the whole table; on its own thread and connection
+        # it can't hold up the pages queued behind it on _worker.
+        self._counter = QueryWorker(open_viewer_db,
+                                    lambda e: self.status_var.set(f"Error: {e}"))
 
         self._build_style()
         self._build_ui()
         self._check_db()
+        self.after(WORKER_POLL_MS, self._drain_worker)
         self.after(200, lambda: self._load_table("bank_capital_adequacy"))
         self._start_autorefresh()
 
@@ -121,7 +231,7 @@ class GFNSViewer(tk.Tk):
         style.configure("Treeview",
             background="#0f0f1a",
             foreground="#c8d0e0",
-            rowheight=24,
+            rowheight=ROW_HEIGHT,
             fieldbackground="#0f0f1a",
             borderwidth=0,
             font=("Consolas", 10),
@@ -199,7 +309,7 @@ class GFNSViewer(tk.Tk):
             highlightthickness=1, highlightcolor="#3a3a6a",
             highlightbackground="#2a2a4a", width=24)
         search_entry.pack(side="left", padx=6, pady=6)
-        self.search_var.trace_add("write", lambda *_: self._filter())
+        self.search_var.trace_add("write", lambda *_: self._on_search_change())
 
         tk.Label(toolbar, textvariable=self.row_count_var,
                  bg="#161630", fg="#4a5a7a",
@@ -248,18 +358,32 @@ class GFNSViewer(tk.Tk):
         self._tree = ttk.Treeview(grid_frame, style="Treeview",
                                   show="headings", selectmode="browse")
 
-        vsb = ttk.Scrollbar(grid_frame, orient="vertical",
-                            command=self._tree.yview,
+        # The vertical scrollbar maps to the total row count, not to the
+        # handful of Treeview items actually on screen.
+        self._vsb = ttk.Scrollbar(grid_frame, orient="vertical",
+                            command=self._on_vscroll,
                             style="Dark.Vertical.TScrollbar")
         hsb = ttk.Scrollbar(grid_frame, orient="horizontal",
                             command=self._tree.xview,
                             style="Dark.Horizontal.TScrollbar")
-        self._tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self._tree.configure(xscrollcommand=hsb.set)
 
-        vsb.pack(side="right", fill="y")
+        self._vsb.pack(side="right", fill="y")
         hsb.pack(side="bottom", fill="x")
         self._tree.pack(fill="both", expand=True)
 
+        self._tree.bind("<<TreeviewSelect>>", self._on_grid_select)
+        self._tree.bind("<Configure>",  lambda e: self._on_resize(e.height))
+        self._tree.bind("<MouseWheel>", lambda e: self._scroll_by(-3 if e.delta > 0 else 3))
+        self._tree.bind("<Button-4>",   lambda e: self._scroll_by(-3))
+        self._tree.bind("<Button-5>",   lambda e: self._scroll_by(3))
+        self._tree.bind("<Up>",         lambda e: self._on_arrow(-1))
+        self._tree.bind("<Down>",       lambda e: self._on_arrow(1))
+        self._tree.bind("<Prior>",      lambda e: self._scroll_by(-self._visible))
+        self._tree.bind("<Next>",       lambda e: self._scroll_by(self._visible))
+        self._tree.bind("<Home>",       lambda e: self._scroll_to(0) or "break")
+        self._tree.bind("<End>",        lambda e: self._scroll_to(self._total) or "break")
+
         # Row tags for status colours
         for status, colour in STATUS_COLOURS.items():
             self._tree.tag_configure(f"status_{status}", foreground=colour)
@@ -293,8 +417,8 @@ class GFNSViewer(tk.Tk):
                 self._sidebar.tag_configure("group",
                     foreground="#3a4a6a", font=("Consolas", 8))
             else:
-                self._sidebar.insert("", "end", text=f"  {icon}  {name}",
-                    values=(name,), tags=("table",))
+                self._sidebar_items[name] = self._sidebar.insert("", "end",
+                    text=f"  {icon}  {name}", values=(name,), tags=("table",))
         self._sidebar.tag_configure("table", foreground="#6e7a9a")
 
     def _on_sidebar_select(self, event):
@@ -314,101 +438,301 @@ class GFNSViewer(tk.Tk):
             messagebox.showwarning("Database not found",
                 f"Could not find:\n{DB_PATH}\n\nRun backend_server.py first to create the database.")
 
-    def _get_conn(self):
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def _drain_worker(self):
+        """Apply finished worker results on the Tk thread, within a small time budget."""
+        deadline = time.monotonic() + DRAIN_BUDGET_S
+        while time.monotonic() < deadline:
+            item = self._worker.poll() or self._counter.poll()
+            if item is None:
+                break
+            callback, value = item
+            callback(value)
+        self.after(WORKER_POLL_MS, self._drain_worker)
+
+    def _spec(self):
+        return {"table": self.current_table.get(), "where": list(self._where),
+                "params": list(self._params), "sort_col": self._sort_col,
+                "desc": self._sort_desc}
 
     # ─────────────────────────────────────────────────────
     def _load_table(self, table_name):
         self.current_table.set(table_name)
+        self._suspend_filter = True
         self.search_var.set("")
+        self._suspend_filter = False
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+            self._filter_job = None
         self.status_var.set(f"Loading {table_name}...")
-
-        try:
-            conn = self._get_conn()
-            cur  = conn.cursor()
-            rows = cur.execute(f"SELECT * FROM {table_name}").fetchall()
-            conn.close()
-        except Exception as e:
-            self.status_var.set(f"Error: {e}")
-            return
-
-        self._columns  = list(rows[0].keys()) if rows else []
-        self._all_rows = [dict(r) for r in rows]
-
-        self._table_label.config(text=f"  SELECT * FROM {table_name}   ({len(rows)} rows)")
-        self._render_grid(self._all_rows)
+        self._worker.submit("table",
+            lambda conn: conn.execute(f"PRAGMA table_info({table_name})").fetchall(),
+            lambda info: self._on_table_info(table_name, info), supersede=True)
+
+    def _on_table_info(self, table_name, info):
+        self._columns   = [r[1] for r in info]
+        self._sort_col  = "id"
+        self._sort_desc = False
+        self._uses_fts  = False
+        self._where, self._params = [], []
+        self._setup_columns()
+        self._table_label.config(text=f"  SELECT * FROM {table_name}")
+        self._requery()
         self._update_sidebar_counts()
-        self.status_var.set(f"Table: {table_name}  |  {len(rows)} rows  |  {len(self._columns)} columns")
 
-    def _render_grid(self, rows):
-        # Clear
+    def _setup_columns(self):
         for col in self._tree["columns"]:
             self._tree.heading(col, text="")
-        self._tree["columns"] = []
-        for item in self._tree.get_children():
-            self._tree.delete(item)
+        self._tree.delete(*self._tree.get_children())
+        self._tree["columns"] = self._columns
 
-        if not rows:
-            self.row_count_var.set("0 rows")
-            return
-
-        cols = list(rows[0].keys())
-        self._tree["columns"] = cols
-
-        for col in cols:
+        for col in self._columns:
             w = COL_WIDTHS.get(col, 120)
             self._tree.heading(col, text=col.upper(),
                 command=lambda c=col: self._sort_by(c))
             self._tree.column(col, width=w, minwidth=40,
                              stretch=False, anchor="w")
-
+        self._status_idx = [self._columns.index(c) for c in STATUS_COLUMNS if c in self._columns]
+
+    def _requery(self, recount=True):
+        """Drop cached pages and re-render from the top with the current filter/sort."""
+        self._epoch += 1
+        self._worker.cancel("grid")
+        self._pages.clear()
+        self._page_after = {0: None}
+        self._pending.clear()
+        self._top = 0
+        if not self._columns:
+            self._total, self._total_known = 0, True
+        elif recount:
+            # The count runs on _counter while _worker streams pages in;
+            # until it lands the total grows with whatever has been loaded.
+            self._total, self._total_known = 0, False
+            spec = self._spec()
+            self._counter.submit("count", lambda conn: count_rows(conn, spec),
+                                 self._on_count, supersede=True)
+        self._render_window()
+
+    def _on_count(self, result):
+        # data_version only compares on the connection that read it; the count
+        # ran on _counter's, so the next poll (on _worker) checks MAX(id) regardless
+        _, self._last_id, self._total = result
+        self._data_version = None
+        self._total_known = True
+        self._top = max(0, min(self._top, self._total - self._visible))
+        self._render_window()
+        table = self.current_table.get()
+        self._table_label.config(text=f"  SELECT * FROM {table}   ({self._total} rows)")
+        self.status_var.set(f"Table: {table}  |  {self._total} rows  |  {len(self._columns)} columns")
+
+    # ── paging ───────────────────────────────────────────
+    def _request_pages(self, first, last):
+        """Ask the worker for every uncached page in [first, last], superseding older asks."""
+        if self._total_known:
+            last = min(last, (self._total - 1) // PAGE_SIZE)
+        wanted = [p for p in range(max(0, first), last + 1) if p not in self._pages]
+        if not wanted or set(wanted) == self._pending:
+            return
+        self._pending = set(wanted)
+        spec    = self._spec()
+        anchors = {p: self._page_after[p] for p in wanted if p in self._page_after}
+        epoch   = self._epoch
+        self._worker.submit("grid", lambda conn: fetch_pages(conn, spec, wanted, anchors),
+                            lambda chunk: self._on_page(epoch, *chunk), supersede=True)
+
+    def _on_page(self, epoch, p, rows):
+        if epoch != self._epoch:
+            return
+        self._pending.discard(p)
+        self._pages[p] = rows
+        if rows:
+            self._page_after[p + 1] = row_key(self._spec(), rows[-1])
+        if not self._total_known:
+            self._total = max(self._total, p * PAGE_SIZE + len(rows))
+        while len(self._pages) > CACHE_PAGES:
+            self._pages.popitem(last=False)
+        if self._top // PAGE_SIZE <= p <= (self._top + self._visible) // PAGE_SIZE:
+            self._render_window()
+
+    def _window_rows(self):
+        """Rows for the visible window; None marks a row whose page is still loading."""
+        end = self._top + self._visible
+        if self._total_known:
+            end = min(end, self._total)
+        if end <= self._top:
+            return []
+        first, last = self._top // PAGE_SIZE, (end - 1) // PAGE_SIZE
+        self._request_pages(first - PREFETCH_PAGES, last + PREFETCH_PAGES)
+        rows = []
+        for p in range(first, last + 1):
+            if p in self._pages:
+                self._pages.move_to_end(p)
+                rows.extend(self._pages[p])
+            elif self._total_known:
+                rows.extend([None] * PAGE_SIZE)
+            else:
+                break
+        off = self._top - first * PAGE_SIZE
+        return rows[off:off + (end - self._top)]
+
+    # ── rendering ────────────────────────────────────────
+    def _render_window(self):
+        rows     = self._window_rows()
+        items    = self._tree.get_children()
+        selected = None
+        if len(items) > len(rows):
+            self._tree.delete(*items[len(rows):])
+
+        loading = ["…"] + [""] * (len(self._columns) - 1)
         for i, row in enumerate(rows):
-            vals   = [row[c] for c in cols]
-            status = row.get("status") or row.get("fraud_verdict") or \
-                     row.get("concentration_risk") or row.get("repo_market_access") or ""
-            tags   = []
-            if status in STATUS_COLOURS:
-                tags.append(f"status_{status}")
-            if i % 2 == 1:
+            tags = []
+            if row is None:
+                vals = loading
+            else:
+                vals   = list(row)
+                status = next((row[j] for j in self._status_idx if row[j]), "")
+                if status in STATUS_COLOURS:
+                    tags.append(f"status_{status}")
+            if (self._top + i) % 2 == 1:
                 tags.append("alt")
-            self._tree.insert("", "end", values=vals, tags=tags)
-
-        self.row_count_var.set(f"{len(rows)} rows")
+            if i < len(items):
+                self._tree.item(items[i], values=vals, tags=tags)
+            else:
+                self._tree.insert("", "end", values=vals, tags=tags)
+            if row is not None and row["id"] == self._selected_id:
+                selected = self._tree.get_children()[i]
+
+        # Keep the highlight on the same record, not the same screen slot
+        if selected:
+            self._tree.selection_set(selected)
+        elif self._tree.selection():
+            self._tree.selection_remove(*self._tree.selection())
+
+        if self._total:
+            self._vsb.set(self._top / self._total,
+                          min(1.0, (self._top + self._visible) / self._total))
+        else:
+            self._vsb.set(0, 1)
+        self.row_count_var.set(f"{self._total} rows" if self._total_known else f"{self._total}+ rows")
+
+    def _on_grid_select(self, event):
+        sel = self._tree.selection()
+        if sel and "id" in self._columns:
+            rid = self._tree.set(sel[0], "id")
+            self._selected_id = int(rid) if rid.isdigit() else None
+
+    def _scroll_to(self, top):
+        top = max(0, min(int(top), self._total - self._visible))
+        if top != self._top:
+            self._top = top
+            self._render_window()
+
+    def _scroll_by(self, delta):
+        self._scroll_to(self._top + delta)
+        return "break"
+
+    def _on_vscroll(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(float(args[1]) * self._total)
+        elif args[0] == "scroll":
+            step = self._visible if args[2] == "pages" else 1
+            self._scroll_to(self._top + int(args[1]) * step)
+
+    def _on_arrow(self, delta):
+        items = self._tree.get_children()
+        sel   = self._tree.selection()
+        edge  = (items[0] if delta < 0 else items[-1]) if items else None
+        if sel and sel[0] != edge:
+            return None     # let the Treeview move the selection itself
+        return self._scroll_by(delta)
+
+    def _on_resize(self, height):
+        visible = max(1, (height - HEADER_HEIGHT) // ROW_HEIGHT)
+        if visible != self._visible:
+            self._visible = visible
+            self._top = max(0, min(self._top, self._total - visible))
+            self._render_window()
 
     # ─────────────────────────────────────────────────────
+    def _on_search_change(self):
+        if self._suspend_filter:
+            return
+        # Whatever the grid is still computing for the old text is now stale
+        self._worker.cancel("filter")
+        self._counter.cancel("count")
+        self._worker.cancel("grid")
+        self._pending.clear()
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DEBOUNCE_MS, self._filter)
+
     def _filter(self):
-        q = self.search_var.get().lower()
+        self._filter_job = None
+        if not self._columns:
+            return
+        table = self.current_table.get()
+        q     = self.search_var.get().strip()
+        if len(q) < FTS_MIN_QUERY:
+            self._apply_filter(q, False)
+            return
+        self.status_var.set(f"Searching {table}...")
+        self._worker.submit("filter", lambda conn: sync_fts(conn, table),
+            lambda ok: self._apply_filter(q, ok),
+            lambda e: (self.status_var.set(f"Search index unavailable: {e}"),
+                       self._apply_filter(q, False)),
+            supersede=True)
+
+    def _apply_filter(self, q, use_fts):
+        table = self.current_table.get()
+        self._uses_fts = bool(q) and use_fts
         if not q:
-            filtered = self._all_rows
+            self._where, self._params = [], []
+        elif use_fts:
+            clause = f"id IN (SELECT rowid FROM fts.{table} WHERE {table} MATCH ?)"
+            self._params = ['"' + q.replace('"', '""') + '"']
+            if q.isdigit():
+                clause += " OR id = ?"
+                self._params.append(int(q))
+            self._where = [f"({clause})"]
         else:
-            filtered = [r for r in self._all_rows
-                        if any(q in str(v).lower() for v in r.values())]
-        self._render_grid(filtered)
+            # Too short for trigrams, or a table without an FTS index: LIKE scan
+            clause, self._params = like_filter(self._columns, q)
+            self._where = [clause]
+        self._requery()
 
     def _sort_by(self, col):
-        rows = self._all_rows[:]
-        try:
-            rows.sort(key=lambda r: (r[col] is None, r[col]))
-        except TypeError:
-            rows.sort(key=lambda r: str(r[col] or ""))
-        self._all_rows = rows
-        self._render_grid(rows)
+        if col == self._sort_col:
+            self._sort_desc = not self._sort_desc
+            self._requery(recount=False)
+            return
+        self._sort_col, self._sort_desc = col, False
+        if col == "id" or not SORT_INDEXES:
+            self._requery(recount=False)
+            return
+        table = self.current_table.get()
+        self.status_var.set(f"Indexing {table}.{col} for sorting...")
+
+        def indexed(_):
+            self.status_var.set(f"Table: {table}  |  sorted by {col}")
+            self._requery(recount=False)
+
+        def unindexed(e):
+            self.status_var.set(f"Sorting {table}.{col} without an index: {e}")
+            self._requery(recount=False)
+
+        self._worker.submit("index", lambda conn: ensure_sort_index(conn, table, col),
+                            indexed, unindexed, supersede=True)
 
     # ─────────────────────────────────────────────────────
     def _show_schema(self):
         tbl = self.current_table.get()
         if not tbl:
             return
-        try:
-            conn = self._get_conn()
-            info = conn.execute(f"PRAGMA table_info({tbl})").fetchall()
-            conn.close()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-            return
+        self._worker.submit("schema",
+            lambda conn: conn.execute(f"PRAGMA table_info({tbl})").fetchall(),
+            lambda info: self._open_schema_window(tbl, info),
+            lambda e: messagebox.showerror("Error", str(e)), supersede=True)
 
+    def _open_schema_window(self, tbl, info):
         win = tk.Toplevel(self)
         win.title(f"Schema — {tbl}")
         win.geometry("700x420")
@@ -446,38 +770,72 @@ class GFNSViewer(tk.Tk):
 
     # ─────────────────────────────────────────────────────
     def _update_sidebar_counts(self):
-        try:
-            conn = self._get_conn()
-            for name, icon in TABLES:
-                if icon is None:
-                    continue
-                n = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
-                # update sidebar text to include count
-                for iid in self._sidebar.get_children():
-                    item = self._sidebar.item(iid)
-                    if "table" in item["tags"] and item["values"] and item["values"][0] == name:
-                        self._sidebar.item(iid, text=f"  {icon}  {name}  [{n}]")
-            conn.close()
-        except Exception:
-            pass
+        counts = dict(self._counts)
+        self._counter.submit("counts", lambda conn: top_up_counts(conn, counts),
+                             self._on_counts, supersede=True)
+
+    def _on_counts(self, counts):
+        self._counts = counts
+        for name, icon in TABLES:
+            if name in counts:
+                self._sidebar.item(self._sidebar_items[name],
+                                   text=f"  {icon}  {name}  [{counts[name][0]}]")
 
     # ─────────────────────────────────────────────────────
     def _refresh(self):
         tbl = self.current_table.get()
         if tbl:
+            self._counts.clear()
             self._load_table(tbl)
 
     def _start_autorefresh(self):
-        def loop():
-            while True:
-                time.sleep(5)
-                tbl = self.current_table.get()
-                if tbl in ("identity_sessions","embedded_data","binary_data","encrypted_data"):
-                    self.after(0, self._refresh)
-        t = threading.Thread(target=loop, daemon=True)
-        t.start()
+        self.after(AUTOREFRESH_MS, self._autorefresh_tick)
+
+    def _autorefresh_tick(self):
+        if self._columns and self._total_known:
+            spec    = self._spec()
+            epoch   = self._epoch
+            version, last_id, uses_fts = self._data_version, self._last_id, self._uses_fts
+            self._worker.submit("poll",
+                lambda conn: poll_new_rows(conn, spec, version, last_id, uses_fts),
+                lambda result: self._on_poll(epoch, result),
+                lambda e: self.status_var.set(f"Auto-refresh error: {e}"), supersede=True)
+        self.after(AUTOREFRESH_MS, self._autorefresh_tick)
+
+    def _on_poll(self, epoch, result):
+        """Append rows newer than the last seen id without resetting scroll or selection."""
+        if result is None or epoch != self._epoch:
+            return              # nobody has committed, or the grid moved on meanwhile
+        self._data_version, max_id, added = result
+        self._update_sidebar_counts()
+        self._last_id = max_id
+        if not added:
+            return
+
+        table        = self.current_table.get()
+        old_total    = self._total
+        self._total += added
+        if self._sort_col == "id" and not self._sort_desc:
+            # New rows land after everything cached: only the partial tail page is stale
+            tail = old_total // PAGE_SIZE
+            for p in [p for p in self._pages if p >= tail]:
+                del self._pages[p]
+            for p in [p for p in self._page_after if p > tail]:
+                del self._page_after[p]
+        else:
+            self._pages.clear()
+            self._page_after = {0: None}
+            if self._sort_col == "id" and self._top > 0:
+                self._top += added  # newest-first: keep the same rows on screen
+        # Page fetches already in flight predate the new rows
+        self._epoch += 1
+        self._pending.clear()
+        self._worker.cancel("grid")
+        self._render_window()
+        self._table_label.config(text=f"  SELECT * FROM {table}   ({self._total} rows)")
+        self.status_var.set(f"Table: {table}  |  {self._total} rows  |  +{added} new")
 
 
 if __name__ == "__main__":
     app = GFNSViewer()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
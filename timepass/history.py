@@ -0,0 +1,122 @@
+"""
+GFNS HISTORY — stored rows, newest first, one keyset page at a time
+
+Pages are keyed on (created_at, id): the next page starts strictly after
+the last row of this one, so page 1,000 costs what page 1 does. Each
+filter column gets an index (column, created_at, id), and (created_at, id)
+serves unfiltered reads; the filter and the sort are both answered from
+the index, and only the rows actually returned are read from the table.
+
+  cursor    opaque token from the previous page's nextCursor
+  order     desc (default) or asc
+  limit     rows per page, clamped to MAX_PAGE
+  fields    comma-separated projection; id and created_at are always included
+  risk_level / scenario / hub_bank / fraud_verdict   exact-match filters
+
+Rows without a created_at (filings bulk-loaded with only recorded_at)
+come after every dated row when paging newest first, by id, and before
+them oldest first — the order SQLite gives NULLs.
+
+A table may live in several files (storage.py shards and year
+partitions); each is queried directly with the same keyset and the pages
+merged, rather than sorting the UNION ALL view.
+
+Reads never write: the indexes are made by the backend at startup, by the
+backend's write path when it creates a table (a new partition included)
+or adds created_at to one, and by bulk_load.py after a load.
+"""
+
+import json, base64
+
+from storage import schemas_with_table
+
+TS_COLUMN    = "created_at"
+FILTERS      = ("risk_level", "scenario", "hub_bank", "fraud_verdict")
+DEFAULT_PAGE = 50
+MAX_PAGE     = 500
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(ts, row_id):
+    return base64.urlsafe_b64encode(json.dumps([ts, row_id]).encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    """(created_at or None, id) from a nextCursor token."""
+    try:
+        ts, row_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise CursorError("cursor is not a token returned by this endpoint") from None
+    if not isinstance(row_id, int) or not (ts is None or isinstance(ts, str)):
+        raise CursorError("cursor is not a token returned by this endpoint")
+    return ts, row_id
+
+
+def ensure_history_indexes(conn, table, schema=None):
+    """
+    (created_at, id) plus (filter, created_at, id) for each filter column the
+    table has — in `schema`, or in every file holding it. Tables without
+    created_at are skipped. The caller commits.
+    """
+    for s in [schema] if schema else schemas_with_table(conn, table):
+        columns = [row[1] for row in conn.execute(f"PRAGMA {s}.table_info({table})")]
+        if TS_COLUMN not in columns:
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {s}.ix_{table}_hist ON {table}({TS_COLUMN}, id)")
+        for col in FILTERS:
+            if col in columns:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {s}.ix_{table}_hist_{col} "
+                             f"ON {table}({col}, {TS_COLUMN}, id)")
+
+
+def _segment(conn, schemas, table, fields, where, params, dated, after, desc, limit):
+    """Up to `limit` rows from every schema, dated (created_at set) or undated, past `after`."""
+    direction = "DESC" if desc else "ASC"
+    cond, args = list(where), list(params)
+    if dated:
+        cond.append(f"{TS_COLUMN} IS NOT NULL")
+        if after is not None:
+            cond.append(f"({TS_COLUMN}, id) {'<' if desc else '>'} (?, ?)")
+            args += list(after)
+        order = f"{TS_COLUMN} {direction}, id {direction}"
+    else:
+        cond.append(f"{TS_COLUMN} IS NULL")
+        if after is not None:
+            cond.append(f"id {'<' if desc else '>'} ?")
+            args.append(after[1])
+        order = f"id {direction}"
+    rows = []
+    for s in schemas:
+        rows += conn.execute(f"SELECT {', '.join(fields)} FROM {s}.{table} WHERE {' AND '.join(cond)} "
+                             f"ORDER BY {order} LIMIT ?", args + [limit]).fetchall()
+    ts_i, id_i = fields.index(TS_COLUMN), fields.index("id")
+    rows.sort(key=(lambda r: r[id_i]) if not dated else (lambda r: (r[ts_i], r[id_i])), reverse=desc)
+    return rows[:limit]
+
+def query_page(conn, table, fields, filters=None, cursor=None, limit=DEFAULT_PAGE, desc=True):
+    """
+    (rows as dicts, nextCursor or None). `fields` must include id and
+    created_at; `filters` is {column: value}; column names are trusted
+    (the route checks them against the table).
+    """
+    schemas = schemas_with_table(conn, table)
+    where   = [f"{col} = ?" for col in filters or {}]
+    params  = list((filters or {}).values())
+    after   = decode_cursor(cursor) if cursor else None
+    # desc: dated rows, then undated; asc: undated, then dated
+    plan = [True, False] if desc else [False, True]
+    if after is not None:
+        plan = plan[plan.index(after[0] is not None):]
+    rows = []
+    for i, dated in enumerate(plan):
+        seg_after = after if (i == 0 and after is not None) else None
+        rows += _segment(conn, schemas, table, fields, where, params, dated, seg_after, desc, limit + 1 - len(rows))
+        if len(rows) > limit:
+            break
+    more = len(rows) > limit
+    rows = rows[:limit]
+    ts_i, id_i = fields.index(TS_COLUMN), fields.index("id")
+    nxt = encode_cursor(rows[-1][ts_i], rows[-1][id_i]) if more else None
+    return [dict(zip(fields, r)) for r in rows], nxt
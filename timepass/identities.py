@@ -0,0 +1,42 @@
+"""
+GFNS IDENTITIES — the synthetic identities behind the shield demo and the
+load tools (loadgen.py, replay.py). Standard library only and no side
+effects on import.
+"""
+
+import random
+
+FIRST_NAMES = ["Arjun","Priya","Rahul","Sneha","Vikram","Ananya","Rohit","Kavya",
+                "James","Emma","Liam","Olivia","Noah","Ava","William","Sophia",
+                "Ahmed","Fatima","Omar","Zara","Wei","Mei","Hiroshi","Yuki"]
+LAST_NAMES  = ["Sharma","Patel","Singh","Kumar","Gupta","Nair","Reddy","Joshi",
+                "Smith","Johnson","Williams","Brown","Jones","Garcia","Martinez",
+                "Ali","Khan","Hassan","Ibrahim","Chen","Wang","Tanaka","Sato"]
+DOMAINS     = ["gmail.com","yahoo.com","outlook.com","protonmail.com","icloud.com","hotmail.com"]
+ID_TYPES    = ["Passport","Aadhaar","PAN Card","Driver License","National ID","Voter ID"]
+BANKS       = ["HDFC Bank","ICICI Bank","SBI","Axis Bank","Kotak","Yes Bank",
+               "Chase","Barclays","HSBC","Deutsche Bank","Citi","BNP Paribas"]
+CARD_PREFIXES = ["4111","4532","4929","5234","5412","5500","3782","3714"]
+RISKS       = ["LOW","MODERATE","ELEVATED","HIGH"]
+
+def random_identity(rng=random):
+    """
+    A random realistic identity, new values every call. `rng` is any
+    random.Random (seeded per worker by loadgen); each number is one
+    randrange rather than one draw per digit.
+    """
+    first = rng.choice(FIRST_NAMES)
+    last  = rng.choice(LAST_NAMES)
+    return {
+        "name":    f"{first} {last}",
+        "age":     str(rng.randint(22, 68)),
+        "phone":   f"+{rng.randint(1, 99)}-{rng.randint(6000000000, 9999999999)}",
+        "email":   f"{first.lower()}.{last.lower()}{rng.randint(1, 999)}@{rng.choice(DOMAINS)}",
+        "card":    f"{rng.choice(CARD_PREFIXES)}-{rng.randrange(10**4):04d}-"
+                   f"{rng.randrange(10**4):04d}-{rng.randrange(10**4):04d}",
+        "id_type": rng.choice(ID_TYPES),
+        "id_num":  f"{rng.randrange(10**10):010d}",
+        "bank":    rng.choice(BANKS),
+        "balance": f"${round(rng.uniform(1200, 950000), 2):,.2f}",
+        "risk":    rng.choice(RISKS),
+    }
@@ -0,0 +1,165 @@
+"""
+GFNS LOAD GENERATOR — synthetic identities in /submit wire format
+Run: pip install pycryptodome        (or: pip install cryptography — faster AES-GCM)
+     python loadgen.py -n 1000000 --dup-rate 0.05 --near-rate 0.05 --workers 4
+Writes NDJSON shards (one POST /submit body per line) to ./loadgen_out/
+
+Each body is exactly what the frontend's handleEmbedEncrypt_shield sends:
+the embedData_shield token, AES-GCM encrypted under a fresh exported key,
+plus the SHA-256 idHash of the normalized identity.
+"""
+
+import os, sys, json, time, base64, hashlib, random, argparse
+from multiprocessing import Pool
+
+from identities import random_identity
+from console import banner, log, C, G, Y
+
+EMBED_FIELDS = ("name", "age", "phone", "email", "card", "idtype", "idnum")
+DUP_POOL     = 4096     # recent identities kept for duplicate / near-duplicate draws
+WRITE_BATCH  = 1000
+_BITS        = {chr(i): format(i, "08b") for i in range(256)}
+
+
+# ── IDENTITIES ───────────────────────────────────────────────────────
+def near_duplicate(ident, rng):
+    """A copy with one realistic slip: a name typo, a reformatted phone or a mistyped ID digit."""
+    out  = dict(ident)
+    kind = rng.randrange(3)
+    if kind == 0:
+        name = out["name"]
+        i    = rng.randrange(1, len(name) - 1)
+        out["name"] = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    elif kind == 1:
+        out["phone"] = out["phone"].split("-", 1)[-1]          # drop the country code
+    else:
+        num = out["id_num"]
+        i   = rng.randrange(len(num))
+        out["id_num"] = num[:i] + str((int(num[i]) + 1) % 10) + num[i + 1:]
+    return out
+
+
+# ── WIRE FORMAT ──────────────────────────────────────────────────────
+def embed_fields(ident):
+    """{embed field: text} in EMBED_FIELDS order, as the frontend names them."""
+    return {"name": ident["name"], "age": ident["age"], "phone": ident["phone"],
+            "email": ident["email"], "card": ident["card"],
+            "idtype": ident["id_type"], "idnum": ident["id_num"]}
+
+def embed_token(ident):
+    """Python twin of embedData_shield(): reversed field name, 8-bit binary per char."""
+    raw = embed_fields(ident)
+    return " || ".join(f"{k[::-1]}:" + " ".join(_BITS[c] for c in raw[k]) for k in EMBED_FIELDS)
+
+def id_hash(ident):
+    norm = "|".join([ident["name"].lower(), ident["id_type"].lower(), ident["id_num"].lower(),
+                     ident["email"].lower(), ident["phone"]])
+    return hashlib.sha256(norm.encode()).hexdigest()
+
+def gcm_encrypter():
+    """
+    encrypt(key, iv, data) -> ciphertext + 16-byte tag, the layout WebCrypto
+    produces. Uses cryptography's OpenSSL AESGCM when installed (several
+    times faster per message), otherwise pycryptodome like the server.
+    """
+    try:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        return lambda key, iv, data: AESGCM(key).encrypt(iv, data, None)
+    except ImportError:
+        from Crypto.Cipher import AES
+        def encrypt(key, iv, data):
+            ct, tag = AES.new(key, AES.MODE_GCM, nonce=iv).encrypt_and_digest(data)
+            return ct + tag
+        return encrypt
+
+def submit_body(ident, encrypt):
+    """The JSON body POSTed to /submit — AES-GCM with a fresh exported key, like the frontend."""
+    key, iv, salt = os.urandom(32), os.urandom(12), os.urandom(16)
+    b64 = lambda b: base64.b64encode(b).decode()
+    return {"idHash": id_hash(ident),
+            "encPayload": {"cipher": b64(encrypt(key, iv, embed_token(ident).encode())),
+                           "iv": b64(iv), "salt": b64(salt), "key": b64(key)}}
+
+
+# ── SHARDS ───────────────────────────────────────────────────────────
+def generate_shard(job):
+    """Write one NDJSON shard; returns counts per kind. Runs in a worker process."""
+    encrypt = gcm_encrypter()
+    path, n, seed, dup_rate, near_rate = job
+    rng    = random.Random(seed)
+    pool   = []
+    counts = {"unique": 0, "duplicate": 0, "near": 0}
+    with open(path, "w", encoding="utf-8") as f:
+        lines = []
+        for _ in range(n):
+            r = rng.random()
+            if pool and r < dup_rate:
+                ident, kind = rng.choice(pool), "duplicate"
+            elif pool and r < dup_rate + near_rate:
+                ident, kind = near_duplicate(rng.choice(pool), rng), "near"
+            else:
+                ident, kind = random_identity(rng), "unique"
+                if len(pool) < DUP_POOL:
+                    pool.append(ident)
+                else:
+                    pool[rng.randrange(DUP_POOL)] = ident
+            counts[kind] += 1
+            lines.append(json.dumps(submit_body(ident, encrypt), separators=(",", ":")))
+            if len(lines) == WRITE_BATCH:
+                f.write("\n".join(lines) + "\n")
+                lines = []
+        if lines:
+            f.write("\n".join(lines) + "\n")
+    return counts
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate /submit load-test traffic as NDJSON shards.")
+    ap.add_argument("-n", "--count", type=int, default=100000, help="identities to generate")
+    ap.add_argument("-o", "--out-dir", default="loadgen_out")
+    ap.add_argument("--dup-rate", type=float, default=0.05, help="share of exact repeats")
+    ap.add_argument("--near-rate", type=float, default=0.05, help="share of near-duplicates")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--shard-size", type=int, default=250000)
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    try:
+        gcm_encrypter()         # fail fast before forking workers
+    except ImportError:
+        print("No AES-GCM library — run: pip install pycryptodome", file=sys.stderr)
+        return 1
+    if args.dup_rate + args.near_rate > 1:
+        ap.error("--dup-rate + --near-rate must not exceed 1")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    seed   = args.seed if args.seed is not None else random.randrange(1 << 30)
+    sizes  = [args.shard_size] * (args.count // args.shard_size)
+    if args.count % args.shard_size:
+        sizes.append(args.count % args.shard_size)
+    jobs   = [(os.path.join(args.out_dir, f"submit-{i:04d}.ndjson"), n, seed + i,
+               args.dup_rate, args.near_rate) for i, n in enumerate(sizes)]
+
+    banner("LOAD GENERATOR — /submit payloads", C)
+    log("Identities", f"{args.count:,}")
+    log("Shards",     f"{len(jobs)} x <= {args.shard_size:,}")
+    log("Workers",    str(args.workers))
+    log("Dup / Near", f"{args.dup_rate:.1%} / {args.near_rate:.1%}")
+    log("Seed",       str(seed))
+
+    start = time.perf_counter()
+    with Pool(min(args.workers, len(jobs)) or 1) as pool:
+        results = pool.map(generate_shard, jobs)
+    elapsed = time.perf_counter() - start
+
+    totals = {k: sum(r[k] for r in results) for k in ("unique", "duplicate", "near")}
+    log("Unique",     f"{totals['unique']:,}",    G)
+    log("Duplicate",  f"{totals['duplicate']:,}", Y)
+    log("Near-dup",   f"{totals['near']:,}",      Y)
+    log("Elapsed",    f"{elapsed:.1f}s  ({args.count / max(elapsed, 1e-9):,.0f} payloads/s)", G)
+    log("Output",     os.path.abspath(args.out_dir), C)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+GFNS METRIC PROVIDERS — where each HEALTH_CONFIGS value comes from
+Sources are listed in metric_sources.json (or $GFNS_METRIC_SOURCES):
+
+  {
+    "providers": {
+      "basel_drop": {"type": "csv",     "path": "drops/basel",  "ttl": 300},
+      "warehouse":  {"type": "sqlite",  "path": "risk.db", "ttl": 60,
+                     "query": "SELECT metric, value FROM latest_metrics"},
+      "treasury":   {"type": "parquet", "path": "drops/lcr.parquet", "ttl": 900}
+    },
+    "metrics": {"Tier-1 Capital Ratio": "basel_drop", "LCR": "warehouse"}
+  }
+
+Every metric not mapped keeps its random generator. A mapped metric its
+provider has no value for (first load pending, or absent from the source)
+reads UNAVAILABLE, never a random stand-in, so alerting and anomaly
+scoring skip it rather than treating made-up data as real. Each provider is
+refreshed on its own background thread every `ttl` seconds and requests
+only read the last cached result, so a slow file share or database never
+blocks a response. A source can be long (metric,value rows — last row per
+metric wins) or wide (one column per metric — last row wins). A path that
+is a directory means "newest matching file in it", for drop folders.
+"""
+
+import os, re, csv, json, time, glob, sqlite3, threading
+
+DEFAULT_TTL     = 60
+DEFAULT_SLOW_MS = 1000
+UNAVAILABLE     = "N/A"     # routed metric with no provider value yet
+STALE_FACTOR    = 3         # no good refresh for STALE_FACTOR * ttl -> stale
+SOURCES_FILE    = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metric_sources.json")
+
+_NUMBER = re.compile(r"^(\D*?)(-?\d[\d,]*(?:\.(\d+))?)(.*)$")
+
+
+def rows_to_metrics(header, rows):
+    """{metric: value} from a long (metric, value) or wide (column per metric) table."""
+    cols = [str(h).strip() for h in header]
+    low  = [c.lower() for c in cols]
+    if "metric" in low and "value" in low:
+        m, v = low.index("metric"), low.index("value")
+        return {str(r[m]).strip(): r[v] for r in rows if r[m] not in (None, "")}
+    last = None
+    for last in rows:
+        pass
+    return {} if last is None else {c: val for c, val in zip(cols, last) if val not in (None, "")}
+
+def format_like(value, sample):
+    """
+    Render a raw provider number the way the synthetic value it replaces
+    looks ("13.4%", "$426B", "1.60x", "88bps"). Text values pass through.
+    """
+    if isinstance(value, str):
+        try:
+            value = float(value.replace(",", ""))
+        except ValueError:
+            return value
+    m = _NUMBER.match(sample or "")
+    if value is None or not m:
+        return "" if value is None else str(value)
+    prefix, _, decimals, suffix = m.groups()
+    return f"{prefix}{value:.{len(decimals or '')}f}{suffix}"
+
+
+# ── PROVIDERS ────────────────────────────────────────────────────────
+class Provider:
+    """Base: subclasses implement fetch() -> {metric: value}; the rest is caching."""
+    kind = "base"
+
+    def __init__(self, name, ttl=DEFAULT_TTL, slow_ms=DEFAULT_SLOW_MS):
+        self.name       = name
+        self.ttl        = max(1.0, float(ttl))
+        self.slow_ms    = float(slow_ms)
+        self.values     = {}
+        self.loaded_at  = None      # time.time() of the last good fetch
+        self.fetch_ms   = None
+        self.error      = None
+        self.refreshing = False
+        self._stop      = threading.Event()
+        self._thread    = None
+
+    def fetch(self):
+        raise NotImplementedError
+
+    def refresh(self):
+        self.refreshing = True
+        start = time.perf_counter()
+        try:
+            values = self.fetch()
+            self.values, self.loaded_at, self.error = values, time.time(), None
+        except Exception as e:          # a broken source must not kill its thread
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.fetch_ms   = round((time.perf_counter() - start) * 1000, 1)
+            self.refreshing = False
+
+    def start(self):
+        def loop():
+            while not self._stop.is_set():
+                self.refresh()
+                self._stop.wait(self.ttl)
+        self._thread = threading.Thread(target=loop, name=f"metrics-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        age   = None if self.loaded_at is None else round(time.time() - self.loaded_at, 1)
+        stale = age is None or age > self.ttl * STALE_FACTOR
+        slow  = self.fetch_ms is not None and self.fetch_ms > self.slow_ms
+        return {"name": self.name, "type": self.kind, "ttl": self.ttl,
+                "metrics": len(self.values), "age_s": age, "fetch_ms": self.fetch_ms,
+                "stale": stale, "slow": slow, "error": self.error,
+                "state": "ERROR" if self.error else "STALE" if stale else "SLOW" if slow else "OK"}
+
+
+class FileProvider(Provider):
+    """CSV or Parquet drop: a file, or the newest matching file in a directory."""
+    def __init__(self, name, path, kind="csv", **kw):
+        super().__init__(name, **kw)
+        self.path, self.kind = path, kind
+
+    def current_file(self):
+        if not os.path.isdir(self.path):
+            return self.path
+        files = glob.glob(os.path.join(self.path, f"*.{self.kind}"))
+        if not files:
+            raise FileNotFoundError(f"no *.{self.kind} files in {self.path}")
+        return max(files, key=os.path.getmtime)
+
+    def fetch(self):
+        path = self.current_file()
+        if self.kind == "parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("pyarrow not installed — run: pip install pyarrow")
+            table = pq.read_table(path)
+            return rows_to_metrics(table.column_names, zip(*table.to_pydict().values()))
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            return rows_to_metrics(next(reader, []), reader)
+
+
+class SQLiteProvider(Provider):
+    kind = "sqlite"
+
+    def __init__(self, name, path, query, **kw):
+        super().__init__(name, **kw)
+        self.path, self.query = path, query
+
+    def fetch(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5)
+        try:
+            cur = conn.execute(self.query)
+            return rows_to_metrics([d[0] for d in cur.description], cur.fetchall())
+        finally:
+            conn.close()
+
+
+# ── ENGINE ───────────────────────────────────────────────────────────
+class MetricEngine:
+    def __init__(self, providers=None, routes=None):
+        self.providers = providers or {}
+        self.routes    = routes or {}      # metric name -> provider name
+        self._samples  = {}
+
+    @classmethod
+    def from_file(cls, path):
+        """Engine described by a metric_sources.json; no file means all-random."""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        base      = os.path.dirname(os.path.abspath(path))
+        providers = {}
+        for name, p in spec.get("providers", {}).items():
+            kind = p.get("type", "csv")
+            src  = os.path.join(base, p["path"])
+            kw   = {"ttl": p.get("ttl", DEFAULT_TTL), "slow_ms": p.get("slow_ms", DEFAULT_SLOW_MS)}
+            if kind in ("csv", "parquet"):
+                providers[name] = FileProvider(name, src, kind, **kw)
+            elif kind == "sqlite":
+                providers[name] = SQLiteProvider(name, src, p["query"], **kw)
+            else:
+                raise ValueError(f"metric provider {name}: unknown type {kind!r}")
+        routes  = spec.get("metrics", {})
+        missing = sorted(set(routes.values()) - set(providers))
+        if missing:
+            raise ValueError(f"metrics routed to undefined providers: {', '.join(missing)}")
+        return cls(providers, routes)
+
+    def start(self):
+        for p in self.providers.values():
+            p.start()
+        return self
+
+    def value(self, metric, generator):
+        """
+        The metric from its provider's cache, formatted like `generator()`;
+        `generator()` itself when unrouted, UNAVAILABLE when the provider has
+        no value for it.
+        """
+        provider = self.providers.get(self.routes.get(metric))
+        if provider is None:
+            return generator()
+        if metric not in provider.values:
+            return UNAVAILABLE
+        if metric not in self._samples:
+            self._samples[metric] = generator()
+        return format_like(provider.values[metric], self._samples[metric])
+
+    def status(self, all_metrics=()):
+        providers = [p.status() for p in self.providers.values()]
+        routed    = sum(1 for m in all_metrics if m in self.routes)
+        providers.append({"name": "random", "type": "random", "metrics": len(all_metrics) - routed,
+                          "state": "OK", "stale": False, "slow": False, "error": None})
+        return providers
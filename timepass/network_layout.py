@@ -0,0 +1,497 @@
+"""
+GFNS NETWORK MAP — the counterparty graph with a server-computed layout
+
+Edges come from counterparty_exposures (latest exposure per lender /
+borrower pair, both directions summed into one undirected edge); nodes are
+every institution with an exposure or a risk score, coloured by its Altman
+zone from the risk engine. With no exposures loaded yet the built-in
+14-institution sample graph is served instead.
+
+Layout (unit square, 0..1 on both axes; clients scale to their canvas):
+  1. communities by Louvain modularity (exposure-weighted), capped at
+     MAX_CLUSTER institutions; pairs and unconnected institutions pooled
+  2. graphs up to LOD_NODES institutions: one Fruchterman-Reingold layout
+  3. larger graphs: the community graph is laid out first, then each
+     community inside its own disc (area proportional to its size), so
+     the cost is the sum of squares of community sizes, not of the total
+Both passes use numpy arrays when installed (repulsion in row blocks of
+BLOCK nodes); without numpy the same steps run as plain loops with fewer
+iterations.
+
+Level of detail (view()):
+  full      one node per institution
+  clusters  one node per community: size, members, zone mix, and edges
+            aggregated between communities
+  auto      full up to LOD_NODES institutions, clusters above
+  cluster=N the institutions of community N, at their full-layout positions
+
+Layouts are cached per graph version: the MAX(id) of counterparty_exposures
+plus a digest of each institution's region, zone and scores. A changed
+version is laid out on a background thread while the previous layout is
+still served.
+"""
+
+import math, time, random, hashlib, threading
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from risk_scoring import ZONES, COLOURS, _table_exists, _num
+
+EXPOSURES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS counterparty_exposures (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        lender      TEXT,
+        borrower    TEXT,
+        exposure_bn REAL,
+        recorded_at TEXT
+    )"""
+
+LOD_NODES      = 400          # ?lod=auto serves clusters above this many institutions
+MAX_CLUSTER    = 400          # no community grows past this many institutions
+MIN_CLUSTER    = 3            # smaller communities are pooled per region
+ITERATIONS     = 150          # force-directed steps per layout
+PY_PAIR_BUDGET = 2_000_000    # node pairs evaluated per layout without numpy
+BLOCK          = 1024         # repulsion rows computed at a time (numpy)
+GRAVITY        = 0.05         # pull toward the centre, keeps unconnected parts on screen
+MARGIN         = 0.04
+UNSCORED       = "#64748b"
+
+# The frontend's original hardcoded map: (label, zone, detail), edges (a, b, strength 1-3)
+SAMPLE_NODES = [
+    ("Central Bank",   "SAFE",      "CAR 94% · Healthy"),
+    ("Bank Alpha",     "SAFE",      "CAR 82% · Stable"),
+    ("Bank Beta",      "SAFE",      "CAR 79% · Stable"),
+    ("Invest. Fund A", "GREY ZONE", "LCR 68% · Elevated"),
+    ("Invest. Fund B", "GREY ZONE", "LCR 71% · Elevated"),
+    ("Insurance Co.",  "SAFE",      "Solvency 88% · OK"),
+    ("Hedge Fund X",   "GREY ZONE", "Leverage 4.2x · Watch"),
+    ("MidBank Corp",   "DISTRESS",  "CAR 38% · Fragile"),
+    ("Dev. Finance",   "DISTRESS",  "LCR 41% · Critical"),
+    ("Corp. Debt Mkt", "GREY ZONE", "Spread +180bp"),
+    ("Pension Fund",   "SAFE",      "Buffer 91% · Safe"),
+    ("Shadow Bank",    "DISTRESS",  "Exposure >120%"),
+    ("Insurer B",      "SAFE",      "Ratio 85% · OK"),
+    ("NBFC Group",     "GREY ZONE", "Stress 62%"),
+]
+SAMPLE_EDGES = [
+    (0, 1, 3), (0, 2, 3), (0, 3, 2), (0, 4, 2), (0, 5, 2), (0, 6, 1), (0, 7, 2), (0, 8, 1),
+    (1, 4, 2), (1, 6, 1), (1, 9, 1), (1, 13, 1), (2, 3, 2), (2, 7, 2), (2, 12, 1),
+    (3, 8, 2), (3, 11, 2), (3, 9, 1), (4, 9, 1), (4, 10, 1), (4, 6, 1), (5, 12, 1), (5, 13, 1),
+    (7, 11, 2), (8, 11, 1), (9, 10, 1),
+]
+
+
+# ── GRAPH ────────────────────────────────────────────────────────────
+def _detail(r):
+    parts = []
+    if r.get("zScore") is not None:
+        parts.append(f"Z {r['zScore']:.2f}")
+    if r.get("composite") is not None:
+        parts.append(f"Score {r['composite']:.0f}")
+    if r.get("zone"):
+        parts.append(r["zone"].title())
+    return " · ".join(parts) or "Not scored"
+
+def sample_graph():
+    nodes = [{"label": label, "region": None, "zone": zone, "colour": COLOURS[ZONES.index(zone)],
+              "composite": None, "detail": detail} for label, zone, detail in SAMPLE_NODES]
+    return nodes, [(a, b, float(s)) for a, b, s in SAMPLE_EDGES], "sample"
+
+def load_graph(conn, institutions):
+    """(nodes, edges, source); edges are (a, b, exposure_bn) with a < b, one per institution pair."""
+    pairs = defaultdict(float)
+    if _table_exists(conn, "counterparty_exposures"):
+        for lender, borrower, amount in conn.execute("""
+                SELECT lender, borrower, exposure_bn FROM counterparty_exposures
+                WHERE id IN (SELECT MAX(id) FROM counterparty_exposures
+                             WHERE lender IS NOT NULL AND borrower IS NOT NULL GROUP BY lender, borrower)"""):
+            amount = _num(amount)
+            if lender != borrower and amount and amount > 0:
+                pairs[(lender, borrower) if lender < borrower else (borrower, lender)] += amount
+    if not pairs:
+        return sample_graph()
+    scored = {r["institution"]: r for r in institutions}
+    names  = sorted(set(scored) | {n for p in pairs for n in p})
+    index  = {n: i for i, n in enumerate(names)}
+    nodes  = []
+    for name in names:
+        r = scored.get(name, {})
+        nodes.append({"label": name, "region": r.get("region"), "zone": r.get("zone"),
+                      "colour": r.get("colour") or UNSCORED, "composite": r.get("composite"),
+                      "detail": _detail(r)})
+    return nodes, [(index[a], index[b], w) for (a, b), w in sorted(pairs.items())], "counterparty_exposures"
+
+
+# ── COMMUNITIES ──────────────────────────────────────────────────────
+def _louvain_pass(adj, k, size, m2, rnd):
+    """One Louvain local-moving pass: community per node, moving nodes while modularity improves."""
+    n    = len(adj)
+    comm = list(range(n))
+    tot  = list(k)
+    csize, order = list(size), list(range(n))
+    for _ in range(20):
+        rnd.shuffle(order)
+        moved = 0
+        for i in order:
+            ci = comm[i]
+            links = defaultdict(float)
+            for j, w in adj[i].items():
+                links[comm[j]] += w
+            tot[ci]   -= k[i]
+            csize[ci] -= size[i]
+            best, gain = ci, links.get(ci, 0.0) - tot[ci] * k[i] / m2
+            for c, w in links.items():
+                if c != ci and csize[c] + size[i] <= MAX_CLUSTER:
+                    g = w - tot[c] * k[i] / m2
+                    if g > gain + 1e-12:
+                        best, gain = c, g
+            tot[best]   += k[i]
+            csize[best] += size[i]
+            if best != ci:
+                comm[i] = best
+                moved  += 1
+        if not moved:
+            break
+    return comm
+
+def communities(n, edges, regions=None, seed=7):
+    """
+    Member index lists, largest first. Louvain (modularity local moving,
+    then the communities as nodes, until nothing moves) with no community
+    grown past MAX_CLUSTER; communities under MIN_CLUSTER (pairs,
+    isolated institutions) are pooled, by region, in chunks of MAX_CLUSTER.
+    """
+    adj = [defaultdict(float) for _ in range(n)]
+    for a, b, w in edges:
+        adj[a][b] += w
+        adj[b][a] += w
+    k  = [sum(a.values()) for a in adj]
+    m2 = sum(k)
+    members = [[v] for v in range(n)]
+    if m2 > 0:
+        rnd, size = random.Random(seed), [1] * n
+        while True:
+            comm  = _louvain_pass(adj, k, size, m2, rnd)
+            ids   = {c: i for i, c in enumerate(dict.fromkeys(comm))}
+            if len(ids) == len(adj):
+                break
+            merged = [[] for _ in ids]
+            nadj   = [defaultdict(float) for _ in ids]
+            nk, nsize = [0.0] * len(ids), [0] * len(ids)
+            for i, c in enumerate(comm):
+                c = ids[c]
+                merged[c].extend(members[i])
+                nk[c]    += k[i]
+                nsize[c] += size[i]
+                for j, w in adj[i].items():
+                    if ids[comm[j]] != c:
+                        nadj[c][ids[comm[j]]] += w
+            members, adj, k, size = merged, nadj, nk, nsize
+
+    groups, pool = [], defaultdict(list)
+    for g in members:
+        if len(g) >= MIN_CLUSTER:
+            groups.append(sorted(g))
+        else:
+            for v in g:
+                pool[(regions[v] if regions else None) or ""].append(v)
+    for region in sorted(pool):
+        vs = sorted(pool[region])
+        groups.extend(vs[i:i + MAX_CLUSTER] for i in range(0, len(vs), MAX_CLUSTER))
+    return sorted(groups, key=lambda g: (-len(g), g[0]))
+
+
+# ── FORCE-DIRECTED LAYOUT ────────────────────────────────────────────
+def _initial(n, seed):
+    rnd = random.Random(seed)
+    return [(rnd.random(), rnd.random()) for _ in range(n)]
+
+def _norm_weights(edges):
+    top = max((w for _, _, w in edges), default=1.0)
+    return [math.log1p(w) / math.log1p(top) if top > 0 else 1.0 for _, _, w in edges]
+
+def _fr_numpy(n, edges, pos, iterations):
+    k   = 1.0 / math.sqrt(n)
+    pos = np.array(pos, dtype=float)
+    ei  = np.array([a for a, _, _ in edges], dtype=np.intp)
+    ej  = np.array([b for _, b, _ in edges], dtype=np.intp)
+    ew  = np.array(_norm_weights(edges), dtype=float)
+    t0  = 0.1
+    for step in range(iterations):
+        disp = np.zeros_like(pos)
+        for s in range(0, n, BLOCK):                     # repulsion: k^2 / d along every pair
+            d  = pos[s:s + BLOCK, None, :] - pos[None, :, :]
+            d2 = np.einsum("ijk,ijk->ij", d, d)
+            np.maximum(d2, 1e-9, out=d2)
+            disp[s:s + BLOCK] += np.einsum("ijk,ij->ik", d, (k * k) / d2)
+        if len(ei):                                      # attraction: d^2 / k along edges, by weight
+            d    = pos[ei] - pos[ej]
+            dist = np.sqrt(np.einsum("ij,ij->i", d, d))
+            f    = d * (dist * ew / k)[:, None]
+            np.add.at(disp, ei, -f)
+            np.add.at(disp, ej, f)
+        disp -= GRAVITY * n * k * (pos - 0.5)
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp))
+        t      = t0 * (1 - step / iterations) + 1e-4
+        pos   += disp * (np.minimum(length, t) / np.maximum(length, 1e-9))[:, None]
+    return [tuple(p) for p in pos.tolist()]
+
+def _fr_python(n, edges, pos, iterations):
+    k, kk = 1.0 / math.sqrt(n), 1.0 / n
+    xs, ys = [p[0] for p in pos], [p[1] for p in pos]
+    ws = _norm_weights(edges)
+    t0 = 0.1
+    for step in range(iterations):
+        dx, dy = [0.0] * n, [0.0] * n
+        for i in range(n):
+            xi, yi, fx, fy = xs[i], ys[i], 0.0, 0.0
+            for j in range(n):
+                ddx, ddy = xi - xs[j], yi - ys[j]
+                d2 = ddx * ddx + ddy * ddy
+                if d2 > 1e-9:
+                    fx += ddx * kk / d2
+                    fy += ddy * kk / d2
+            dx[i], dy[i] = fx, fy
+        for (a, b, _), w in zip(edges, ws):
+            ddx, ddy = xs[a] - xs[b], ys[a] - ys[b]
+            f = math.sqrt(ddx * ddx + ddy * ddy) * w / k
+            dx[a] -= ddx * f; dy[a] -= ddy * f
+            dx[b] += ddx * f; dy[b] += ddy * f
+        t = t0 * (1 - step / iterations) + 1e-4
+        for i in range(n):
+            fx = dx[i] - GRAVITY * n * k * (xs[i] - 0.5)
+            fy = dy[i] - GRAVITY * n * k * (ys[i] - 0.5)
+            length = math.sqrt(fx * fx + fy * fy)
+            if length > 1e-9:
+                step_len = min(length, t) / length
+                xs[i] += fx * step_len
+                ys[i] += fy * step_len
+    return list(zip(xs, ys))
+
+def force_layout(n, edges, seed=0):
+    """Fruchterman-Reingold positions [(x, y)] for nodes 0..n-1; edges (a, b, weight) attract by log weight."""
+    if n == 0:
+        return []
+    if n == 1:
+        return [(0.5, 0.5)]
+    pos = _initial(n, seed)
+    if np is not None:
+        return _fit(_fr_numpy(n, edges, pos, ITERATIONS))
+    return _fit(_fr_python(n, edges, pos, max(10, min(ITERATIONS, PY_PAIR_BUDGET // (n * n)))))
+
+def _fit(pos, margin=0.0):
+    """Scale into [margin, 1 - margin] on both axes, keeping the aspect ratio."""
+    xs, ys = [p[0] for p in pos], [p[1] for p in pos]
+    x0, y0 = min(xs), min(ys)
+    w, h   = max(xs) - x0, max(ys) - y0
+    scale  = (1 - 2 * margin) / (max(w, h) or 1.0)
+    ox = margin + ((1 - 2 * margin) - w * scale) / 2 - x0 * scale
+    oy = margin + ((1 - 2 * margin) - h * scale) / 2 - y0 * scale
+    return [(ox + x * scale, oy + y * scale) for x, y in pos]
+
+def _separate(centres, radii, rounds=60):
+    """Push overlapping discs apart (communities), keeping their relative placement."""
+    c = [list(p) for p in centres]
+    for _ in range(rounds):
+        moved = False
+        for i in range(len(c)):
+            for j in range(i + 1, len(c)):
+                dx, dy = c[j][0] - c[i][0], c[j][1] - c[i][1]
+                dist = math.hypot(dx, dy) or 1e-6
+                gap  = radii[i] + radii[j] - dist
+                if gap > 0:
+                    ux, uy = dx / dist, dy / dist
+                    c[i][0] -= ux * gap / 2; c[i][1] -= uy * gap / 2
+                    c[j][0] += ux * gap / 2; c[j][1] += uy * gap / 2
+                    moved = True
+        if not moved:
+            break
+    return [tuple(p) for p in c]
+
+def layout(n, edges, groups):
+    """Positions for every node: one pass up to LOD_NODES, community graph then communities above."""
+    if n <= LOD_NODES or len(groups) == 1:
+        return _fit(force_layout(n, edges), MARGIN)
+    cid = [0] * n
+    for g, members in enumerate(groups):
+        for v in members:
+            cid[v] = g
+    between, inside = defaultdict(float), defaultdict(list)
+    for a, b, w in edges:
+        if cid[a] == cid[b]:
+            inside[cid[a]].append((a, b, w))
+        else:
+            between[(min(cid[a], cid[b]), max(cid[a], cid[b]))] += w
+    centres = force_layout(len(groups), [(a, b, w) for (a, b), w in between.items()])
+    radii   = [0.5 * math.sqrt(len(m) / n) for m in groups]
+    centres = _separate(centres, [r * 1.08 for r in radii])
+    pos = [None] * n
+    for g, members in enumerate(groups):
+        local = {v: i for i, v in enumerate(members)}
+        sub   = force_layout(len(members), [(local[a], local[b], w) for a, b, w in inside[g]], seed=g)
+        cx, cy = centres[g]
+        for v, (x, y) in zip(members, sub):
+            pos[v] = (cx + (x - 0.5) * 2 * radii[g] * 0.9, cy + (y - 0.5) * 2 * radii[g] * 0.9)
+    return _fit(pos, MARGIN)
+
+
+# ── RESULT ───────────────────────────────────────────────────────────
+def _strengths(weights):
+    """1-3 line weight by tercile of exposure, as the frontend's edge list used."""
+    if not weights:
+        return []
+    ranked = sorted(weights)
+    lo, hi = ranked[len(ranked) // 3], ranked[2 * len(ranked) // 3]
+    return [1 if w < lo else 2 if w < hi else 3 for w in weights]
+
+def _zone_mix(zones):
+    """Worst zone holding at least a quarter of the members (the dashboard's DISTRESS rule)."""
+    scored = [z for z in zones if z]
+    for zone in ZONES[:2]:
+        if scored and scored.count(zone) / len(scored) >= 0.25:
+            return zone
+    return "SAFE" if scored else None
+
+def build_network(nodes, edges, source):
+    started = time.perf_counter()
+    n       = len(nodes)
+    groups  = communities(n, edges, [v["region"] for v in nodes])
+    pos     = layout(n, edges, groups)
+    strength = defaultdict(float)
+    for a, b, w in edges:
+        strength[a] += w
+        strength[b] += w
+    top = math.sqrt(max(strength.values(), default=0.0)) or 1.0
+    for g, members in enumerate(groups):
+        for v in members:
+            nodes[v]["cluster"] = g
+    for i, (v, (x, y)) in enumerate(zip(nodes, pos)):
+        v.update({"id": i, "x": round(x, 5), "y": round(y, 5), "degree": 0,
+                  "exposure": round(strength[i], 3), "size": round(math.sqrt(strength[i]) / top, 4)})
+    for a, b, _ in edges:
+        nodes[a]["degree"] += 1
+        nodes[b]["degree"] += 1
+    full_edges = [[a, b, s, round(w, 3)] for (a, b, w), s in zip(edges, _strengths([w for _, _, w in edges]))]
+
+    clusters, between = [], defaultdict(lambda: [0.0, 0])
+    for g, members in enumerate(groups):
+        xs, ys = [nodes[v]["x"] for v in members], [nodes[v]["y"] for v in members]
+        cx, cy = sum(xs) / len(xs), sum(ys) / len(ys)
+        lead   = max(members, key=lambda v: (strength[v], -v))
+        zone   = _zone_mix([nodes[v]["zone"] for v in members])
+        clusters.append({
+            "id": g, "label": nodes[lead]["label"] + (f" +{len(members) - 1}" if len(members) > 1 else ""),
+            "x": round(cx, 5), "y": round(cy, 5),
+            "radius": round(max(math.hypot(x - cx, y - cy) for x, y in zip(xs, ys)), 5),
+            "members": len(members), "zone": zone,
+            "colour": COLOURS[ZONES.index(zone)] if zone else UNSCORED,
+            "zones": {z: sum(nodes[v]["zone"] == z for v in members) for z in ZONES},
+            "exposure": round(sum(strength[v] for v in members), 3),
+            "detail": f"{len(members)} institutions" + (f" · {zone.title()}" if zone else ""),
+        })
+    for a, b, w in edges:
+        ca, cb = nodes[a]["cluster"], nodes[b]["cluster"]
+        if ca != cb:
+            e = between[(min(ca, cb), max(ca, cb))]
+            e[0] += w
+            e[1] += 1
+    ctop = math.sqrt(max((c["exposure"] for c in clusters), default=0.0)) or 1.0
+    for c in clusters:
+        c["size"] = round(math.sqrt(c["exposure"]) / ctop, 4)
+    keys = sorted(between)
+    cluster_edges = [[a, b, s, round(between[(a, b)][0], 3), between[(a, b)][1]]
+                     for (a, b), s in zip(keys, _strengths([between[k][0] for k in keys]))]
+    return {"nodes": nodes, "edges": full_edges, "clusters": clusters, "clusterEdges": cluster_edges,
+            "source": source, "layoutMs": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def view(network, lod="auto", cluster=None):
+    """What a client draws: nodes and edges ([a, b, strength 1-3, exposure_bn]) for one level of detail."""
+    nodes = network["nodes"]
+    if cluster is not None:
+        members = [v for v in nodes if v["cluster"] == cluster]
+        keep    = {v["id"]: i for i, v in enumerate(members)}
+        edges   = [[keep[a], keep[b], s, w] for a, b, s, w in network["edges"] if a in keep and b in keep]
+        return {"lod": "cluster", "cluster": cluster, "nodes": members, "edges": edges}
+    if lod == "clusters" or (lod == "auto" and len(nodes) > LOD_NODES):
+        return {"lod": "clusters", "nodes": network["clusters"], "edges": network["clusterEdges"]}
+    return {"lod": "full", "nodes": nodes, "edges": network["edges"]}
+
+
+# ── CACHED ENGINE ────────────────────────────────────────────────────
+class NetworkEngine:
+    """
+    Builds the graph and its layout once per graph version; readers share the
+    result. The version is the exposures' MAX(id) plus a digest of what each
+    node shows from the risk engine (region, zone, score), so a new filing
+    that leaves every zone and score alone keeps the layout. Once a layout
+    exists, a new version is built on a background thread and the previous
+    layout is served until it is ready.
+    """
+    def __init__(self, risk, connect):
+        self.risk      = risk
+        self.connect   = connect
+        self._lock     = threading.Lock()
+        self._key      = None
+        self._result   = None
+        self._building = None       # key being built in the background
+
+    def _fingerprint(self, conn, institutions):
+        top = (conn.execute("SELECT MAX(id) FROM counterparty_exposures").fetchone()[0]
+               if _table_exists(conn, "counterparty_exposures") else None)
+        shown = hashlib.sha1(repr([(r["institution"], r.get("region"), r.get("zone"), r.get("composite"),
+                                    r.get("zScore")) for r in institutions]).encode()).hexdigest()
+        return top, shown
+
+    def _build(self, conn, institutions, key):
+        network = build_network(*load_graph(conn, institutions))
+        network["version"] = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+        return network
+
+    def _rebuild(self):
+        try:
+            institutions = self.risk.results()["institutions"]
+            conn = self.connect()
+            try:
+                key     = self._fingerprint(conn, institutions)     # the data as of now, not as requested
+                network = self._build(conn, institutions, key)
+            finally:
+                conn.close()
+            with self._lock:
+                self._result, self._key = network, key
+        finally:
+            with self._lock:
+                self._building = None
+
+    def results(self):
+        """
+        build_network() output plus 'version'. Built in the caller only when
+        there is no layout yet; otherwise a changed version starts a
+        background rebuild and the current layout is returned.
+        """
+        institutions = self.risk.results()["institutions"]
+        conn = self.connect()
+        try:
+            key = self._fingerprint(conn, institutions)
+            with self._lock:
+                if self._result is None:
+                    self._result, self._key = self._build(conn, institutions, key), key
+                elif key != self._key and self._building is None:
+                    self._building = key
+                    threading.Thread(target=self._rebuild, name="network-layout", daemon=True).start()
+                return self._result
+        finally:
+            conn.close()
+
+    def version(self):
+        """Version of the layout results() would serve now, or None before the first build."""
+        result = self._result
+        return result["version"] if result else None
+
+    def warm(self):
+        """Build the current layout in the background, so the first request doesn't wait for it."""
+        threading.Thread(target=self.results, name="network-layout", daemon=True).start()
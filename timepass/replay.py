@@ -0,0 +1,252 @@
+"""
+GFNS TRAFFIC REPLAY — send a traffic_capture log at a target server
+Run: python replay.py capture.ndjson --target http://localhost:4002 --speed 10 --concurrency 16
+     python replay.py capture.ndjson --speed max --json report.json
+--speed 1 keeps the captured inter-arrival gaps, 10 compresses them ten-fold
+and max sends as fast as the workers allow. Rotated files (capture.ndjson.N
+... .1) are replayed oldest first. Reports latency percentiles and error
+rates per endpoint.
+
+Shield requests were redacted at capture time; each is sent as a fresh
+synthetic identity — /submit as the JSON body loadgen.py builds,
+/submit/stream as a framed upload padded with a random document to
+about the captured size, with a matching X-Id-Hash.
+
+Admission control: every replayed request comes from this one address,
+so the target's per-client token buckets (admission.py) see all the
+captured clients as a single one. Faster than real time, most of a
+replay is then 429s and the report measures the rate limit, not the
+server. Point GFNS_ADMISSION on the target at a file that turns the
+buckets off while replaying —
+  {"submit": {"rate": 0}, "write": {"rate": 0}, "read": {"rate": 0}}
+— concurrency slots and queues still apply. 429s are counted separately.
+"""
+
+import os, sys, json, time, queue, argparse, threading, http.client
+from urllib.parse import urlsplit
+
+from console import banner, log, section, C, G, R, Y, RST
+
+QUEUE_PER_WORKER = 4
+LATE_MS          = 1.0     # dispatch this far behind schedule counts as late
+_STOP = object()
+
+
+def capture_files(path):
+    """The live file plus its RotatingFileHandler backups, oldest first."""
+    rotated, n = [], 1
+    while os.path.exists(f"{path}.{n}"):
+        rotated.append(f"{path}.{n}")
+        n += 1
+    return rotated[::-1] + ([path] if os.path.exists(path) else [])
+
+def iter_capture(paths):
+    for p in paths:
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    k = max(0, min(len(sorted_vals) - 1, int(round(pct / 100 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+# ── WORKERS ──────────────────────────────────────────────────────────
+class Replayer:
+    def __init__(self, target, concurrency, timeout):
+        url           = urlsplit(target)
+        self.host     = url.hostname or "localhost"
+        self.port     = url.port or (443 if url.scheme == "https" else 80)
+        self.conn_cls = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.timeout  = timeout
+        self.jobs     = queue.Queue(maxsize=concurrency * QUEUE_PER_WORKER)
+        self.results  = []          # one {endpoint: [latencies, errors, statuses]} per worker
+        self.threads  = [threading.Thread(target=self._run, daemon=True) for _ in range(concurrency)]
+        self._encrypt = None
+
+    def start(self):
+        for t in self.threads:
+            t.start()
+
+    def finish(self):
+        for _ in self.threads:
+            self.jobs.put(_STOP)
+        for t in self.threads:
+            t.join()
+        merged = {}
+        for stats in self.results:
+            for key, (lat, errs, codes) in stats.items():
+                m = merged.setdefault(key, [[], 0, {}])
+                m[0].extend(lat)
+                m[1] += errs
+                for code, n in codes.items():
+                    m[2][code] = m[2].get(code, 0) + n
+        return merged
+
+    def _request(self, rec):
+        """(body bytes or None, headers) to send for a captured request."""
+        body    = rec.get("b")
+        headers = dict(rec.get("h") or {})
+        regen   = body.get("$regen") if isinstance(body, dict) else None
+        if regen:
+            # Redacted at capture time — send a fresh synthetic identity instead
+            from identities import random_identity
+            from loadgen import submit_body, gcm_encrypter, embed_fields, id_hash
+            import random
+            ident = random_identity(random)
+            if regen == "shield-stream":
+                from shield_stream import seal_stream, embed_chunks
+                doc  = os.urandom(body.get("bytes", 0) // 9)      # 9 upload bytes per document byte
+                data = b"".join(seal_stream(embed_chunks(embed_fields(ident), [("document", doc)]),
+                                            os.urandom(32)))
+                headers.update({"Content-Type": "application/octet-stream", "X-Id-Hash": id_hash(ident)})
+                return data, headers
+            if self._encrypt is None:
+                self._encrypt = gcm_encrypter()
+            body = submit_body(ident, self._encrypt)
+        if body is None:
+            return None, headers
+        headers["Content-Type"] = "application/json"
+        return json.dumps(body).encode(), headers
+
+    def _run(self):
+        stats = {}
+        self.results.append(stats)
+        conn  = None
+        while True:
+            rec = self.jobs.get()
+            if rec is _STOP:
+                break
+            key     = f"{rec['m']} {rec['p'].split('?', 1)[0]}"
+            entry   = stats.setdefault(key, [[], 0, {}])
+            payload, headers = self._request(rec)
+            start   = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = self.conn_cls(self.host, self.port, timeout=self.timeout)
+                conn.request(rec["m"], rec["p"], body=payload, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                code = resp.status
+            except (OSError, http.client.HTTPException):
+                if conn is not None:
+                    conn.close()
+                conn = None
+                code = "conn-error"
+            entry[0].append((time.perf_counter() - start) * 1000)
+            entry[2][code] = entry[2].get(code, 0) + 1
+            if code == "conn-error" or code >= 400:
+                entry[1] += 1
+        if conn is not None:
+            conn.close()
+
+
+def replay(paths, target, speed, concurrency, timeout=30, limit=None):
+    """Dispatch captured requests on their (scaled) schedule; returns (stats, elapsed, sent, lag)."""
+    worker = Replayer(target, concurrency, timeout)
+    worker.start()
+    t0 = wall0 = None
+    lag, sent = [], 0
+    for rec in iter_capture(paths):
+        if limit is not None and sent >= limit:
+            break
+        if t0 is None:
+            t0, wall0 = rec["t"], time.perf_counter()
+        if speed is not None:
+            due   = wall0 + (rec["t"] - t0) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif -delay * 1000 > LATE_MS:
+                lag.append(-delay * 1000)
+        worker.jobs.put(rec)
+        sent += 1
+    stats   = worker.finish()
+    elapsed = time.perf_counter() - wall0 if wall0 is not None else 0.0
+    return stats, elapsed, sent, sorted(lag)
+
+
+def build_report(stats, elapsed, sent, lag):
+    endpoints = {}
+    for key, (lat, errs, codes) in sorted(stats.items()):
+        lat.sort()
+        endpoints[key] = {
+            "count":      len(lat),
+            "errors":     errs,
+            "error_rate": round(errs / len(lat), 4) if lat else 0.0,
+            "p50_ms":     round(percentile(lat, 50), 2),
+            "p90_ms":     round(percentile(lat, 90), 2),
+            "p99_ms":     round(percentile(lat, 99), 2),
+            "max_ms":     round(lat[-1], 2) if lat else 0.0,
+            "status":     {str(k): v for k, v in codes.items()},
+            "rate_limited": codes.get(429, 0),
+        }
+    return {"sent": sent, "elapsed_s": round(elapsed, 3),
+            "rps": round(sent / elapsed, 1) if elapsed else 0.0,
+            "late_dispatches": len(lag), "late_p99_ms": round(percentile(lag, 99), 2),
+            "endpoints": endpoints}
+
+
+def print_report(report):
+    section("Per Endpoint")
+    print(f"  {'ENDPOINT':<38} {'COUNT':>7} {'ERR%':>6} {'P50':>8} {'P90':>8} {'P99':>8} {'MAX':>8}")
+    for key, e in report["endpoints"].items():
+        colour = R if e["error_rate"] > 0.01 else G
+        print(f"  {key[:38]:<38} {e['count']:>7} {colour}{e['error_rate'] * 100:>5.1f}%{RST} "
+              f"{e['p50_ms']:>8.1f} {e['p90_ms']:>8.1f} {e['p99_ms']:>8.1f} {e['max_ms']:>8.1f}")
+    section("Totals")
+    log("Requests",        f"{report['sent']:,}")
+    log("Elapsed",         f"{report['elapsed_s']:.2f}s")
+    log("Throughput",      f"{report['rps']:,} req/s", G)
+    log("Late dispatches", f"{report['late_dispatches']:,}  (p99 {report['late_p99_ms']} ms behind)",
+        Y if report["late_dispatches"] else G)
+    limited = sum(e["rate_limited"] for e in report["endpoints"].values())
+    if limited:
+        log("Rate limited", f"{limited:,} x 429 — admission token buckets; see the module docstring", Y)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay a GFNS traffic capture against a server.")
+    ap.add_argument("capture", help="capture file written with GFNS_CAPTURE (backups included)")
+    ap.add_argument("--target", default="http://localhost:4002")
+    ap.add_argument("--speed", default="1", help="time scale: 1, 10, ... or max")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--limit", type=int, help="stop after this many requests")
+    ap.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = ap.parse_args(argv)
+
+    paths = capture_files(args.capture)
+    if not paths:
+        print(f"error: capture not found: {args.capture}", file=sys.stderr)
+        return 1
+    if args.speed == "max":
+        speed = None
+    else:
+        try:
+            speed = float(args.speed)
+        except ValueError:
+            speed = 0
+        if speed <= 0:
+            ap.error("--speed must be a positive number or 'max'")
+
+    banner("TRAFFIC REPLAY", C)
+    log("Capture",     ", ".join(os.path.basename(p) for p in paths))
+    log("Target",      args.target, C)
+    log("Speed",       "max" if speed is None else f"{speed:g}x")
+    log("Concurrency", str(args.concurrency))
+
+    report = build_report(*replay(paths, args.target, speed, args.concurrency,
+                                  args.timeout, args.limit))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if all(e["error_rate"] == 0 for e in report["endpoints"].values()) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
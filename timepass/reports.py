@@ -0,0 +1,533 @@
+"""
+GFNS REPORTS — the dashboard's downloadable reports, rendered server-side
+from stored history instead of from whatever the browser tab holds.
+
+  stability   modal snapshots in the four health tables: daily headline
+              metrics, risk-level mix, alerts and anomalies
+  shock       injected shocks: scenarios, daily system impact, latest shocks
+  shield      identity_sessions: daily sessions, verdict mix, duplicates
+
+Each report renders as HTML (same layout as the frontend's buildReportHTML),
+SVG (one chart) or CSV (the daily series behind the charts). Aggregation
+runs in SQL, so a wide date range costs one GROUP BY per table rather than
+a Python pass over every row.
+
+Rendered output is cached on disk under a content address: sha256 of the
+parameters plus a data-version stamp (MAX(id) of every source table, which
+only moves when rows are added). A repeat request is a file read; new data
+changes the stamp and the next request re-renders.
+"""
+
+import os, io, csv, json, html, math, time, hashlib, sqlite3, datetime, tempfile
+
+CACHE_DIR       = os.environ.get("GFNS_REPORT_CACHE",
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_cache"))
+CACHE_MAX_FILES = 500
+FORMATS         = {"html": "text/html", "svg": "image/svg+xml", "csv": "text/csv"}
+
+HEALTH_SOURCES = (
+    ("bank_capital_adequacy", "tier1_capital_ratio", "Tier-1 Capital Ratio", "#00B96B"),
+    ("liquidity_coverage",    "lcr",                 "LCR",                  "#3B82F6"),
+    ("debt_exposure",         "non_performing_loans", "Non-Performing Loans", "#F59E0B"),
+    ("solvency_stress",       "stress_index",        "Stress Index",         "#EF4444"),
+)
+SHOCK_TABLES = tuple(t for t, *_ in HEALTH_SOURCES)
+RISK_COLOURS = {"LOW": "#00B96B", "MODERATE": "#3B82F6", "ELEVATED": "#F59E0B",
+                "HIGH": "#F97316", "CRITICAL": "#EF4444"}
+PALETTE      = ("#00B96B", "#3B82F6", "#8B5CF6", "#F97316", "#F59E0B", "#EF4444")
+
+
+# ── DATA ACCESS ──────────────────────────────────────────────────────
+def _columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+def _time_expr(cols):
+    """created_at (backend rows), recorded_at (create_db / bulk-loaded rows), or both."""
+    have = [c for c in ("created_at", "recorded_at") if c in cols]
+    return None if not have else have[0] if len(have) == 1 else f"COALESCE({', '.join(have)})"
+
+def _num_expr(col):
+    """Modal rows store '13.4%' / '$426B' as TEXT; bulk-loaded rows store REAL."""
+    return f"CAST(REPLACE(REPLACE(REPLACE({col}, '%', ''), '$', ''), ',', '') AS REAL)"
+
+def data_version(conn, tables):
+    """MAX(id) per source table — the stamp that invalidates cached reports."""
+    stamp = []
+    for t in tables:
+        try:
+            stamp.append(conn.execute(f"SELECT MAX(id) FROM {t}").fetchone()[0])
+        except sqlite3.OperationalError:
+            stamp.append(None)
+    return stamp
+
+def _window(conn, table, where=""):
+    """(time expression, WHERE clause) for `table`, or (None, None) if it can't be dated."""
+    cols = _columns(conn, table)
+    ts   = _time_expr(cols)
+    if ts is None:
+        return None, None
+    return ts, f"WHERE {ts} >= ? AND {ts} < ?" + (f" AND {where}" if where else "")
+
+def _has(conn, table, *cols):
+    have = _columns(conn, table)
+    return bool(have) and all(c in have for c in cols)
+
+
+# ── REPORT BUILDERS ──────────────────────────────────────────────────
+# Each returns the same shape as the frontend's REPORT_DATA entries, plus
+# the daily series for CSV: {"title", "subtitle", "kpis", "charts", "table",
+# "insights", "series": (headers, rows)}
+
+def build_stability(conn, start, end):
+    days, series, table_rows, insights = set(), {}, [], []
+    risk_mix, stored = {}, 0
+    for table, col, label, colour in HEALTH_SOURCES:
+        if not _has(conn, table, col):
+            continue
+        ts, where = _window(conn, table, f"{col} IS NOT NULL AND {col} != ''")
+        if ts is None:
+            continue
+        daily = conn.execute(f"""
+            SELECT substr({ts}, 1, 10) AS day, AVG({_num_expr(col)}), MIN({_num_expr(col)}),
+                   MAX({_num_expr(col)}), COUNT(*)
+            FROM {table} {where} GROUP BY day ORDER BY day""", (start, end)).fetchall()
+        if not daily:
+            continue
+        series[label] = ({d: avg for d, avg, *_ in daily}, colour)
+        days.update(d for d, *_ in daily)
+        n     = sum(r[4] for r in daily)
+        mean  = sum(r[1] * r[4] for r in daily) / n
+        stored += n
+        table_rows.append([label, table, f"{n:,}", f"{mean:.2f}",
+                           f"{min(r[2] for r in daily):.2f}", f"{max(r[3] for r in daily):.2f}"])
+        first, last = daily[0][1], daily[-1][1]
+        moved = (last - first) / abs(first) * 100 if first else 0.0
+        worse = moved < 0 if label != "Stress Index" and label != "Non-Performing Loans" else moved > 0
+        if abs(moved) >= 5:
+            insights.append({"level": "warning" if worse else "success",
+                             "text": f"{label} moved {moved:+.1f}% over the period "
+                                     f"({first:.2f} → {last:.2f} daily average)."})
+        if _has(conn, table, "risk_level"):
+            for lvl, cnt in conn.execute(f"SELECT risk_level, COUNT(*) FROM {table} {where} "
+                                         f"AND risk_level IS NOT NULL GROUP BY risk_level", (start, end)):
+                risk_mix[lvl] = risk_mix.get(lvl, 0) + cnt
+
+    alerts    = _count_between(conn, "alerts", start, end)
+    anomalies = _count_between(conn, "anomalies", start, end)
+    days      = sorted(days)
+    high      = sum(v for k, v in risk_mix.items() if k in ("HIGH", "CRITICAL"))
+    high_pct  = high / sum(risk_mix.values()) * 100 if risk_mix else 0.0
+    if high_pct >= 25:
+        insights.append({"level": "danger",
+                         "text": f"{high_pct:.0f}% of stored assessments were HIGH or CRITICAL."})
+    if alerts:
+        insights.append({"level": "info", "text": f"{alerts} threshold alerts raised in the period."})
+    if not insights:
+        insights.append({"level": "info", "text": "No material movement in headline metrics over the period."})
+
+    charts = []
+    if days:
+        charts.append({"title": "Daily Average — Headline Metrics (indexed to first day = 100)", "type": "line",
+                       "labels": [d[5:] for d in days],
+                       "datasets": [{"label": label, "color": colour, "fill": False,
+                                     "data": _indexed([vals.get(d) for d in days])}
+                                    for label, (vals, colour) in series.items()]})
+    if risk_mix:
+        levels = sorted(risk_mix, key=lambda k: -risk_mix[k])
+        charts.append({"title": "Risk Level Mix", "type": "doughnut", "labels": levels,
+                       "datasets": [{"data": [risk_mix[k] for k in levels],
+                                     "colors": [RISK_COLOURS.get(k, "#888") for k in levels]}]})
+    return {
+        "title": "System Stability Report",
+        "subtitle": "Stored health-modal history — capital, liquidity, debt and solvency",
+        "kpis": [
+            {"label": "Rows Analysed", "value": f"{stored:,}",    "color": "#3B82F6", "icon": "🗄"},
+            {"label": "Days Covered",  "value": str(len(days)),   "color": "#3B82F6", "icon": "📅"},
+            {"label": "High/Critical", "value": f"{high_pct:.0f}%",
+             "color": "#EF4444" if high_pct >= 25 else "#00B96B", "icon": "⚠"},
+            {"label": "Alerts Raised", "value": str(alerts),     "color": "#F59E0B" if alerts else "#00B96B",
+             "icon": "🔔"},
+            {"label": "Anomalies",     "value": str(anomalies),  "color": "#F59E0B" if anomalies else "#00B96B",
+             "icon": "📈"},
+        ],
+        "charts": charts,
+        "table": {"headers": ["Metric", "Table", "Rows", "Average", "Min", "Max"], "rows": table_rows},
+        "insights": insights,
+        "series": (["day"] + list(series),
+                   [[d] + [None if series[k][0].get(d) is None else round(series[k][0][d], 4) for k in series]
+                    for d in days]),
+    }
+
+def build_shock(conn, start, end):
+    by_scenario, by_day, latest = {}, {}, []
+    for table in SHOCK_TABLES:
+        if not _has(conn, table, "scenario", "system_impact"):
+            continue
+        ts, where = _window(conn, table, "scenario IS NOT NULL")
+        if ts is None:
+            continue
+        for scen, cnt, failed in conn.execute(f"SELECT scenario, COUNT(*), SUM(failed_nodes) FROM {table} "
+                                              f"{where} GROUP BY scenario", (start, end)):
+            s = by_scenario.setdefault(scen, [0, 0])
+            s[0] += cnt
+            s[1] += failed or 0
+        for day, total, cnt in conn.execute(f"""
+                SELECT substr({ts}, 1, 10) AS day, SUM({_num_expr('system_impact')}), COUNT(*)
+                FROM {table} {where} GROUP BY day""", (start, end)):
+            d = by_day.setdefault(day, [0.0, 0])
+            d[0] += total or 0.0
+            d[1] += cnt
+        latest += conn.execute(f"""
+            SELECT {ts}, scenario, hub_bank, institutions_affected, failed_nodes, system_impact, contagion_index
+            FROM {table} {where} ORDER BY {ts} DESC LIMIT 25""", (start, end)).fetchall()
+    latest = sorted(latest, key=lambda r: r[0], reverse=True)[:25]
+    days   = sorted(by_day)
+    shocks = sum(s[0] for s in by_scenario.values())
+    avg    = sum(d[0] for d in by_day.values()) / shocks if shocks else 0.0
+    hubs   = {}
+    for r in latest:
+        hubs[r[2]] = hubs.get(r[2], 0) + 1
+    top_hub = max(hubs, key=hubs.get) if hubs else "—"
+    scen    = sorted(by_scenario, key=lambda k: -by_scenario[k][0])
+
+    charts = []
+    if days:
+        charts.append({"title": "Average System Impact per Day (%)", "type": "line",
+                       "labels": [d[5:] for d in days],
+                       "datasets": [{"label": "System impact", "color": "#EF4444", "fill": True,
+                                     "data": [round(by_day[d][0] / by_day[d][1], 1) for d in days]}]})
+    if scen:
+        charts.append({"title": "Shocks by Scenario", "type": "barH", "labels": scen,
+                       "datasets": [{"label": "Shocks", "data": [by_scenario[k][0] for k in scen],
+                                     "colors": [PALETTE[i % len(PALETTE)] for i in range(len(scen))]}]})
+    insights = [{"level": "danger" if avg >= 60 else "warning",
+                 "text": f"{shocks} shocks injected; average system impact {avg:.1f}%."}] if shocks else \
+               [{"level": "info", "text": "No shocks injected in the period."}]
+    if hubs:
+        insights.append({"level": "info", "text": f"{top_hub} was the most frequent hub bank in recent shocks."})
+    return {
+        "title": "Shock Impact Report",
+        "subtitle": "Injected stress scenarios and their simulated cascade",
+        "kpis": [
+            {"label": "Shocks",       "value": str(shocks),    "color": "#EF4444", "icon": "⚡"},
+            {"label": "Avg Impact",   "value": f"{avg:.1f}%",  "color": "#F97316", "icon": "📉"},
+            {"label": "Failed Nodes", "value": str(sum(s[1] for s in by_scenario.values())),
+             "color": "#EF4444", "icon": "🏦"},
+            {"label": "Top Hub Bank", "value": html.escape(str(top_hub)), "color": "#3B82F6", "icon": "🎯"},
+        ],
+        "charts": charts,
+        "table": {"headers": ["When", "Scenario", "Hub Bank", "Affected", "Failed", "Impact", "Contagion"],
+                  "rows": [[str(r[0])[:16].replace("T", " ")] + ["" if v is None else str(v) for v in r[1:]]
+                           for r in latest]},
+        "insights": insights,
+        "series": (["day", "shocks", "avg_system_impact"],
+                   [[d, by_day[d][1], round(by_day[d][0] / by_day[d][1], 2)] for d in days]),
+    }
+
+def build_shield(conn, start, end):
+    daily, verdicts, ts = [], [], None
+    if _has(conn, "identity_sessions", "fraud_verdict", "is_duplicate"):
+        ts, where = _window(conn, "identity_sessions")
+    if ts is not None:
+        daily = conn.execute(f"""
+            SELECT substr({ts}, 1, 10) AS day, COUNT(*), SUM(is_duplicate),
+                   SUM(fraud_verdict LIKE 'NEAR-DUPLICATE%')
+            FROM identity_sessions {where} GROUP BY day ORDER BY day""", (start, end)).fetchall()
+        verdicts = conn.execute(f"""
+            SELECT substr(fraud_verdict, 1, instr(fraud_verdict || ' ', ' ') - 1) AS v, COUNT(*)
+            FROM identity_sessions {where} GROUP BY v ORDER BY 2 DESC""", (start, end)).fetchall()
+    total = sum(r[1] for r in daily)
+    dups  = sum(r[2] or 0 for r in daily)
+    near  = sum(r[3] or 0 for r in daily)
+    rate  = dups / total * 100 if total else 0.0
+    colours = {"CLEAN": "#00B96B", "DUPLICATE": "#EF4444", "NEAR-DUPLICATE": "#F59E0B"}
+
+    charts = []
+    if daily:
+        charts.append({"title": "Shield Sessions per Day", "type": "bar", "labels": [r[0][5:] for r in daily],
+                       "datasets": [{"label": "Sessions",   "color": "#3B82F6", "data": [r[1] for r in daily]},
+                                    {"label": "Duplicates", "color": "#EF4444", "data": [r[2] or 0 for r in daily]}]})
+    if verdicts:
+        charts.append({"title": "Verdict Mix", "type": "doughnut", "labels": [v for v, _ in verdicts],
+                       "datasets": [{"data": [c for _, c in verdicts],
+                                     "colors": [colours.get(v, "#8B5CF6") for v, _ in verdicts]}]})
+    return {
+        "title": "Personal Shield Report",
+        "subtitle": "Identity sessions submitted through the Financial Shield",
+        "kpis": [
+            {"label": "Sessions",        "value": f"{total:,}",   "color": "#3B82F6", "icon": "🛡"},
+            {"label": "Duplicates",      "value": f"{dups:,}",    "color": "#EF4444" if dups else "#00B96B",
+             "icon": "🔁"},
+            {"label": "Near-Duplicates", "value": f"{near:,}",    "color": "#F59E0B" if near else "#00B96B",
+             "icon": "≈"},
+            {"label": "Duplicate Rate",  "value": f"{rate:.1f}%", "color": "#EF4444" if rate >= 5 else "#00B96B",
+             "icon": "📊"},
+        ],
+        "charts": charts,
+        "table": {"headers": ["Day", "Sessions", "Duplicates", "Near-Duplicates"],
+                  "rows": [[r[0], str(r[1]), str(r[2] or 0), str(r[3] or 0)] for r in daily]},
+        "insights": [{"level": "warning" if rate >= 5 else "success",
+                      "text": f"{rate:.1f}% of {total:,} sessions matched an identity already on record."}]
+                    if total else [{"level": "info", "text": "No shield sessions in the period."}],
+        "series": (["day", "sessions", "duplicates", "near_duplicates"],
+                   [[r[0], r[1], r[2] or 0, r[3] or 0] for r in daily]),
+    }
+
+def _count_between(conn, table, start, end):
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE created_at >= ? AND created_at < ?",
+                            (start, end)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+
+def _indexed(values):
+    """Rebase a series to its first value = 100 so different units share one axis; gaps carry forward."""
+    base = next((v for v in values if v), None)
+    out, last = [], 100.0
+    for v in values:
+        if v is not None and base:
+            last = round(v / base * 100, 1)
+        out.append(last)
+    return out
+
+REPORT_TYPES = {
+    "stability": ("System-Stability", build_stability, SHOCK_TABLES + ("alerts", "anomalies")),
+    "shock":     ("Shock-Impact",     build_shock,     SHOCK_TABLES),
+    "shield":    ("Personal-Shield",  build_shield,    ("identity_sessions",)),
+}
+
+
+# ── SVG (ports of svgLine / svgBars / svgDonut / buildChartSVG) ──────
+FONT = 'font-family="system-ui"'
+
+def svg_line(data, w, h, color, fill):
+    lo, hi = min(data), max(data)
+    rng = (hi - lo) or 1
+    n   = max(1, len(data) - 1)
+    pts = " ".join(f"{i / n * w:.1f},{h - (v - lo) / rng * (h - 20) + 10:.1f}" for i, v in enumerate(data))
+    poly = f'<polygon points="{pts} {w},{h} 0,{h}" fill="{color}" opacity="0.18"/>' if fill else ""
+    return (f'{poly}<polyline points="{pts}" fill="none" stroke="{color}" stroke-width="3" '
+            f'stroke-linejoin="round" stroke-linecap="round"/>')
+
+def svg_bars_h(data, labels, colors, w, h):
+    top   = max(data) or 1
+    row_h = max(1, (h - 20) // len(data))
+    out   = []
+    for i, v in enumerate(data):
+        bar_w = round(v / top * (w - 80))
+        y     = i * row_h + 10
+        col   = colors[i] if isinstance(colors, (list, tuple)) else colors
+        out.append(f'<rect x="80" y="{y + 4}" width="{bar_w}" height="{max(1, row_h - 10)}" rx="4" fill="{col}" '
+                   f'opacity="0.9"/><text x="75" y="{y + row_h / 2 + 4}" text-anchor="end" font-size="11" '
+                   f'fill="#555" {FONT}>{html.escape(str(labels[i]))}</text><text x="{80 + bar_w + 6}" '
+                   f'y="{y + row_h / 2 + 4}" font-size="11" fill="#333" {FONT}>{v}</text>')
+    return "".join(out)
+
+def svg_donut(data, colors, cx, cy, r):
+    total = sum(data) or 1
+    angle = -math.pi / 2
+    out   = []
+    for v, col in zip(data, colors):
+        sweep = v / total * math.pi * 2
+        if sweep >= math.pi * 2 - 1e-9:
+            out.append(f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="{col}" opacity="0.9"/>')
+            continue
+        x1, y1 = cx + r * math.cos(angle), cy + r * math.sin(angle)
+        angle += sweep
+        x2, y2 = cx + r * math.cos(angle), cy + r * math.sin(angle)
+        out.append(f'<path d="M{cx},{cy} L{x1:.2f},{y1:.2f} A{r},{r} 0 {1 if sweep > math.pi else 0},1 '
+                   f'{x2:.2f},{y2:.2f} Z" fill="{col}" opacity="0.9"/>')
+    return "".join(out) + f'<circle cx="{cx}" cy="{cy}" r="{r * 0.55}" fill="white"/>'
+
+def chart_svg(chart):
+    W, H = 560, 220
+    inner, kind = [], chart["type"]
+    labels = chart["labels"]
+    step   = max(1, len(labels) // 12)          # keep x labels legible on long ranges
+    if kind == "line":
+        for d in chart["datasets"]:
+            inner.append(svg_line(d["data"], W - 20, H - 30, d["color"], d.get("fill")))
+        n = max(1, len(labels) - 1)
+        inner += [f'<text x="{10 + i / n * (W - 20):.1f}" y="{H - 2}" text-anchor="middle" font-size="10" '
+                  f'fill="#888" {FONT}>{html.escape(l)}</text>' for i, l in enumerate(labels) if i % step == 0]
+        inner += [f'<circle cx="{10 + i * 140}" cy="{H + 14}" r="5" fill="{d["color"]}"/><text x="{18 + i * 140}" '
+                  f'y="{H + 19}" font-size="11" fill="#555" {FONT}>{html.escape(d["label"])}</text>'
+                  for i, d in enumerate(chart["datasets"])]
+    elif kind == "bar":
+        top   = max([v for d in chart["datasets"] for v in d["data"]] or [1]) or 1
+        grp_w = max(1, (W - 40) // len(labels))
+        bar_w = max(1, grp_w // len(chart["datasets"]) - 2)
+        for di, ds in enumerate(chart["datasets"]):
+            for i, v in enumerate(ds["data"]):
+                bh = round(v / top * (H - 50))
+                inner.append(f'<rect x="{20 + i * grp_w + di * (bar_w + 2)}" y="{H - bh - 30}" width="{bar_w}" '
+                             f'height="{bh}" rx="3" fill="{ds["color"]}" opacity="0.9"/>')
+        inner += [f'<text x="{20 + i * grp_w + grp_w / 2}" y="{H - 12}" text-anchor="middle" font-size="10" '
+                  f'fill="#555" {FONT}>{html.escape(l)}</text>' for i, l in enumerate(labels) if i % step == 0]
+        inner += [f'<rect x="{10 + i * 120}" y="{H + 4}" width="12" height="12" rx="2" fill="{d["color"]}"/>'
+                  f'<text x="{26 + i * 120}" y="{H + 14}" font-size="11" fill="#555" {FONT}>'
+                  f'{html.escape(d["label"])}</text>' for i, d in enumerate(chart["datasets"])]
+    elif kind == "barH":
+        ds = chart["datasets"][0]
+        inner.append(svg_bars_h(ds["data"], labels, ds.get("colors") or ds.get("color"), W, H))
+    elif kind == "doughnut":
+        ds    = chart["datasets"][0]
+        total = sum(ds["data"]) or 1
+        inner.append(svg_donut(ds["data"], ds["colors"], W / 2 - 80, H / 2 - 10, 80))
+        inner += [f'<rect x="{W - 160}" y="{i * 22 + 10}" width="12" height="12" rx="2" fill="{ds["colors"][i]}"/>'
+                  f'<text x="{W - 144}" y="{i * 22 + 21}" font-size="11" fill="#555" {FONT}>'
+                  f'{html.escape(str(labels[i]))} ({round(v / total * 100)}%)</text>' for i, v in enumerate(ds["data"])]
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H + 40}" '
+            f'viewBox="0 0 {W} {H + 40}">{"".join(inner)}</svg>')
+
+
+# ── HTML / CSV ───────────────────────────────────────────────────────
+INSIGHT_COLOURS = {"danger": ("#FEE2E2", "#DC2626", "🔴"), "warning": ("#FEF9C3", "#D97706", "🟡"),
+                   "success": ("#DCFCE7", "#16A34A", "🟢"), "info": ("#DBEAFE", "#2563EB", "🔵")}
+
+REPORT_CSS = """
+    @page { size: A4; margin: 0; }
+    * { box-sizing: border-box; margin: 0; padding: 0; }
+    body { font-family: -apple-system, system-ui, 'Segoe UI', sans-serif; background: #f9fafb; color: #111827; }
+    .page { width: 210mm; min-height: 297mm; background: white; margin: 0 auto; }
+    .header { background: linear-gradient(135deg, #0a101e 0%, #0f1f3d 100%); padding: 36px 40px; position: relative; }
+    .header::before { content:''; position:absolute; left:0;top:0;bottom:0;width:6px;background:#00B96B; }
+    .logo-badge { width:52px;height:52px;background:#00B96B;border-radius:14px;display:flex;align-items:center;justify-content:center;font-size:22px;font-weight:900;color:white;margin-bottom:16px; }
+    .header h1 { font-size:26px;font-weight:800;color:#ffffff;margin-bottom:6px; }
+    .header p { font-size:13px;color:#86efac;margin-bottom:4px; }
+    .header .meta { font-size:11px;color:#6b9680;margin-top:12px; }
+    .body { padding: 32px 40px; background: #f9fafb; }
+    .section-title { display:flex;align-items:center;gap:12px;margin-bottom:18px;margin-top:32px; }
+    .section-title::before { content:''; width:4px;height:24px;background:#00B96B;border-radius:2px;flex-shrink:0; }
+    .section-title h2 { font-size:16px;font-weight:700;color:#111827; }
+    .kpi-grid { display:grid;grid-template-columns:repeat(4,1fr);gap:14px;margin-bottom:8px; }
+    .kpi { background:#fff;border:1px solid #e5e7eb;border-radius:12px;padding:18px 14px;text-align:center;border-top-width:4px; }
+    .chart { background:#fff;border:1px solid #e5e7eb;border-radius:12px;padding:20px;margin-bottom:24px;break-inside:avoid; }
+    .chart h3 { font-size:14px;font-weight:700;color:#111827;margin:0 0 16px; }
+    table { width:100%;border-collapse:collapse; }
+    thead { background:#0a101e; }
+    thead th { padding:12px 14px;text-align:left;font-size:11px;font-weight:700;color:#fff;text-transform:uppercase;letter-spacing:.5px; }
+    td { padding:10px 14px;font-size:12px;color:#374151;border-bottom:1px solid #f3f4f6; }
+    .footer { background:#0a101e;padding:16px 40px;display:flex;justify-content:space-between;align-items:center; }
+    .footer p { font-size:10px;color:#4b7260; }
+    @media print { body { background: white; } .page { width: 100%; } }
+"""
+
+def render_html(report, start, end, generated):
+    esc  = html.escape
+    kpis = "".join(
+        f'<div class="kpi" style="border-top-color:{k["color"]}"><div style="font-size:22px;margin-bottom:6px;">'
+        f'{k["icon"]}</div><div style="font-size:11px;color:#6b7280;font-weight:600;text-transform:uppercase;'
+        f'letter-spacing:.5px;margin-bottom:8px;">{esc(k["label"])}</div><div style="font-size:20px;'
+        f'font-weight:800;color:{k["color"]};">{k["value"]}</div></div>' for k in report["kpis"])
+    charts = "".join(f'<div class="chart"><h3>{esc(c["title"])}</h3>'
+                     f'<div style="display:flex;justify-content:center;">{chart_svg(c)}</div></div>'
+                     for c in report["charts"]) or '<p style="color:#6b7280;font-size:13px;">No data in range.</p>'
+    rows = "".join(f'<tr style="background:{"#f9fafb" if i % 2 else "#fff"}">'
+                   + "".join(f"<td>{esc(str(cell))}</td>" for cell in row) + "</tr>"
+                   for i, row in enumerate(report["table"]["rows"]))
+    insights = "".join(
+        f'<div style="display:flex;gap:12px;padding:14px 16px;background:{INSIGHT_COLOURS[i["level"]][0]};'
+        f'border-left:4px solid {INSIGHT_COLOURS[i["level"]][1]};border-radius:0 8px 8px 0;margin-bottom:10px;">'
+        f'<span>{INSIGHT_COLOURS[i["level"]][2]}</span><p style="font-size:12.5px;line-height:1.6;">'
+        f'{esc(i["text"])}</p></div>' for i in report["insights"])
+    return f"""<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">
+<title>FinShield — {esc(report["title"])}</title><style>{REPORT_CSS}</style></head><body>
+<div class="page">
+  <div class="header">
+    <div class="logo-badge">FS</div>
+    <h1>{esc(report["title"])}</h1>
+    <p>{esc(report["subtitle"])}</p>
+    <div class="meta">{esc(start)} → {esc(end)} &nbsp;·&nbsp; Generated {esc(generated)} &nbsp;·&nbsp; FinShield Intelligence Platform &nbsp;·&nbsp; CONFIDENTIAL</div>
+  </div>
+  <div class="body">
+    <div class="section-title"><h2>Key Performance Indicators</h2></div>
+    <div class="kpi-grid">{kpis}</div>
+    <div class="section-title"><h2>Visual Analytics &amp; Charts</h2></div>
+    {charts}
+    <div class="section-title"><h2>Detail</h2></div>
+    <table><thead><tr>{"".join(f"<th>{esc(h)}</th>" for h in report["table"]["headers"])}</tr></thead>
+    <tbody>{rows}</tbody></table>
+    <div class="section-title"><h2>Insights</h2></div>
+    {insights}
+  </div>
+  <div class="footer"><p>FinShield Financial Intelligence Platform · Confidential — For Authorized Recipients Only</p></div>
+</div></body></html>"""
+
+def render_csv(report):
+    buf = io.StringIO()
+    headers, rows = report["series"]
+    writer = csv.writer(buf)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+# ── CACHE + ENTRY POINT ──────────────────────────────────────────────
+def parse_range(start, end):
+    """'YYYY-MM-DD' bounds (end inclusive) -> ISO [start, end+1day); defaults to the last 30 days."""
+    today = datetime.date.today()
+    try:
+        s = datetime.date.fromisoformat(start) if start else today - datetime.timedelta(days=29)
+        e = datetime.date.fromisoformat(end) if end else today
+    except ValueError:
+        raise ValueError("from / to must be dates as YYYY-MM-DD")
+    if e < s:
+        raise ValueError("to must not be before from")
+    return s.isoformat(), e.isoformat(), (e + datetime.timedelta(days=1)).isoformat()
+
+def _prune(cache_dir):
+    files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if not f.endswith(".tmp")]
+    if len(files) > CACHE_MAX_FILES:
+        for path in sorted(files, key=os.path.getmtime)[:len(files) - CACHE_MAX_FILES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def get_report(db, rtype, fmt="html", start=None, end=None, chart=0, cache_dir=CACHE_DIR):
+    """
+    (body bytes, content type, filename, cache hit?) for one report.
+    `db` is a database path or a callable returning a read connection (sharded storage).
+    ValueError for a bad type / format / date range / chart index.
+    """
+    if rtype not in REPORT_TYPES:
+        raise ValueError(f"unknown report type: {rtype} (valid: {', '.join(REPORT_TYPES)})")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    start, last, end = parse_range(start, end)
+    title, build, sources = REPORT_TYPES[rtype]
+
+    conn = db() if callable(db) else sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    try:
+        params = {"type": rtype, "format": fmt, "from": start, "to": last,
+                  "chart": chart if fmt == "svg" else None, "data": data_version(conn, sources)}
+        key    = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        fname  = f"FinShield_{title}_{start.replace('-', '')}-{last.replace('-', '')}.{fmt}"
+        path   = os.path.join(cache_dir, f"{key}.{fmt}")
+        try:
+            with open(path, "rb") as f:
+                return f.read(), FORMATS[fmt], fname, True
+        except FileNotFoundError:
+            pass
+        report = build(conn, start, end)
+    finally:
+        conn.close()
+
+    if fmt == "svg":
+        if not 0 <= chart < len(report["charts"]):
+            raise ValueError(f"chart must be 0..{len(report['charts']) - 1}" if report["charts"]
+                             else "no chart data in range")
+        body = chart_svg(report["charts"][chart])
+    elif fmt == "csv":
+        body = render_csv(report)
+    else:
+        body = render_html(report, start, last, time.strftime("%Y-%m-%d %H:%M:%S"))
+    data = body.encode("utf-8")
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")   # unique per writer, thread or process
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)                  # readers never see a half-written report
+    _prune(cache_dir)
+    return data, FORMATS[fmt], fname, False
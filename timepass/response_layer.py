@@ -0,0 +1,133 @@
+"""
+GFNS RESPONSE LAYER — faster JSON, columnar payloads and negotiated
+compression for every route, without touching the handlers' jsonify calls.
+
+  install_response_layer(app)
+    - swaps Flask's JSON provider for orjson when it is installed (stdlib
+      json with compact separators otherwise); jsonify() picks it up
+    - compresses finished (non-streamed) text/JSON responses of at least
+      MIN_COMPRESS_BYTES with br (if the brotli module is installed) or
+      gzip, whichever the client's Accept-Encoding prefers
+
+  columnar(rows) / wants_columnar()
+    ?shape=columnar turns a list of dicts into parallel arrays, so keys
+    like "day"/"score"/"label" are sent once instead of once per point.
+
+Streamed responses (exports, SSE) are left alone; they handle their own
+encoding.
+"""
+
+import json, zlib
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL         = 6
+BROTLI_QUALITY     = 5          # ~gzip-6 speed, noticeably smaller output
+COMPRESSIBLE       = ("application/json", "text/", "image/svg+xml", "application/x-ndjson")
+
+
+# ── JSON ─────────────────────────────────────────────────────────────
+def dumps(obj, default=None):
+    """Compact JSON as bytes — orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass                 # e.g. ints beyond 64 bits: let stdlib json have a go
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps(); keys keep insertion order."""
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, default=kwargs.get("default", self.default)).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, default=self.default), mimetype=self.mimetype)
+
+
+def columnar(rows, keys=None):
+    """[{"day": 1, "score": 70.2}, ...] -> {"day": [1, ...], "score": [70.2, ...]}."""
+    if keys is None:
+        keys = list(rows[0]) if rows else []
+    return {k: [r.get(k) for r in rows] for k in keys}
+
+def wants_columnar():
+    return request.args.get("shape", "rows").lower() == "columnar"
+
+
+# ── COMPRESSION ──────────────────────────────────────────────────────
+def accepted_encodings(header):
+    """{'gzip': 1.0, 'br': 0.8} from an Accept-Encoding header; q=0 means refused."""
+    out = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        out[name.strip().lower()] = q
+    return out
+
+def choose_encoding(header):
+    """'br', 'gzip' or None for this Accept-Encoding; br wins ties when available."""
+    acc    = accepted_encodings(header)
+    offers = (["br"] if brotli is not None else []) + ["gzip"]
+    best   = None
+    for enc in offers:
+        q = acc.get(enc, acc.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (enc, q)
+    return best and best[0]
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    comp = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)   # wbits=31 -> gzip container
+    return comp.compress(data) + comp.flush()
+
+def install_response_layer(app, min_bytes=MIN_COMPRESS_BYTES):
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def _compress(response):
+        if (response.is_streamed or response.direct_passthrough or response.status_code != 200
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(COMPRESSIBLE)):
+            return response
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding:
+            response.set_data(compress(data, encoding))
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    return app
@@ -0,0 +1,214 @@
+"""
+GFNS RISK SCORING — Altman Z, distress zones and a composite stability
+score for every institution, computed server-side in one columnar pass.
+
+Inputs (latest row per institution):
+  institution_financials  balance-sheet lines for the Altman ratios, an
+                          optional reported z_score and the LCR
+  bank_capital_adequacy   tier1_capital_ratio from bulk-loaded filings
+
+Zones and colours match the frontend's zZone()/zColor():
+  Z >= 3.0 SAFE, Z >= 1.8 GREY ZONE, otherwise DISTRESS.
+
+numpy is used when installed; without it the same columns are scored
+with plain Python loops. Results are cached until either source table
+gains rows.
+"""
+
+import math, sqlite3, threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Z_SAFE, Z_GREY = 3.0, 1.8
+ZONES   = ("DISTRESS", "GREY ZONE", "SAFE")
+COLOURS = ("#dc2626", "#d97706", "#16a34a")
+Z_COEF  = (1.2, 1.4, 3.3, 0.6, 1.0)        # Altman (1968): X1..X5
+
+# Composite = weighted mean of the components an institution has, each
+# scaled to 0..1 between a floor and a comfortable level
+Z_RANGE   = (0.0, 6.0)                      # same scale as the frontend's Z bar
+T1_RANGE  = (6.0, 16.0)                     # Basel III minimum -> well capitalised
+LCR_RANGE = (100.0, 150.0)                  # regulatory minimum -> ample liquidity
+WEIGHTS   = (0.5, 0.3, 0.2)                 # Z, Tier-1, LCR
+
+FINANCIALS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS institution_financials (
+        id                INTEGER PRIMARY KEY AUTOINCREMENT,
+        institution       TEXT,
+        region            TEXT,
+        total_assets      REAL,
+        total_liabilities REAL,
+        working_capital   REAL,
+        retained_earnings REAL,
+        ebit              REAL,
+        market_equity     REAL,
+        sales             REAL,
+        z_score           REAL,
+        lcr               REAL,
+        recorded_at       TEXT
+    )"""
+
+FIN_COLUMNS = ("total_assets", "total_liabilities", "working_capital", "retained_earnings",
+               "ebit", "market_equity", "sales", "z_score", "lcr")
+
+
+def _table_exists(conn, table):
+    # table_info resolves across attached shards and temp views, unlike main's sqlite_master
+    return conn.execute(f"PRAGMA table_info({table})").fetchone() is not None
+
+def _has_column(conn, table, col):
+    return any(r[1] == col for r in conn.execute(f"PRAGMA table_info({table})"))
+
+
+# ── COLUMNS ──────────────────────────────────────────────────────────
+def load_columns(conn):
+    """Latest financials and Tier-1 per institution, as parallel column lists (None = missing)."""
+    fin, t1 = {}, {}
+    if _table_exists(conn, "institution_financials"):
+        for row in conn.execute(f"""
+                SELECT institution, region, {", ".join(FIN_COLUMNS)} FROM institution_financials
+                WHERE id IN (SELECT MAX(id) FROM institution_financials
+                             WHERE institution IS NOT NULL GROUP BY institution)"""):
+            fin[row[0]] = row[1:]
+    if _table_exists(conn, "bank_capital_adequacy") and _has_column(conn, "bank_capital_adequacy", "institution"):
+        for inst, region, ratio in conn.execute("""
+                SELECT institution, region, tier1_capital_ratio FROM bank_capital_adequacy
+                WHERE id IN (SELECT MAX(id) FROM bank_capital_adequacy
+                             WHERE institution IS NOT NULL GROUP BY institution)"""):
+            t1[inst] = (region, ratio)
+    names = sorted(set(fin) | set(t1))
+    empty = (None,) * (len(FIN_COLUMNS) + 1)
+    cols  = {"institution": names,
+             "region": [fin[n][0] if n in fin else t1[n][0] for n in names],
+             "tier1":  [_num(t1.get(n, (None, None))[1]) for n in names]}
+    for i, c in enumerate(FIN_COLUMNS, start=1):
+        cols[c] = [_num(fin.get(n, empty)[i]) for n in names]
+    return cols
+
+def _num(v):
+    """REAL columns hold text when a row came in through the modal path ('13.4%')."""
+    if v is None or isinstance(v, (int, float)):
+        return v
+    try:
+        return float(str(v).rstrip("%").replace(",", ""))
+    except ValueError:
+        return None
+
+
+# ── SCORING ──────────────────────────────────────────────────────────
+def _score_numpy(cols):
+    f   = lambda c: np.array([np.nan if v is None else v for v in cols[c]], dtype=float)
+    ta, tl = f("total_assets"), f("total_liabilities")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ta = np.where(ta > 0, ta, np.nan)
+        tl = np.where(tl > 0, tl, np.nan)
+        x  = (f("working_capital") / ta, f("retained_earnings") / ta, f("ebit") / ta,
+              f("market_equity") / tl, f("sales") / ta)
+    z = sum(k * xi for k, xi in zip(Z_COEF, x))
+    z = np.where(np.isnan(z), f("z_score"), z)           # fall back to a reported Z
+    zone = (z >= Z_GREY).astype(int) + (z >= Z_SAFE).astype(int)
+
+    parts = []
+    for vals, (lo, hi) in ((z, Z_RANGE), (f("tier1"), T1_RANGE), (f("lcr"), LCR_RANGE)):
+        parts.append(np.clip((vals - lo) / (hi - lo), 0.0, 1.0))
+    w     = np.array(WEIGHTS)[:, None] * ~np.isnan(np.vstack(parts))
+    total = w.sum(axis=0)
+    with np.errstate(invalid="ignore"):
+        comp = np.nansum(np.vstack(parts) * w, axis=0) / total * 100
+    comp = np.where(total > 0, comp, np.nan)
+    has_z = ~np.isnan(z)
+    return ([None if not ok else round(float(v), 3) for v, ok in zip(z, has_z)],
+            [None if not ok else int(k) for k, ok in zip(zone, has_z)],
+            [None if math.isnan(v) else round(float(v), 1) for v in comp])
+
+def _score_python(cols):
+    def ratio(a, b):
+        return None if a is None or b is None or b <= 0 else a / b
+    def scaled(v, rng):
+        lo, hi = rng
+        return None if v is None else min(1.0, max(0.0, (v - lo) / (hi - lo)))
+    zs, zones, comps = [], [], []
+    for i in range(len(cols["institution"])):
+        ta, tl = cols["total_assets"][i], cols["total_liabilities"][i]
+        x = (ratio(cols["working_capital"][i], ta), ratio(cols["retained_earnings"][i], ta),
+             ratio(cols["ebit"][i], ta), ratio(cols["market_equity"][i], tl), ratio(cols["sales"][i], ta))
+        z = None if None in x else sum(k * xi for k, xi in zip(Z_COEF, x))
+        if z is None:
+            z = cols["z_score"][i]
+        parts = (scaled(z, Z_RANGE), scaled(cols["tier1"][i], T1_RANGE), scaled(cols["lcr"][i], LCR_RANGE))
+        total = sum(w for w, p in zip(WEIGHTS, parts) if p is not None)
+        zs.append(None if z is None else round(z, 3))
+        zones.append(None if z is None else (z >= Z_GREY) + (z >= Z_SAFE))
+        comps.append(round(sum(w * p for w, p in zip(WEIGHTS, parts) if p is not None) / total * 100, 1)
+                     if total else None)
+    return zs, zones, comps
+
+def score_columns(cols):
+    """One dict per institution: Z, zone, zone colour, inputs and composite score (0-100)."""
+    zs, zones, comps = (_score_numpy if np is not None else _score_python)(cols)
+    return [{"institution": inst, "region": region, "zScore": z,
+             "zone": None if k is None else ZONES[k], "colour": None if k is None else COLOURS[k],
+             "tier1": t1, "lcr": lcr, "composite": comp}
+            for inst, region, z, k, comp, t1, lcr in zip(
+                cols["institution"], cols["region"], zs, zones, comps, cols["tier1"], cols["lcr"])]
+
+
+# ── CACHED ENGINE ────────────────────────────────────────────────────
+class RiskEngine:
+    """Scores every institution once per data change; readers share the cached result."""
+    SOURCES = ("institution_financials", "bank_capital_adequacy")
+
+    def __init__(self, db_path, connect=None):
+        self.db_path = db_path
+        self.connect = connect or (lambda: sqlite3.connect(self.db_path))
+        self._lock   = threading.Lock()
+        self._key    = None
+        self._result = None
+
+    def _fingerprint(self, conn):
+        key = []
+        for t in self.SOURCES:
+            try:
+                key.append(conn.execute(f"SELECT MAX(id) FROM {t}").fetchone()[0])
+            except sqlite3.OperationalError:
+                key.append(None)
+        return tuple(key)
+
+    def results(self):
+        """{'institutions': [...], 'summary': {...}}; recomputed only when a source table gains rows."""
+        conn = self.connect()
+        try:
+            key = self._fingerprint(conn)
+            with self._lock:
+                if key != self._key or self._result is None:
+                    rows = score_columns(load_columns(conn))
+                    self._result, self._key = {"institutions": rows, "summary": summarize(rows)}, key
+                return self._result
+        finally:
+            conn.close()
+
+    def invalidate(self):
+        with self._lock:
+            self._key = None
+
+
+def summarize(rows):
+    scored = [r["composite"] for r in rows if r["composite"] is not None]
+    zones  = {z: 0 for z in ZONES}
+    for r in rows:
+        if r["zone"]:
+            zones[r["zone"]] += 1
+    return {"institutions": len(rows), "scored": len(scored),
+            "score": round(sum(scored) / len(scored), 1) if scored else None,
+            "zones": zones}
+
+def risk_level(score, zones):
+    """Dashboard risk label: system score bands, bumped up when many banks sit in DISTRESS."""
+    level = 0 if score >= 75 else 1 if score >= 60 else 2 if score >= 45 else 3
+    total = sum(zones.values())
+    if total and zones["DISTRESS"] / total >= 0.25:
+        level = min(3, level + 1)
+    return ("Low", "Moderate", "Elevated", "High")[level]
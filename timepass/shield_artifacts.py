@@ -0,0 +1,224 @@
+"""
+FINANCIAL SHIELD — COMPACT ARTIFACT STORAGE
+What each shield submission decoded, one row per field:
+
+  shield_fields
+    raw_token    field token as sent (reversed name, e.g. "eman")
+    char_count   decoded characters (documents: bytes)
+    digest       HMAC-SHA256 of the decoded value under the operator key
+    salt, cipher, hmac   the decoded value sealed with AES-256-GCM under the
+                 operator key: nonce, ciphertext, tag (raw bytes)
+    algo, decrypted_ok   how it was sealed, and whether step 4 got the bits back
+
+The operator key is $GFNS_SHIELD_KEY (32 or more bytes, hex or base64),
+kept outside the database and the source. Without it no digest and no
+cipher are stored — a row keeps only the token, size and outcome — since
+an unkeyed hash of an age or an ID type is found again from a short list,
+and a cipher under a key in the source is the plaintext. Documents too
+large to keep in memory are digested, not sealed.
+
+purge_legacy_artifacts() clears what earlier versions stored (the
+decoded bits, and ciphers sealed under the built-in passphrase), with
+secure_delete on and a VACUUM so the old values don't linger in free pages.
+
+The tables the desktop viewer lists are views over it, computed in plain
+SQL when read — no functions to register, so the viewer, CLI and export
+see them like any table:
+  embedded_data   one row per field: token, size, keyed digest
+  binary_data     one row per sealed byte: position, binary_rep, decimal_val
+                  (id = field id * MAX_CHARS + position)
+  encrypted_data  one row per field, nonce / cipher / tag in base64
+shield_positions (1..MAX_CHARS) drives the per-byte expansion.
+"""
+
+import os, hmac, base64, hashlib, binascii
+
+from shield_stream import pack_bits, AES
+
+MAX_CHARS = 65536          # per-field bytes the views expand (also the binary_data id stride)
+VIEWS     = ("embedded_data", "binary_data", "encrypted_data")
+KEY_ENV   = "GFNS_SHIELD_KEY"
+MIN_KEY   = 32             # operator key bytes
+ALGO      = "AES-256-GCM / HMAC-SHA256"
+
+_HEX = "'0123456789ABCDEF'"
+_B64 = "'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'"
+
+
+# ── OPERATOR KEY ─────────────────────────────────────────────────────
+class ArtifactKey:
+    """
+    Seals and digests field values for storage. Two subkeys are derived
+    from the operator key, one for AES-256-GCM and one for HMAC-SHA256;
+    with no key, seal() and mac() return None and nothing reversible is kept.
+    """
+    def __init__(self, key=None):
+        if key is not None and len(key) < MIN_KEY:
+            raise ValueError(f"shield key must be at least {MIN_KEY} bytes")
+        self.seal_key = hmac.new(key, b"gfns-shield-seal", hashlib.sha256).digest() if key else None
+        self.mac_key  = hmac.new(key, b"gfns-shield-digest", hashlib.sha256).digest() if key else None
+
+    @classmethod
+    def from_env(cls):
+        text = os.environ.get(KEY_ENV, "").strip()
+        if not text:
+            return cls()
+        try:
+            key = bytes.fromhex(text)
+        except ValueError:
+            try:
+                key = base64.b64decode(text, validate=True)
+            except binascii.Error:
+                raise ValueError(f"{KEY_ENV} must be hex or base64") from None
+        return cls(key)
+
+    def __bool__(self):
+        return self.seal_key is not None
+
+    def mac(self, data):
+        return hmac.new(self.mac_key, data, hashlib.sha256).digest() if self else None
+
+    def seal(self, data):
+        """(nonce, ciphertext, tag), or None without a key."""
+        if not self:
+            return None
+        if AES is None:
+            raise ImportError("pycryptodome is required to seal shield artifacts — pip install pycryptodome")
+        nonce   = os.urandom(12)
+        ct, tag = AES.new(self.seal_key, AES.MODE_GCM, nonce=nonce).encrypt_and_digest(data)
+        return nonce, ct, tag
+
+    def open(self, nonce, cipher, tag):
+        """The decoded value back from a stored row (operator tooling); ValueError if it was altered."""
+        return AES.new(self.seal_key, AES.MODE_GCM, nonce=nonce).decrypt_and_verify(cipher, tag)
+
+
+# ── SQL BUILDING BLOCKS ──────────────────────────────────────────────
+def _byte(blob, pos):
+    """SQL: value 0-255 of byte `pos` (1-based) of `blob`; 0 past the end."""
+    h = f"hex(substr({blob}, {pos}, 1))"
+    return f"((instr({_HEX}, substr({h}, 1, 1)) - 1) * 16 + instr({_HEX}, substr({h}, 2, 1)) - 1)"
+
+def _bit_string(v):
+    """SQL: '01001010' for a byte value expression."""
+    return " || ".join(f"({v} >> {i} & 1)" for i in range(7, -1, -1))
+
+def _base64(blob):
+    """SQL: standard padded base64 of `blob`, three bytes per shield_positions step."""
+    return f"""(SELECT group_concat(substr({_B64}, (b1 >> 2) + 1, 1)
+                || substr({_B64}, (((b1 & 3) << 4) | (b2 >> 4)) + 1, 1)
+                || CASE WHEN n + 1 > l THEN '=' ELSE substr({_B64}, (((b2 & 15) << 2) | (b3 >> 6)) + 1, 1) END
+                || CASE WHEN n + 2 > l THEN '=' ELSE substr({_B64}, (b3 & 63) + 1, 1) END, '')
+            FROM (SELECT n, length({blob}) AS l, {_byte(blob, "n")} AS b1,
+                         {_byte(blob, "n + 1")} AS b2, {_byte(blob, "n + 2")} AS b3
+                  FROM shield_positions WHERE n <= length({blob}) AND n % 3 = 1 ORDER BY n))"""
+
+def _view_sql(schema):
+    return {
+        "embedded_data": f"""CREATE VIEW IF NOT EXISTS {schema}.embedded_data AS
+            SELECT f.id, f.session_id, f.field_name, f.raw_token,
+                   f.char_count, lower(hex(f.digest)) AS hmac_sha256, f.created_at
+            FROM shield_fields f""",
+        "binary_data": f"""CREATE VIEW IF NOT EXISTS {schema}.binary_data AS
+            SELECT fid * {MAX_CHARS} + n AS id, session_id, field_name, n AS position,
+                   {_bit_string("v")} AS binary_rep, v AS decimal_val, created_at
+            FROM (SELECT f.id AS fid, f.session_id, f.field_name, f.created_at, p.n,
+                         {_byte("f.cipher", "p.n")} AS v
+                  FROM shield_fields f JOIN shield_positions p ON p.n <= length(f.cipher))""",
+        "encrypted_data": f"""CREATE VIEW IF NOT EXISTS {schema}.encrypted_data AS
+            SELECT f.id, f.session_id, f.field_name, {_base64("f.salt")} AS nonce_b64,
+                   {_base64("f.cipher")} AS cipher_b64, {_base64("f.hmac")} AS tag_b64,
+                   f.algo, length(f.cipher) AS cipher_len, f.decrypted_ok, f.created_at
+            FROM shield_fields f""",
+    }
+
+
+# ── SCHEMA ───────────────────────────────────────────────────────────
+def ensure_artifact_tables(cursor, schema="main"):
+    """`schema` is the attached database holding the shield tables (see storage.py)."""
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {schema}.shield_fields (
+        id           INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id   TEXT,
+        field_name   TEXT,
+        raw_token    TEXT,
+        char_count   INTEGER,
+        digest       BLOB,
+        salt         BLOB,
+        cipher       BLOB,
+        hmac         BLOB,
+        algo         TEXT,
+        decrypted_ok INTEGER,
+        created_at   TEXT
+    )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {schema}.ix_shield_fields_session "
+                   f"ON shield_fields(session_id)")
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {schema}.shield_positions (n INTEGER PRIMARY KEY)")
+    if cursor.execute(f"SELECT MAX(n) FROM {schema}.shield_positions").fetchone()[0] != MAX_CHARS:
+        cursor.execute(f"""INSERT OR IGNORE INTO {schema}.shield_positions (n)
+            WITH RECURSIVE c(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM c WHERE n < {MAX_CHARS})
+            SELECT n FROM c""")
+    for sql in _view_sql(schema).values():
+        cursor.execute(sql)
+
+def purge_legacy_artifacts(conn, schema="main"):
+    """
+    Clear what earlier versions stored: the bits column, and the digests and
+    ciphers of every row (unkeyed, or sealed under the built-in passphrase).
+    Those tables are recognised by the old view layout (or the bits column),
+    so this runs once. Commits, then VACUUMs `schema`; returns True if it
+    purged anything.
+    """
+    columns = [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info(shield_fields)")]
+    view    = [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info(embedded_data)")]
+    if not columns or ("bits" not in columns and "sha256" not in view):
+        return False
+    conn.execute(f"PRAGMA {schema}.secure_delete = ON")      # overwrite what is freed, not just unlink it
+    for name in VIEWS:
+        conn.execute(f"DROP VIEW IF EXISTS {schema}.{name}")
+    if "bits" in columns:
+        conn.execute(f"ALTER TABLE {schema}.shield_fields DROP COLUMN bits")
+    conn.execute(f"UPDATE {schema}.shield_fields SET digest = NULL, salt = NULL, cipher = NULL, "
+                 f"hmac = NULL, algo = NULL")
+    conn.commit()
+    conn.execute(f"VACUUM {schema}")                            # rebuild the file: no old free pages
+    return True
+
+
+# ── ROWS ─────────────────────────────────────────────────────────────
+def field_artifact(name, key, bits=None, decrypted_ok=None, packed=None, size=None, mac=None):
+    """
+    One field's artifact, sealed and digested under `key` (an ArtifactKey).
+    /submit passes the bit string; streamed uploads pass the packed value
+    (None when too large to keep) with its size and keyed digest.
+    """
+    if packed is None and bits is not None:
+        packed = pack_bits(bits.encode())
+    if packed is not None:
+        size = len(packed) if size is None else size
+        mac  = mac or key.mac(packed)
+    sealed = key.seal(packed) if packed is not None else None
+    nonce, cipher, tag = sealed or (None, None, None)
+    return {
+        "field_name":   name,
+        "raw_token":    name[::-1],
+        "char_count":   size or 0,
+        "digest":       mac if key else None,
+        "salt":         nonce,
+        "cipher":       cipher,
+        "hmac":         tag,
+        "algo":         ALGO if key else None,
+        "decrypted_ok": None if decrypted_ok is None else int(bool(decrypted_ok)),
+    }
+
+_COLUMNS = ("session_id", "field_name", "raw_token", "char_count", "digest",
+            "salt", "cipher", "hmac", "algo", "decrypted_ok", "created_at")
+
+def store_artifacts(cursor, table, session_id, artifacts, created_at):
+    """Insert all of a session's field rows; `table` is the (schema-qualified) shield_fields name."""
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+        [tuple({**a, "session_id": session_id, "created_at": created_at}[c] for c in _COLUMNS)
+         for a in artifacts])
+    return len(artifacts)
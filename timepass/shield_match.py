@@ -0,0 +1,140 @@
+"""
+FINANCIAL SHIELD — NEAR-DUPLICATE IDENTITY MATCHING
+MinHash signatures over normalized identity fields, bucketed with
+locality-sensitive hashing (LSH) so a fuzzy lookup only touches the few
+records that share a band with the query, not every stored identity.
+
+Only signatures and band buckets are stored. A MinHash signature cannot
+be turned back into the names, numbers or emails it was computed from.
+"""
+
+import re, struct, random, hashlib
+
+NUM_PERM        = 64                    # MinHash values per signature
+BANDS           = 16                    # LSH bands  (BANDS * ROWS == NUM_PERM)
+ROWS            = NUM_PERM // BANDS     # -> candidate pairs from ~0.5 Jaccard up
+NEAR_DUP_THRESHOLD = 0.6                # estimated Jaccard to report a match
+MAX_CANDIDATES  = 200
+MAX_MATCHES     = 5
+
+_PRIME = (1 << 61) - 1
+_rng   = random.Random(0x6F5)          # fixed seed: signatures must be stable across restarts
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIG   = struct.Struct(f"<{NUM_PERM}I")
+
+GRAM_FIELDS  = ("name", "phone", "email", "card", "idnum")
+TOKEN_FIELDS = ("idtype", "age")
+
+
+# ── NORMALIZATION ────────────────────────────────────────────────────
+def normalize_fields(fields):
+    """
+    Canonical form of decoded shield fields, so formatting differences
+    (case, spacing, dashes, country codes, name order) don't matter.
+    """
+    def digits(v):
+        return re.sub(r"\D", "", v)
+    out  = {}
+    name = re.sub(r"[^a-z ]", "", fields.get("name", "").lower()).split()
+    out["name"]   = " ".join(sorted(name))
+    out["phone"]  = digits(fields.get("phone", ""))[-10:]
+    out["email"]  = fields.get("email", "").strip().lower()
+    out["card"]   = digits(fields.get("card", ""))
+    out["idnum"]  = re.sub(r"[^a-z0-9]", "", fields.get("idnum", "").lower())
+    out["idtype"] = re.sub(r"[^a-z0-9]", "", fields.get("idtype", "").lower())
+    out["age"]    = digits(fields.get("age", ""))
+    return {k: v for k, v in out.items() if v}
+
+def identity_shingles(norm):
+    """Character 3-grams per free-text field, whole tokens for categorical ones."""
+    grams = set()
+    for field in GRAM_FIELDS:
+        val = norm.get(field, "")
+        if len(val) < 3:
+            if val:
+                grams.add(f"{field}|{val}")
+            continue
+        grams.update(f"{field}|{val[i:i+3]}" for i in range(len(val) - 2))
+    for field in TOKEN_FIELDS:
+        if field in norm:
+            grams.add(f"{field}={norm[field]}")
+    return grams
+
+
+# ── MINHASH / LSH ────────────────────────────────────────────────────
+def _h64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+def minhash_signature(shingles):
+    """NUM_PERM 32-bit minimums of (a*x + b) mod p over the shingle hashes."""
+    if not shingles:
+        return None
+    hashes = [_h64(s) for s in shingles]
+    return [min((a * x + b) % _PRIME for x in hashes) & 0xFFFFFFFF for a, b in _PERMS]
+
+def pack_signature(sig):
+    return _SIG.pack(*sig)
+
+def unpack_signature(blob):
+    return _SIG.unpack(blob)
+
+def band_buckets(sig):
+    """One signed 64-bit bucket key per band, ready for an indexed SQLite lookup."""
+    out = []
+    for band in range(BANDS):
+        chunk = struct.pack(f"<{ROWS}I", *sig[band * ROWS:(band + 1) * ROWS])
+        out.append((band, int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(),
+                                          "little", signed=True)))
+    return out
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: share of MinHash positions that agree."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+def signature_for(fields):
+    return minhash_signature(identity_shingles(normalize_fields(fields)))
+
+
+# ── STORAGE (signatures only) ────────────────────────────────────────
+def ensure_lsh_tables(cursor, schema="main"):
+    """`schema` is the attached database holding the shield tables (see storage.py)."""
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {schema}.identity_signatures (
+        record_id  TEXT PRIMARY KEY,
+        signature  BLOB,
+        created_at TEXT
+    )
+    """)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {schema}.identity_lsh (
+        band      INTEGER,
+        bucket    INTEGER,
+        record_id TEXT,
+        PRIMARY KEY (band, bucket, record_id)
+    ) WITHOUT ROWID
+    """)
+
+def find_near_duplicates(cursor, sig, threshold=NEAR_DUP_THRESHOLD, limit=MAX_MATCHES):
+    """[(record_id, similarity)] best first, from records sharing at least one band."""
+    buckets = band_buckets(sig)
+    where   = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+    params  = [v for pair in buckets for v in pair]
+    cands   = [r[0] for r in cursor.execute(
+        f"SELECT DISTINCT record_id FROM identity_lsh WHERE {where} LIMIT {MAX_CANDIDATES}", params)]
+    if not cands:
+        return []
+    marks   = ",".join("?" * len(cands))
+    scored  = []
+    for record_id, blob in cursor.execute(
+            f"SELECT record_id, signature FROM identity_signatures WHERE record_id IN ({marks})", cands):
+        score = similarity(sig, unpack_signature(blob))
+        if score >= threshold:
+            scored.append((record_id, round(score, 3)))
+    scored.sort(key=lambda m: -m[1])
+    return scored[:limit]
+
+def store_signature(cursor, record_id, sig, created_at):
+    cursor.execute("INSERT OR REPLACE INTO identity_signatures VALUES (?, ?, ?)",
+                   (record_id, pack_signature(sig), created_at))
+    cursor.executemany("INSERT OR IGNORE INTO identity_lsh VALUES (?, ?, ?)",
+                       [(band, bucket, record_id) for band, bucket in band_buckets(sig)])
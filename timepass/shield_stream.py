@@ -0,0 +1,321 @@
+"""
+FINANCIAL SHIELD — STREAMED UPLOADS
+Framed AES-GCM for shield payloads too large to hold in memory (scanned
+KYC documents), decrypted and parsed as the request body arrives.
+
+Wire format (POST /submit/stream, application/octet-stream):
+  header  "GFSS" | version u8 | key length u8 | AES key | nonce prefix (7 B) | frame size u32
+  frame   ciphertext length u32 | AES-GCM ciphertext + 16-byte tag
+All integers are big-endian. Frame i is sealed with nonce
+prefix || i (u32) || last (u8, 1 on the final frame only) and the header
+as associated data, so frames cannot be reordered, dropped, spliced from
+another upload or cut off at a frame boundary without failing
+authentication. (The key travels with the payload, as it does in
+/submit's encPayload.)
+
+The plaintext is the same embed token /submit decrypts:
+  "eman:01001010 01101111 ...  ||  ega:00110010 ..."
+parsed incrementally: each field is decoded group by group into a
+StreamField that keeps the value itself only up to INLINE_BYTES (enough
+for names, numbers, emails) and a SHA-256 digest and size beyond that —
+plus an HMAC under the storage key when the caller passes one.
+Peak memory is one frame plus a few KB per field, whatever the upload
+size. Nothing is stored until the final frame has authenticated.
+
+Run: python shield_stream.py upload scan.pdf --field kycdoc --name "Jane Doe"
+"""
+
+import io, os, sys, hmac, struct, hashlib, argparse, http.client
+from urllib.parse import urlsplit
+
+try:
+    from Crypto.Cipher import AES
+except ImportError:
+    AES = None
+
+MAGIC         = b"GFSS"
+VERSION       = 1
+PREFIX_BYTES  = 7
+TAG_BYTES     = 16
+FRAME_BYTES   = 64 * 1024            # plaintext per frame when sealing
+MAX_FRAME     = 1024 * 1024          # largest frame size a client may declare
+MAX_UPLOAD    = 512 * 1024 * 1024    # ciphertext bytes accepted per upload
+INLINE_BYTES  = 4096                 # decoded field values kept in memory up to this size
+MAX_NAME      = 64                   # field-name characters
+
+_HEADER = struct.Struct(">4sBB")
+_U32    = struct.Struct(">I")
+_GROUPS = [format(i, "08b").encode() for i in range(256)]
+_BITS   = {g: i for i, g in enumerate(_GROUPS)}
+
+
+def pack_bits(segment):
+    """b"01001010 01101111" -> b"Jo": one byte per 8-bit group; other groups are skipped, as in decode_from_bits."""
+    vals = list(map(_BITS.get, segment.split()))
+    if None in vals:
+        vals = [v for v in vals if v is not None]
+    return bytes(vals)
+
+
+class StreamError(ValueError):
+    """Malformed, truncated or unauthenticated stream — the upload is rejected."""
+
+
+# ── FRAMING ──────────────────────────────────────────────────────────
+def _nonce(prefix, index, last):
+    return prefix + _U32.pack(index) + (b"\x01" if last else b"\x00")
+
+def _read_exact(stream, n):
+    parts, left = [], n
+    while left:
+        chunk = stream.read(left)
+        if not chunk:
+            break
+        parts.append(chunk)
+        left -= len(chunk)
+    return b"".join(parts)
+
+def seal_stream(chunks, key, frame_bytes=FRAME_BYTES):
+    """Yield the framed ciphertext for an iterable of plaintext byte chunks (client side)."""
+    if AES is None:
+        raise ImportError("pycryptodome not installed — run: pip install pycryptodome")
+    prefix = os.urandom(PREFIX_BYTES)
+    header = _HEADER.pack(MAGIC, VERSION, len(key)) + key + prefix + _U32.pack(frame_bytes)
+    yield header
+    buf, index, pending = bytearray(), 0, None
+    def seal(data, last):
+        aes = AES.new(key, AES.MODE_GCM, nonce=_nonce(prefix, index, last))
+        aes.update(header)
+        ct, tag = aes.encrypt_and_digest(bytes(data))
+        return _U32.pack(len(ct) + TAG_BYTES) + ct + tag
+    for chunk in chunks:
+        buf += chunk
+        while len(buf) >= frame_bytes:
+            if pending is not None:          # one frame of lookahead: only the last gets the flag
+                yield seal(pending, False)
+                index += 1
+            pending = buf[:frame_bytes]
+            del buf[:frame_bytes]
+    if pending is not None and buf:
+        yield seal(pending, False)
+        index += 1
+        pending = None
+    yield seal(pending if pending is not None else buf, True)
+
+def open_stream(stream, max_bytes=MAX_UPLOAD):
+    """
+    Yield authenticated plaintext chunks from a framed upload on a file-like
+    `stream`. Raises StreamError on any framing or authentication failure —
+    including a stream that ends before its final frame.
+    """
+    if AES is None:
+        raise ImportError("pycryptodome not installed — run: pip install pycryptodome")
+    head = _read_exact(stream, _HEADER.size)
+    if len(head) < _HEADER.size:
+        raise StreamError("stream too short for a header")
+    magic, version, key_len = _HEADER.unpack(head)
+    if magic != MAGIC or version != VERSION:
+        raise StreamError("not a GFSS v1 stream")
+    if key_len not in (16, 24, 32):
+        raise StreamError("AES key must be 16, 24 or 32 bytes")
+    rest = _read_exact(stream, key_len + PREFIX_BYTES + _U32.size)
+    if len(rest) < key_len + PREFIX_BYTES + _U32.size:
+        raise StreamError("stream too short for a header")
+    header      = head + rest
+    key         = rest[:key_len]
+    prefix      = rest[key_len:key_len + PREFIX_BYTES]
+    frame_bytes = _U32.unpack(rest[-_U32.size:])[0]
+    if not 0 < frame_bytes <= MAX_FRAME:
+        raise StreamError(f"frame size must be 1..{MAX_FRAME} bytes")
+
+    total, index = 0, 0
+    length = _read_exact(stream, _U32.size)
+    while True:
+        if len(length) < _U32.size:
+            raise StreamError("stream truncated: final frame missing")
+        n = _U32.unpack(length)[0]
+        if not TAG_BYTES <= n <= frame_bytes + TAG_BYTES:
+            raise StreamError(f"frame {index}: bad length {n}")
+        total += n
+        if total > max_bytes:
+            raise StreamError(f"upload larger than {max_bytes:,} bytes")
+        frame = _read_exact(stream, n)
+        if len(frame) < n:
+            raise StreamError(f"stream truncated inside frame {index}")
+        length = _read_exact(stream, _U32.size)     # lookahead: no next frame -> this one is last
+        last   = not length
+        aes    = AES.new(key, AES.MODE_GCM, nonce=_nonce(prefix, index, last))
+        aes.update(header)
+        try:
+            plain = aes.decrypt_and_verify(frame[:-TAG_BYTES], frame[-TAG_BYTES:])
+        except ValueError:
+            raise StreamError(f"frame {index} failed authentication") from None
+        yield plain
+        if last:
+            return
+        index += 1
+
+
+# ── EMBED TOKEN PARSING ──────────────────────────────────────────────
+class StreamField:
+    """
+    One decoded field: value kept up to INLINE_BYTES, digest and size always,
+    plus an HMAC-SHA256 under `mac_key` when given (what gets stored).
+    """
+    __slots__ = ("name", "size", "_head", "_sha", "_mac")
+
+    def __init__(self, name, mac_key=None):
+        self.name  = name
+        self.size  = 0
+        self._head = bytearray()
+        self._sha  = hashlib.sha256()
+        self._mac  = hmac.new(mac_key, digestmod=hashlib.sha256) if mac_key else None
+
+    def add(self, data):
+        self.size += len(data)
+        self._sha.update(data)
+        if self._mac:
+            self._mac.update(data)
+        if len(self._head) <= INLINE_BYTES:
+            self._head += data[:INLINE_BYTES + 1 - len(self._head)]
+
+    @property
+    def data(self):
+        """Decoded bytes, or None when too large to keep."""
+        return bytes(self._head) if self.size <= INLINE_BYTES else None
+
+    @property
+    def value(self):
+        """Decoded text (one char per 8-bit group, as decode_from_bits), or None when too large to keep."""
+        return self._head.decode("latin-1") if self.size <= INLINE_BYTES else None
+
+    def digest(self):
+        return self._sha.digest()
+
+    def mac(self):
+        return self._mac.digest() if self._mac else None
+
+    def summary(self):
+        return {"bytes": self.size, "sha256": self._sha.hexdigest(), "inline": self.size <= INLINE_BYTES}
+
+
+class EmbedTokenParser:
+    """Incremental parse_embed_token + decode_from_bits over arbitrary chunk boundaries."""
+
+    def __init__(self, mac_key=None):
+        self.fields  = {}
+        self.mac_key = mac_key
+        self._buf    = b""
+        self._field  = None
+
+    def _decode(self, segment):
+        self._field.add(pack_bits(segment))
+
+    def _close(self):
+        if self._field is not None:
+            self.fields[self._field.name] = self._field
+            self._field = None
+
+    def feed(self, data):
+        buf = self._buf + data
+        while buf:
+            if self._field is None:
+                i = buf.find(b":")
+                if i < 0:
+                    if len(buf.strip()) > MAX_NAME:
+                        raise StreamError("malformed embed token: field name too long")
+                    break
+                name = buf[:i].strip().lstrip(b"|").strip()[::-1].decode("utf-8", "replace")
+                if not name or len(name) > MAX_NAME:
+                    raise StreamError("malformed embed token: bad field name")
+                self._field = StreamField(name, self.mac_key)
+                buf = buf[i + 1:]
+                continue
+            i = buf.find(b"||")
+            if i >= 0:
+                self._decode(buf[:i])
+                self._close()
+                buf = buf[i + 2:]
+                continue
+            cut = max(buf.rfind(b" "), buf.rfind(b"\n"))   # keep a group split across chunks for later
+            if cut < 0:
+                if len(buf) > 64:
+                    raise StreamError("malformed embed token: bit group too long")
+                break
+            self._decode(buf[:cut])
+            buf = buf[cut:]                  # no separator, no complete group left: wait for more
+            break
+        self._buf = buf
+        return self
+
+    def finish(self):
+        if self._field is not None:
+            self._decode(self._buf)
+            self._close()
+        elif self._buf.strip():
+            raise StreamError("malformed embed token: trailing data without a field")
+        self._buf = b""
+        return self.fields
+
+
+def read_embed_stream(stream, max_bytes=MAX_UPLOAD, mac_key=None):
+    """(fields, frames, plaintext bytes) for a framed upload; StreamError / ImportError on failure."""
+    parser, frames, size = EmbedTokenParser(mac_key), 0, 0
+    for chunk in open_stream(stream, max_bytes):
+        parser.feed(chunk)
+        frames += 1
+        size   += len(chunk)
+    return parser.finish(), frames, size
+
+
+# ── CLIENT ───────────────────────────────────────────────────────────
+def embed_chunks(fields, files=(), read_bytes=FRAME_BYTES):
+    """Embed-token plaintext for small {field: text} values plus (field, path or bytes) files, streamed."""
+    first = True
+    for name, text in fields.items():
+        yield (b"" if first else b" || ") + name[::-1].encode() + b":" + \
+            " ".join(format(ord(c), "08b") for c in str(text)).encode()
+        first = False
+    for name, src in files:
+        yield (b"" if first else b" || ") + name[::-1].encode() + b":"
+        first = False
+        sep = b""
+        with (io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else open(src, "rb")) as f:
+            while True:
+                block = f.read(read_bytes)
+                if not block:
+                    break
+                yield sep + b" ".join(map(_GROUPS.__getitem__, block))
+                sep = b" "
+
+def upload(url, id_hash, chunks, key=None):
+    """POST a sealed stream with chunked transfer encoding; returns (status, body bytes)."""
+    parts = urlsplit(url)
+    conn  = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=300)
+    conn.request("POST", parts.path or "/submit/stream", body=seal_stream(chunks, key or os.urandom(32)),
+                 headers={"Content-Type": "application/octet-stream", "X-Id-Hash": id_hash},
+                 encode_chunked=True)
+    resp = conn.getresponse()
+    return resp.status, resp.read()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream a supporting document to the Financial Shield.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    up  = sub.add_parser("upload")
+    up.add_argument("path", help="document to send")
+    up.add_argument("--field", default="document")
+    up.add_argument("--name", default="", help="identity name sent alongside the document")
+    up.add_argument("--url", default="http://localhost:4002/submit/stream")
+    args = ap.parse_args(argv)
+    if not os.path.exists(args.path):
+        print(f"error: file not found: {args.path}", file=sys.stderr)
+        return 1
+    id_hash = hashlib.sha256(args.name.lower().encode()).hexdigest()
+    status, body = upload(args.url, id_hash, embed_chunks({"name": args.name}, [(args.field, args.path)]))
+    print(status, body.decode("utf-8", "replace"))
+    return 0 if status == 200 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
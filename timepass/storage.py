@@ -0,0 +1,367 @@
+"""
+GFNS STORAGE — which database file each table lives in
+Run: python storage.py status
+     python storage.py shard                     (one file per table family)
+     python storage.py shard --partition year    (identity_sessions split per year)
+
+Single layout (default): every table in gfns_data.db, as before.
+
+Sharded layout: each table family gets its own file next to gfns_data.db,
+so writers to different families never wait on one another's lock:
+  capital    bank_capital_adequacy                          gfns_capital.db
+  liquidity  liquidity_coverage                             gfns_liquidity.db
+  debt       debt_exposure                                  gfns_debt.db
+  solvency   solvency_stress                                gfns_solvency.db
+  shield     identity_sessions, identity_signatures, ...    gfns_shield.db
+             (with the embedded/binary/encrypted_data views)
+  sessions   identity_sessions per year/month (--partition) gfns_sessions_2026.db
+Everything else (alerts, anomalies, institution_financials, checkpoints)
+stays in gfns_data.db. Run shard with the backend stopped; it is safe to
+re-run if interrupted. The layout is recorded in gfns_data.db's
+gfns_storage table, so the backend, viewer and CLI all read it from the
+database itself — no per-process configuration.
+
+Reads go through reader(): gfns_data.db with the shards ATTACHed, so
+unqualified table names and cross-table queries keep working. Partitions
+are stitched together by a TEMP VIEW (UNION ALL). Each partition's ids
+start at period * ROWS_PER_PERIOD, so ids stay unique and time-ordered
+across files and keyset paging by id is unchanged. SQLite allows
+ATTACH_LIMIT files per connection; readers attach the newest partitions
+that fit.
+
+Writes go through connect(ts): the same attachments plus the partition
+for ts. Statements that create or insert must name their target with
+q(table, ts); a multi-family transaction (e.g. a health snapshot) still
+commits atomically across files.
+"""
+
+import os, re, sys, glob, json, shutil, sqlite3, argparse, datetime
+from urllib.parse import quote
+
+LAYOUT_TABLE    = "gfns_storage"
+ATTACH_LIMIT    = 10
+ROWS_PER_PERIOD = 10 ** 9
+PERIOD_FORMATS  = {"year": "%Y", "month": "%Y%m"}
+
+SHARD_FAMILIES = {
+    "capital":   ("gfns_capital.db",   ("bank_capital_adequacy",)),
+    "liquidity": ("gfns_liquidity.db", ("liquidity_coverage",)),
+    "debt":      ("gfns_debt.db",      ("debt_exposure",)),
+    "solvency":  ("gfns_solvency.db",  ("solvency_stress",)),
+    "shield":    ("gfns_shield.db",    ("identity_sessions", "identity_signatures", "identity_lsh",
+                                        "shield_fields", "shield_positions")),
+}
+SHARD_VIEWS = {"shield": ("embedded_data", "binary_data", "encrypted_data")}   # follow their tables
+PARTITIONED = ("sessions", "gfns_sessions_{period}.db", ("identity_sessions",))
+
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[\"`\[]?\w+[\"`\]]?", re.I)
+_CREATE_VIEW  = re.compile(r"^\s*CREATE\s+VIEW\s+(?:IF\s+NOT\s+EXISTS\s+)?[\"`\[]?\w+[\"`\]]?", re.I)
+_CREATE_INDEX = re.compile(r"^\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?[\"`\[]?(\w+)[\"`\]]?", re.I)
+
+
+# ── CONNECTION HELPERS (any layout) ──────────────────────────────────
+def schemas(conn):
+    return [row[1] for row in conn.execute("PRAGMA database_list") if row[1] != "temp"]
+
+def data_version(conn):
+    """Sum of PRAGMA data_version over every attached file: changes when any of them gets a commit."""
+    return sum(conn.execute(f"PRAGMA {s}.data_version").fetchone()[0] for s in schemas(conn))
+
+def schemas_with_table(conn, table, views=False):
+    """Schemas holding a real (not virtual) table — or view, if asked — called `table`, in name-resolution order."""
+    types = "('table', 'view')" if views else "('table')"
+    return [s for s in schemas(conn) if conn.execute(
+        f"SELECT 1 FROM {s}.sqlite_master WHERE type IN {types} AND name = ? "
+        f"AND sql NOT LIKE 'CREATE VIRTUAL%'", (table,)).fetchone()]
+
+def ensure_index(conn, name, table, columns):
+    """CREATE INDEX wherever `table` lives — main, its shard, or every partition."""
+    for s in schemas_with_table(conn, table):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {s}.{name} ON {table}({columns})")
+
+
+# ── LAYOUT ───────────────────────────────────────────────────────────
+class Storage:
+    def __init__(self, main_path):
+        self.main      = os.path.abspath(main_path)
+        self.dir       = os.path.dirname(self.main)
+        self.families  = {}      # alias -> (file, tables)
+        self.partition = None    # (family, file pattern, tables, "year"|"month") when partitioned
+        self._home     = {}      # table -> alias
+        self.on_create = []      # fn(cursor, table, schema), run when create_table makes a new table
+        self.reload()
+
+    def reload(self):
+        self.families, self.partition, self._home = {}, None, {}
+        if not os.path.exists(self.main):
+            return self
+        conn = sqlite3.connect(f"file:{quote(self.main)}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(f"SELECT family, file, tables, partition FROM {LAYOUT_TABLE}").fetchall()
+        except sqlite3.OperationalError:
+            rows = []                      # no layout table: single file
+        finally:
+            conn.close()
+        for family, file, tables, partition in rows:
+            tables = tuple(json.loads(tables))
+            if partition:
+                self.partition = (family, file, tables, partition)
+            else:
+                self.families[family] = (file, tables)
+                self._home.update((t, family) for t in tables)
+        if self.partition:
+            for t in self.partition[2]:
+                self._home.pop(t, None)
+        return self
+
+    @property
+    def sharded(self):
+        return bool(self.families or self.partition)
+
+    def path(self, file):
+        return os.path.join(self.dir, file)
+
+    # ── partitions ───────────────────────────────────────────────────
+    def period(self, ts=None):
+        """'2026' / '202610' for an ISO timestamp (now when missing or unparseable)."""
+        when = None
+        if ts:
+            try:
+                when = datetime.datetime.fromisoformat(str(ts)[:19])
+            except ValueError:
+                pass
+        return (when or datetime.datetime.now()).strftime(PERIOD_FORMATS[self.partition[3]])
+
+    def partition_alias(self, period):
+        return f"{self.partition[0]}_{period}"
+
+    def partition_file(self, period):
+        return self.path(self.partition[1].format(period=period))
+
+    def periods(self):
+        """Periods with a partition file on disk, oldest first."""
+        family, pattern, _, kind = self.partition
+        digits = 4 if kind == "year" else 6
+        found  = []
+        for path in glob.glob(self.path(pattern.format(period="*"))):
+            m = re.search(r"(\d{%d})\.db$" % digits, path)
+            if m:
+                found.append(m.group(1))
+        return sorted(found)
+
+    # ── names ────────────────────────────────────────────────────────
+    def schema(self, table, ts=None):
+        if self.partition and table in self.partition[2]:
+            return self.partition_alias(self.period(ts))
+        return self._home.get(table, "main")
+
+    def q(self, table, ts=None):
+        """Table name to CREATE / INSERT into: `table` in main, `alias.table` in a shard."""
+        s = self.schema(table, ts)
+        return table if s == "main" else f"{s}.{table}"
+
+    def file_for(self, table, ts=None):
+        if self.partition and table in self.partition[2]:
+            return self.partition_file(self.period(ts))
+        home = self._home.get(table)
+        return self.path(self.families[home][0]) if home else self.main
+
+    def files(self):
+        out = [("main", self.main)] + [(a, self.path(f)) for a, (f, _) in self.families.items()]
+        if self.partition:
+            out += [(self.partition_alias(p), self.partition_file(p)) for p in self.periods()]
+        return out
+
+    def copy_to(self, directory):
+        """Copy every file of this database into `directory`; returns the copy's Storage (benchmarks)."""
+        for _, path in self.files():
+            if os.path.exists(path):
+                shutil.copyfile(path, os.path.join(directory, os.path.basename(path)))
+        return Storage(os.path.join(directory, os.path.basename(self.main)))
+
+    def columns(self, cursor, table, ts=None):
+        return [r[1] for r in cursor.execute(f"PRAGMA {self.schema(table, ts)}.table_info({table})")]
+
+    def create_table(self, cursor, table, columns_sql, ts=None):
+        """
+        CREATE TABLE IF NOT EXISTS in the table's home; a new partition's ids
+        start at its period base. The on_create hooks run, in the same
+        transaction, only when the table did not exist there yet.
+        """
+        target = self.q(table, ts)
+        s      = self.schema(table, ts)
+        new    = not cursor.execute(f"SELECT 1 FROM {s}.sqlite_master WHERE type = 'table' AND name = ?",
+                                    (table,)).fetchone()
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {target} ({columns_sql})")
+        if self.partition and table in self.partition[2]:
+            base = int(self.period(ts)) * ROWS_PER_PERIOD
+            cursor.execute(f"INSERT INTO {s}.sqlite_sequence (name, seq) SELECT ?, ? WHERE NOT EXISTS "
+                           f"(SELECT 1 FROM {s}.sqlite_sequence WHERE name = ?)", (table, base, table))
+        if new:
+            for hook in self.on_create:
+                hook(cursor, table, s)
+        return target
+
+    # ── connections ──────────────────────────────────────────────────
+    def connect(self, ts=None, **kwargs):
+        """Read-write connection: main + every shard + the partition for `ts`."""
+        conn = sqlite3.connect(self.main, **kwargs)
+        for alias, (file, _) in self.families.items():
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (self.path(file),))
+        if self.partition:
+            period = self.period(ts)
+            conn.execute(f"ATTACH DATABASE ? AS {self.partition_alias(period)}", (self.partition_file(period),))
+        return conn
+
+    def reader(self, readonly=True, immutable=False, reserve=0, **kwargs):
+        """
+        Connection for queries: main + existing shards + the newest partitions
+        that fit, with a TEMP VIEW per partitioned table. readonly uses
+        mode=ro (immutable=1 too when asked); `reserve` keeps attach slots free
+        for the caller (the viewer's FTS sidecar).
+        """
+        flags = "" if not readonly else "?mode=ro" + ("&immutable=1" if immutable else "")
+        conn  = sqlite3.connect(f"file:{quote(self.main)}{flags}", uri=True, **kwargs)
+        used  = 0
+        for alias, (file, _) in self.families.items():
+            if os.path.exists(self.path(file)):
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{quote(self.path(file))}{flags}",))
+                used += 1
+        if self.partition:
+            room    = ATTACH_LIMIT - used - reserve
+            periods = self.periods()[-room:] if room > 0 else []
+            for p in periods:
+                conn.execute(f"ATTACH DATABASE ? AS {self.partition_alias(p)}",
+                             (f"file:{quote(self.partition_file(p))}{flags}",))
+            for table in self.partition[2]:
+                parts = [f"SELECT * FROM {self.partition_alias(p)}.{table}" for p in periods
+                         if schemas_with_table(conn, table).count(self.partition_alias(p))]
+                if parts:
+                    conn.execute(f"CREATE TEMP VIEW {table} AS {' UNION ALL '.join(parts)}")
+        return conn
+
+
+# ── MIGRATION ────────────────────────────────────────────────────────
+def _copy_table(conn, table, src, dst, id_offset=0, where="", params=()):
+    """Create `table` in schema dst like src's, copy rows (idempotent via INSERT OR IGNORE) and indexes."""
+    ddl = conn.execute(f"SELECT sql FROM {src}.sqlite_master WHERE type = 'table' AND name = ?",
+                       (table,)).fetchone()[0]
+    conn.execute(_CREATE_TABLE.sub(f"CREATE TABLE IF NOT EXISTS {dst}.{table}", ddl, count=1))
+    cols = [r[1] for r in conn.execute(f"PRAGMA {src}.table_info({table})")]
+    sel  = ", ".join(f"id + {id_offset}" if c == "id" and id_offset else c for c in cols)
+    conn.execute(f"INSERT OR IGNORE INTO {dst}.{table} ({', '.join(cols)}) SELECT {sel} FROM {src}.{table}{where}",
+                 params)
+    for (sql,) in conn.execute(f"SELECT sql FROM {src}.sqlite_master WHERE type = 'index' AND tbl_name = ? "
+                               f"AND sql IS NOT NULL", (table,)).fetchall():
+        conn.execute(_CREATE_INDEX.sub(lambda m: f"CREATE {m.group(1) or ''}INDEX IF NOT EXISTS {dst}.{m.group(2)}",
+                                       sql, count=1))
+
+def shard(main_path, partition=None, log=print):
+    """
+    Move the family tables out of main into their files and record the layout.
+    Safe to re-run after a crash: copies are INSERT OR IGNORE and main's
+    tables are only dropped, with the layout written, in one final transaction.
+    """
+    store = Storage(main_path)
+    if store.sharded:
+        raise SystemExit("error: database is already sharded (python storage.py status)")
+    families = {a: (f, tuple(t for t in tables if not (partition and t in PARTITIONED[2])))
+                for a, (f, tables) in SHARD_FAMILIES.items()}
+    conn = sqlite3.connect(store.main, isolation_level=None)
+    have = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    views = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view'").fetchall())
+    moved, moved_views = [], []
+    for alias, (file, tables) in families.items():
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (store.path(file),))
+        conn.execute("BEGIN")
+        for t in tables:
+            if t in have:
+                _copy_table(conn, t, "main", alias)
+                moved.append(t)
+                log(f"{t} -> {file}")
+        for v in SHARD_VIEWS.get(alias, ()):
+            if v in views:
+                conn.execute(_CREATE_VIEW.sub(f"CREATE VIEW IF NOT EXISTS {alias}.{v}", views[v], count=1))
+                moved_views.append(v)
+        conn.execute("COMMIT")
+        conn.execute(f"DETACH DATABASE {alias}")
+
+    if partition:
+        store.partition = (PARTITIONED[0], PARTITIONED[1], PARTITIONED[2], partition)
+        for t in PARTITIONED[2]:
+            if t not in have:
+                continue
+            by_period = {}
+            for row_id, ts in conn.execute(f"SELECT id, created_at FROM main.{t}"):
+                by_period.setdefault(store.period(ts), []).append(row_id)
+            for period, ids in sorted(by_period.items()):
+                alias = store.partition_alias(period)
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (store.partition_file(period),))
+                conn.execute("BEGIN")
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS _move_ids (id INTEGER PRIMARY KEY)")
+                conn.execute("DELETE FROM _move_ids")
+                conn.executemany("INSERT INTO _move_ids VALUES (?)", ((i,) for i in ids))
+                _copy_table(conn, t, "main", alias, int(period) * ROWS_PER_PERIOD,
+                            " WHERE id IN (SELECT id FROM _move_ids)")
+                conn.execute("COMMIT")
+                conn.execute(f"DETACH DATABASE {alias}")
+                log(f"{t} [{period}] {len(ids):,} rows -> {os.path.basename(store.partition_file(period))}")
+            moved.append(t)
+
+    conn.execute("BEGIN")
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {LAYOUT_TABLE} (
+        family TEXT PRIMARY KEY, file TEXT, tables TEXT, partition TEXT)""")
+    conn.executemany(f"INSERT OR REPLACE INTO {LAYOUT_TABLE} VALUES (?, ?, ?, NULL)",
+                     [(a, f, json.dumps(t)) for a, (f, t) in families.items()])
+    if partition:
+        conn.execute(f"INSERT OR REPLACE INTO {LAYOUT_TABLE} VALUES (?, ?, ?, ?)",
+                     (PARTITIONED[0], PARTITIONED[1], json.dumps(PARTITIONED[2]), partition))
+    for v in moved_views:
+        conn.execute(f"DROP VIEW main.{v}")
+    for t in moved:
+        conn.execute(f"DROP TABLE main.{t}")
+    conn.execute("COMMIT")
+    conn.close()
+    return store.reload()
+
+
+def status(store):
+    rows = []
+    conn = store.reader()
+    try:
+        for alias, path in store.files():
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if alias not in schemas(conn):
+                rows.append((alias, os.path.basename(path), size, "(not attached)"))
+                continue
+            names = [r[0] for r in conn.execute(f"SELECT name FROM {alias}.sqlite_master WHERE type = 'table' "
+                                                f"AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+            counts = ", ".join(f"{n} {conn.execute(f'SELECT COUNT(*) FROM {alias}.{n}').fetchone()[0]:,}"
+                               for n in names)
+            rows.append((alias, os.path.basename(path), size, counts or "-"))
+    finally:
+        conn.close()
+    return rows
+
+
+def main(argv=None):
+    from gfns_db_core import DB_PATH
+    ap = argparse.ArgumentParser(description="Show or change the GFNS storage layout.")
+    ap.add_argument("command", choices=("status", "shard"))
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--partition", choices=tuple(PERIOD_FORMATS),
+                    help="with shard: split identity_sessions into one file per period")
+    args = ap.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"error: database not found: {args.db}", file=sys.stderr)
+        return 1
+    store = shard(args.db, args.partition) if args.command == "shard" else Storage(args.db)
+    print(f"layout: {'sharded' if store.sharded else 'single file'}"
+          + (f", identity_sessions partitioned by {store.partition[3]}" if store.partition else ""))
+    for alias, file, size, tables in status(store):
+        print(f"  {alias:<16} {file:<28} {size / 1024:>9,.0f} KB  {tables}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
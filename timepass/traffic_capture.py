@@ -0,0 +1,108 @@
+"""
+GFNS TRAFFIC CAPTURE — opt-in request recorder for replay.py
+Enable: GFNS_CAPTURE=capture.ndjson python backend_server.py
+        (GFNS_CAPTURE_MB / GFNS_CAPTURE_FILES size the rotation)
+
+One compact NDJSON line per request:
+  {"t": start epoch, "m": method, "p": path?query, "s": status, "ms": latency,
+   "b": JSON body or null, "h": {header: value} (only when one was sent)}
+Shield bodies are never written: /submit keeps only {"$regen": "shield",
+"bytes": cipher length}, /submit/stream {"$regen": "shield-stream",
+"bytes": upload bytes the handler read}, and replay.py generates a fresh
+synthetic payload in their place. Of the headers, only CAPTURED_HEADERS
+are kept; X-Id-Hash belongs to the redacted identity, so it is recorded
+as "$regen" and replay.py sends the new identity's hash.
+"""
+
+import os, json, time, logging
+from logging.handlers import RotatingFileHandler
+from flask import request, g
+
+REDACTED_PATHS = {"/submit": "shield", "/submit/stream": "shield-stream"}
+CAPTURED_HEADERS = {"X-Id-Hash": "$regen", "X-Deadline-Ms": None}   # None: value kept as sent
+DEFAULT_MB     = 64
+DEFAULT_FILES  = 5
+
+
+def redact_body(path, body, length=None):
+    """Body as stored in the capture; shield payloads are replaced by their size."""
+    kind = REDACTED_PATHS.get(path)
+    if kind == "shield-stream":
+        return {"$regen": kind, "bytes": length or 0}
+    if kind:
+        enc = body.get("encPayload") if isinstance(body, dict) else None
+        return {"$regen": kind,
+                "bytes": len(enc.get("cipher", "")) if isinstance(enc, dict) else 0}
+    return body
+
+def captured_headers(headers):
+    """The CAPTURED_HEADERS a request carried, redacted ones as their marker."""
+    return {name: headers[name] if marker is None else marker
+            for name, marker in CAPTURED_HEADERS.items() if name in headers}
+
+
+class _CountingInput:
+    """wsgi.input wrapper counting the bytes a handler reads (chunked uploads have no length)."""
+    def __init__(self, raw):
+        self.raw, self.read_bytes = raw, 0
+
+    def read(self, *args):
+        data = self.raw.read(*args)
+        self.read_bytes += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+def install_capture(app, path, max_mb=DEFAULT_MB, files=DEFAULT_FILES):
+    """Register before/after hooks on app that append to a rotating capture log."""
+    logger  = logging.getLogger("gfns.capture")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = RotatingFileHandler(path, maxBytes=int(max_mb * 1024 * 1024),
+                                  backupCount=files, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+
+    @app.before_request
+    def _capture_start():
+        g._capture_t0 = (time.time(), time.perf_counter())
+        if REDACTED_PATHS.get(request.path) == "shield-stream":
+            g._capture_in = request.environ["wsgi.input"] = _CountingInput(request.environ["wsgi.input"])
+
+    @app.after_request
+    def _capture_end(response):
+        started = getattr(g, "_capture_t0", None)
+        if started is None or request.method == "OPTIONS":
+            return response
+        streamed = REDACTED_PATHS.get(request.path) == "shield-stream"
+        body = request.get_json(silent=True) if request.content_length and not streamed else None
+        path_qs = request.full_path.rstrip("?")
+        rec = {
+            "t":  round(started[0], 4),
+            "m":  request.method,
+            "p":  path_qs,
+            "s":  response.status_code,
+            "ms": round((time.perf_counter() - started[1]) * 1000, 2),
+            "b":  redact_body(request.path, body,
+                              g._capture_in.read_bytes if streamed else request.content_length),
+        }
+        headers = captured_headers(request.headers)
+        if headers:
+            rec["h"] = headers
+        logger.info(json.dumps(rec, separators=(",", ":")))
+        return response
+
+    return handler
+
+
+def capture_from_env(app):
+    """install_capture() when GFNS_CAPTURE names a file; returns the path or None."""
+    path = os.environ.get("GFNS_CAPTURE")
+    if not path:
+        return None
+    install_capture(app, path,
+                    float(os.environ.get("GFNS_CAPTURE_MB", DEFAULT_MB)),
+                    int(os.environ.get("GFNS_CAPTURE_FILES", DEFAULT_FILES)))
+    return path